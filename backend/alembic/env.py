@@ -0,0 +1,61 @@
+"""
+Alembic environment.
+Uses the application's engine and models so migrations always target DATABASE_URL.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.db.base import Base, engine
+from app.db import models  # noqa: F401  (registers all tables on Base.metadata)
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Emit SQL to stdout instead of applying it (alembic upgrade --sql)."""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Apply migrations over a live connection."""
+    with engine.connect() as connection:
+        is_sqlite = connection.dialect.name == "sqlite"
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite can't ALTER most constraints; batch mode recreates the table instead
+            render_as_batch=is_sqlite,
+        )
+
+        # Recreating a table drops the old one, which would fire ON DELETE actions
+        # on rows referencing it; foreign_keys can only change outside a transaction
+        if is_sqlite:
+            connection.connection.driver_connection.execute("PRAGMA foreign_keys=OFF")
+        try:
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if is_sqlite:
+                connection.connection.driver_connection.execute("PRAGMA foreign_keys=ON")
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
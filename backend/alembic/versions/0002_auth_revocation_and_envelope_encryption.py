@@ -0,0 +1,103 @@
+"""Auth revocation and envelope encryption tables
+
+Databases created with Base.metadata.create_all before migrations existed may
+already contain some of these objects; they are skipped when present.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 11:28:12.306308
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+    provider_key_columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns('provider_keys')}
+
+    if 'revoked_tokens' not in existing_tables:
+        _create_revoked_tokens()
+    if 'key_rotation_jobs' not in existing_tables:
+        _create_key_rotation_jobs()
+    if 'organization_data_keys' not in existing_tables:
+        _create_organization_data_keys()
+    if 'key_version' not in provider_key_columns:
+        with op.batch_alter_table('provider_keys', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('key_version', sa.Integer(), nullable=True))
+
+
+def _create_revoked_tokens() -> None:
+    op.create_table('revoked_tokens',
+    sa.Column('jti', sa.String(length=36), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('jti')
+    )
+    with op.batch_alter_table('revoked_tokens', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_revoked_tokens_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_revoked_tokens_expires_at'), ['expires_at'], unique=False)
+
+
+def _create_key_rotation_jobs() -> None:
+    op.create_table('key_rotation_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('org_id', sa.String(length=36), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('cursor', sa.String(length=36), nullable=True),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['org_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('key_rotation_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_key_rotation_jobs_org_id'), ['org_id'], unique=False)
+
+
+def _create_organization_data_keys() -> None:
+    op.create_table('organization_data_keys',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('org_id', sa.String(length=36), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('wrapped_key', sa.Text(), nullable=False),
+    sa.Column('master_key_id', sa.String(length=16), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['org_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('org_id', 'version')
+    )
+    with op.batch_alter_table('organization_data_keys', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_organization_data_keys_org_id'), ['org_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('provider_keys', schema=None) as batch_op:
+        batch_op.drop_column('key_version')
+
+    with op.batch_alter_table('organization_data_keys', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_organization_data_keys_org_id'))
+
+    op.drop_table('organization_data_keys')
+    with op.batch_alter_table('key_rotation_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_key_rotation_jobs_org_id'))
+
+    op.drop_table('key_rotation_jobs')
+    with op.batch_alter_table('revoked_tokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_revoked_tokens_expires_at'))
+        batch_op.drop_index(batch_op.f('ix_revoked_tokens_created_at'))
+
+    op.drop_table('revoked_tokens')
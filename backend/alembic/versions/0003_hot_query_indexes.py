@@ -0,0 +1,132 @@
+"""Indexes and unique constraints for hot query paths
+
+Duplicate organization memberships (same org and user) are removed, keeping
+the oldest, before the unique constraint is added. Duplicate prompt version
+numbers can't be resolved automatically, so the upgrade stops and lists them.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:34:59.261361
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _remove_duplicate_memberships()
+    _check_duplicate_prompt_versions()
+
+    with op.batch_alter_table('api_keys', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_api_keys_org_id'), ['org_id'], unique=False)
+
+    with op.batch_alter_table('credit_ledger', schema=None) as batch_op:
+        batch_op.create_index('ix_credit_ledger_org_id_amount', ['org_id', 'amount'], unique=False)
+
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.create_index('ix_files_user_id_created_at', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_files_user_id_workspace_id_created_at', ['user_id', 'workspace_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('generations', schema=None) as batch_op:
+        batch_op.create_index('ix_generations_org_id_created_at', ['org_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('organization_members', schema=None) as batch_op:
+        batch_op.create_index('ix_organization_members_user_id', ['user_id'], unique=False)
+        batch_op.create_unique_constraint('uq_organization_members_org_id_user_id', ['org_id', 'user_id'])
+
+    with op.batch_alter_table('prompt_versions', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_prompt_versions_prompt_id_version', ['prompt_id', 'version'])
+
+    with op.batch_alter_table('prompts', schema=None) as batch_op:
+        batch_op.create_index('ix_prompts_org_id_slug', ['org_id', 'slug'], unique=False)
+
+    with op.batch_alter_table('provider_keys', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_provider_keys_org_id'))
+        batch_op.create_index('ix_provider_keys_org_id_provider_is_active', ['org_id', 'provider', 'is_active'], unique=False)
+
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_sessions_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('workspaces', schema=None) as batch_op:
+        batch_op.create_index('ix_workspaces_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+
+def _remove_duplicate_memberships() -> None:
+    members = sa.table(
+        'organization_members',
+        sa.column('id'), sa.column('org_id'), sa.column('user_id'), sa.column('created_at')
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(members.c.id, members.c.org_id, members.c.user_id)
+        .order_by(members.c.created_at, members.c.id)
+    ).all()
+
+    seen = set()
+    duplicate_ids = []
+    for row in rows:
+        if (row.org_id, row.user_id) in seen:
+            duplicate_ids.append(row.id)
+        seen.add((row.org_id, row.user_id))
+    if duplicate_ids:
+        bind.execute(members.delete().where(members.c.id.in_(duplicate_ids)))
+
+
+def _check_duplicate_prompt_versions() -> None:
+    versions = sa.table('prompt_versions', sa.column('prompt_id'), sa.column('version'))
+    duplicates = op.get_bind().execute(
+        sa.select(versions.c.prompt_id, versions.c.version)
+        .group_by(versions.c.prompt_id, versions.c.version)
+        .having(sa.func.count() > 1)
+    ).all()
+    if duplicates:
+        listed = ", ".join(f"{row.prompt_id} v{row.version}" for row in duplicates[:20])
+        raise RuntimeError(
+            f"{len(duplicates)} duplicate prompt versions must be renumbered before upgrading: {listed}"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('workspaces', schema=None) as batch_op:
+        batch_op.drop_index('ix_workspaces_user_id_created_at')
+
+    with op.batch_alter_table('sessions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sessions_user_id'))
+
+    with op.batch_alter_table('provider_keys', schema=None) as batch_op:
+        batch_op.drop_index('ix_provider_keys_org_id_provider_is_active')
+        batch_op.create_index(batch_op.f('ix_provider_keys_org_id'), ['org_id'], unique=False)
+
+    with op.batch_alter_table('prompts', schema=None) as batch_op:
+        batch_op.drop_index('ix_prompts_org_id_slug')
+
+    with op.batch_alter_table('prompt_versions', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_prompt_versions_prompt_id_version', type_='unique')
+
+    with op.batch_alter_table('organization_members', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_organization_members_org_id_user_id', type_='unique')
+        batch_op.drop_index('ix_organization_members_user_id')
+
+    with op.batch_alter_table('generations', schema=None) as batch_op:
+        batch_op.drop_index('ix_generations_org_id_created_at')
+
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.drop_index('ix_files_user_id_workspace_id_created_at')
+        batch_op.drop_index('ix_files_user_id_created_at')
+
+    with op.batch_alter_table('credit_ledger', schema=None) as batch_op:
+        batch_op.drop_index('ix_credit_ledger_org_id_amount')
+
+    with op.batch_alter_table('api_keys', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_api_keys_org_id'))
@@ -0,0 +1,155 @@
+"""Store ids as compact UUIDs
+
+Every id and foreign-key column changes from a 36-character string to a
+native UUID on PostgreSQL and 16 raw bytes on SQLite and MySQL. Existing ids
+keep their values; only new rows get time-ordered (v7) ids.
+
+PostgreSQL and MySQL rewrite each table and need the foreign keys dropped and
+recreated around the change, so run this during a maintenance window on
+large databases.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 11:41:07.512930
+
+"""
+import uuid
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+import app.db.types
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UUID_COLUMNS = {
+    'users': ['id'],
+    'organizations': ['id'],
+    'organization_members': ['id', 'org_id', 'user_id'],
+    'prompts': ['id', 'org_id'],
+    'prompt_versions': ['id', 'prompt_id'],
+    'generations': ['id', 'org_id', 'prompt_id', 'prompt_version_id', 'user_id'],
+    'credit_ledger': ['id', 'org_id'],
+    'api_keys': ['id', 'org_id'],
+    'provider_keys': ['id', 'org_id'],
+    'organization_data_keys': ['id', 'org_id'],
+    'key_rotation_jobs': ['id', 'org_id', 'cursor'],
+    'sessions': ['id', 'user_id'],
+    'workspaces': ['id', 'user_id'],
+    'files': ['id', 'user_id', 'workspace_id'],
+    'onboarding_progress': ['id', 'user_id'],
+    'organization_invitations': ['id', 'org_id', 'invited_by'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _convert_sqlite(_text_to_bytes, app.db.types.UUIDType(), sa.String(length=36))
+    elif dialect == 'postgresql':
+        _convert_postgres(postgresql.UUID(as_uuid=True), sa.String(length=36), "{column}::uuid")
+    elif dialect == 'mysql':
+        _convert_mysql_to_binary()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _convert_sqlite(_bytes_to_text, sa.String(length=36), app.db.types.UUIDType())
+    elif dialect == 'postgresql':
+        _convert_postgres(sa.String(length=36), postgresql.UUID(as_uuid=True), "{column}::text")
+    elif dialect == 'mysql':
+        _convert_mysql_to_text()
+
+
+def _text_to_bytes(value):
+    return uuid.UUID(value).bytes if isinstance(value, str) else value
+
+
+def _bytes_to_text(value):
+    return str(uuid.UUID(bytes=value)) if isinstance(value, bytes) else value
+
+
+def _convert_sqlite(convert, new_type, old_type) -> None:
+    # Columns accept any value in SQLite, so convert the data in place and then
+    # recreate each table with the new declared types (a CAST to BLOB/VARCHAR keeps the values)
+    op.get_bind().connection.driver_connection.create_function('convert_uuid', 1, convert, deterministic=True)
+    for table, columns in UUID_COLUMNS.items():
+        assignments = ', '.join(f'{column} = convert_uuid({column})' for column in columns)
+        op.execute(f'UPDATE {table} SET {assignments}')
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, type_=new_type, existing_type=old_type)
+
+
+def _drop_foreign_keys() -> list[tuple[str, dict]]:
+    inspector = sa.inspect(op.get_bind())
+    foreign_keys = [(table, fk) for table in UUID_COLUMNS for fk in inspector.get_foreign_keys(table)]
+    for table, fk in foreign_keys:
+        op.drop_constraint(fk['name'], table, type_='foreignkey')
+    return foreign_keys
+
+
+def _create_foreign_keys(foreign_keys: list[tuple[str, dict]]) -> None:
+    for table, fk in foreign_keys:
+        op.create_foreign_key(
+            fk['name'], table, fk['referred_table'],
+            fk['constrained_columns'], fk['referred_columns'],
+            ondelete=fk.get('options', {}).get('ondelete')
+        )
+
+
+def _convert_postgres(new_type, old_type, using: str) -> None:
+    foreign_keys = _drop_foreign_keys()
+    for table, columns in UUID_COLUMNS.items():
+        for column in columns:
+            op.alter_column(
+                table, column, type_=new_type, existing_type=old_type,
+                postgresql_using=using.format(column=column)
+            )
+    _create_foreign_keys(foreign_keys)
+
+
+def _nullable_columns() -> dict[str, dict[str, bool]]:
+    inspector = sa.inspect(op.get_bind())
+    return {table: {c['name']: c['nullable'] for c in inspector.get_columns(table)} for table in UUID_COLUMNS}
+
+
+def _convert_mysql_to_binary() -> None:
+    nullable = _nullable_columns()
+    foreign_keys = _drop_foreign_keys()
+    for table, columns in UUID_COLUMNS.items():
+        for column in columns:
+            # VARBINARY keeps the text bytes so UNHEX can read them back
+            op.alter_column(table, column, type_=sa.VARBINARY(36), existing_type=sa.String(length=36),
+                            existing_nullable=nullable[table][column])
+            op.execute(f"UPDATE {table} SET {column} = UNHEX(REPLACE({column}, '-', ''))")
+            op.alter_column(table, column, type_=sa.BINARY(16), existing_type=sa.VARBINARY(36),
+                            existing_nullable=nullable[table][column])
+    _create_foreign_keys(foreign_keys)
+
+
+def _convert_mysql_to_text() -> None:
+    nullable = _nullable_columns()
+    foreign_keys = _drop_foreign_keys()
+    for table, columns in UUID_COLUMNS.items():
+        for column in columns:
+            op.alter_column(table, column, type_=sa.VARBINARY(36), existing_type=sa.BINARY(16),
+                            existing_nullable=nullable[table][column])
+            op.execute(
+                f"UPDATE {table} SET {column} = LOWER(CONCAT_WS('-', "
+                f"SUBSTR(HEX({column}), 1, 8), SUBSTR(HEX({column}), 9, 4), SUBSTR(HEX({column}), 13, 4), "
+                f"SUBSTR(HEX({column}), 17, 4), SUBSTR(HEX({column}), 21)))"
+            )
+            op.alter_column(table, column, type_=sa.String(length=36), existing_type=sa.VARBINARY(36),
+                            existing_nullable=nullable[table][column])
+    _create_foreign_keys(foreign_keys)
@@ -0,0 +1,52 @@
+"""Track the latest version and version counter on prompts
+
+Adds prompts.version_count (the last version number issued) and
+prompts.latest_version_id, then backfills both from prompt_versions so
+execution no longer has to sort a prompt's versions to find the newest.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 12:02:44.108315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+import app.db.types
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('prompts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('latest_version_id', app.db.types.UUIDType(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_prompts_latest_version_id', 'prompt_versions', ['latest_version_id'], ['id'], ondelete='SET NULL'
+        )
+
+    op.execute(
+        "UPDATE prompts SET version_count = COALESCE("
+        "(SELECT MAX(pv.version) FROM prompt_versions pv WHERE pv.prompt_id = prompts.id), 0)"
+    )
+    op.execute(
+        "UPDATE prompts SET latest_version_id = ("
+        "SELECT pv.id FROM prompt_versions pv "
+        "WHERE pv.prompt_id = prompts.id AND pv.version = prompts.version_count)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('prompts', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_prompts_latest_version_id', type_='foreignkey')
+        batch_op.drop_column('latest_version_id')
+        batch_op.drop_column('version_count')
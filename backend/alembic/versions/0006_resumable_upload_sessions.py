@@ -0,0 +1,67 @@
+"""Resumable upload sessions
+
+Adds upload_sessions for tus-style chunked uploads and widens
+files.size_bytes to BIGINT so files over 2GB can be recorded.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 11:51:37.490238
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+import app.db.types
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('upload_sessions',
+    sa.Column('id', app.db.types.UUIDType(), nullable=False),
+    sa.Column('user_id', app.db.types.UUIDType(), nullable=False),
+    sa.Column('workspace_id', app.db.types.UUIDType(), nullable=True),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('received_ranges', sa.Text(), nullable=False),
+    sa.Column('bytes_received', sa.BigInteger(), nullable=False),
+    sa.Column('staging_path', sa.String(length=500), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['workspace_id'], ['workspaces.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_upload_sessions_expires_at'), ['expires_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_upload_sessions_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.alter_column('size_bytes',
+               existing_type=sa.INTEGER(),
+               type_=sa.BigInteger(),
+               existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.alter_column('size_bytes',
+               existing_type=sa.BigInteger(),
+               type_=sa.INTEGER(),
+               existing_nullable=False)
+
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_upload_sessions_user_id'))
+        batch_op.drop_index(batch_op.f('ix_upload_sessions_expires_at'))
+
+    op.drop_table('upload_sessions')
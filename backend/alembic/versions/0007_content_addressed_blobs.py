@@ -0,0 +1,50 @@
+"""Content-addressed blobs
+
+Adds the blobs table (one row per distinct SHA-256) and files.content_hash.
+Existing files keep their own storage paths and a NULL hash.
+
+Downgrading leaves files that share a blob pointing at the same path, so
+deleting one of them would remove the contents of the others.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 11:54:00.609083
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('storage_path', sa.String(length=500), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_files_content_hash'), ['content_hash'], unique=False)
+        batch_op.create_foreign_key('fk_files_content_hash', 'blobs', ['content_hash'], ['sha256'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_files_content_hash', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_files_content_hash'))
+        batch_op.drop_column('content_hash')
+
+    op.drop_table('blobs')
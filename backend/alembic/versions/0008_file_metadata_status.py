@@ -0,0 +1,33 @@
+"""File metadata status
+
+Adds files.metadata_status (pending, ready, failed) for background metadata
+extraction. Existing files are marked ready.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 11:56:08.589174
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('metadata_status', sa.String(length=20), server_default='ready', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.drop_column('metadata_status')
@@ -0,0 +1,35 @@
+"""API key revocation timestamp
+
+Adds api_keys.revoked_at. Revoked keys are now deactivated instead of deleted,
+and workers poll this column to evict them from their in-memory indexes.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 12:14:04.375409
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('api_keys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revoked_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_api_keys_revoked_at'), ['revoked_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('api_keys', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_api_keys_revoked_at'))
+        batch_op.drop_column('revoked_at')
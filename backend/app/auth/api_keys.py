@@ -0,0 +1,179 @@
+"""
+In-memory index of hashed API keys.
+Lets machine clients authenticate with `Authorization: Bearer pk_...` without a
+database round trip, and coalesces `last_used_at` updates into batched writes.
+
+The index is the authority: a key it doesn't hold is rejected without a query,
+so garbage and guessed keys cost no database work. Every worker polls for keys
+created or revoked elsewhere (like the token denylist), so a new key works
+everywhere, and a revoked one stops working everywhere, within
+API_KEY_SYNC_SECONDS. Revoking deactivates the row and stamps `revoked_at`.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.models import APIKey
+
+logger = logging.getLogger(__name__)
+
+# Prefix shared by every generated API key
+API_KEY_PREFIX = "pk_"
+
+
+def hash_api_key(secret_key: str) -> str:
+    """Hash a secret API key the same way it is stored in `api_keys.key_hash`."""
+    return hashlib.sha256(secret_key.encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedAPIKey:
+    """Immutable snapshot of an active API key."""
+    id: str
+    org_id: str
+
+
+class APIKeyIndex:
+    """
+    Hash -> key index of active API keys.
+
+    The index is loaded at startup. Keys created or revoked on this worker are
+    applied immediately; those from other workers are pulled by `sync`, and a
+    periodic full reload drops keys deleted outright.
+    """
+
+    def __init__(self):
+        self._keys: dict[str, CachedAPIKey] = {}
+        self._last_used: dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._synced_until: Optional[datetime] = None
+
+    def load(self, db: Session) -> None:
+        """Rebuild the index from all active keys in the database."""
+        started_at = datetime.utcnow()
+        rows = db.query(APIKey.key_hash, APIKey.id, APIKey.org_id).filter(APIKey.is_active == True).all()
+        keys = {row.key_hash: CachedAPIKey(id=row.id, org_id=row.org_id) for row in rows}
+        with self._lock:
+            self._keys = keys
+        self._synced_until = started_at - timedelta(seconds=settings.REVOCATION_SYNC_OVERLAP_SECONDS)
+        logger.info(f"🔑 Loaded {len(keys)} active API keys")
+
+    def sync(self, db: Session) -> int:
+        """
+        Add keys created, and evict keys revoked, (on any worker) since the last sync.
+
+        The window overlaps the previous one by REVOCATION_SYNC_OVERLAP_SECONDS so
+        a key stamped before the last query but committed after it is still
+        seen; applying a change twice is harmless.
+
+        Returns:
+            Number of created and revoked keys in the window
+        """
+        started_at = datetime.utcnow()
+        created = db.query(APIKey.key_hash, APIKey.id, APIKey.org_id).filter(APIKey.is_active == True)
+        revoked = db.query(APIKey.key_hash).filter(APIKey.is_active == False)
+        if self._synced_until is not None:
+            created = created.filter(APIKey.created_at >= self._synced_until)
+            revoked = revoked.filter(APIKey.revoked_at >= self._synced_until)
+        created_rows = created.all()
+        # Revocations are applied last, so a key created and revoked in the window ends up evicted
+        revoked_rows = revoked.all()
+
+        for row in created_rows:
+            self.add(row)
+        for row in revoked_rows:
+            self.remove(row.key_hash)
+        self._synced_until = started_at - timedelta(seconds=settings.REVOCATION_SYNC_OVERLAP_SECONDS)
+        return len(created_rows) + len(revoked_rows)
+
+    def lookup(self, secret_key: str) -> Optional[CachedAPIKey]:
+        """Resolve a secret key to its cached snapshot, or None if it isn't an active key."""
+        return self._keys.get(hash_api_key(secret_key))
+
+    def add(self, api_key) -> CachedAPIKey:
+        """Add (or replace) a key in the index (an APIKey, or a row with its key_hash, id and org_id)."""
+        cached = CachedAPIKey(id=api_key.id, org_id=api_key.org_id)
+        with self._lock:
+            self._keys[api_key.key_hash] = cached
+        return cached
+
+    def remove(self, key_hash: str) -> None:
+        """Evict a key from the index, e.g. after it has been revoked."""
+        with self._lock:
+            cached = self._keys.pop(key_hash, None)
+            if cached is not None:
+                self._last_used.pop(cached.id, None)
+
+    def touch(self, key_id: str) -> None:
+        """Record a use of a key; persisted by the next `flush_last_used`."""
+        with self._lock:
+            self._last_used[key_id] = datetime.utcnow()
+
+    def flush_last_used(self, db: Session) -> int:
+        """
+        Write pending `last_used_at` timestamps in a single batched UPDATE.
+
+        Returns:
+            Number of keys updated
+        """
+        with self._lock:
+            pending, self._last_used = self._last_used, {}
+
+        if not pending:
+            return 0
+
+        db.execute(
+            update(APIKey),
+            [{"id": key_id, "last_used_at": used_at} for key_id, used_at in pending.items()]
+        )
+        db.commit()
+        return len(pending)
+
+
+# Global index shared by the auth dependencies
+api_key_index = APIKeyIndex()
+
+
+async def run_api_key_maintenance() -> None:
+    """
+    Background loop that pulls new and revoked keys, flushes `last_used_at`
+    updates and periodically reloads the index. Started from the application startup hook.
+    """
+    from app.db.session import SessionLocal
+
+    loop = asyncio.get_running_loop()
+    last_flush = last_refresh = loop.time()
+    while True:
+        await asyncio.sleep(settings.API_KEY_SYNC_SECONDS)
+        now = loop.time()
+        flush = now - last_flush >= settings.API_KEY_FLUSH_INTERVAL_SECONDS
+        refresh = now - last_refresh >= settings.API_KEY_INDEX_REFRESH_SECONDS
+        if flush:
+            last_flush = now
+        if refresh:
+            last_refresh = now
+        try:
+            await loop.run_in_executor(None, _maintain_api_keys, SessionLocal, flush, refresh)
+        except Exception as e:
+            logger.error(f"API key maintenance failed: {e}")
+
+
+def _maintain_api_keys(session_factory, flush: bool, refresh: bool) -> None:
+    """Pull new and revoked keys, and optionally flush usage timestamps and reload the index."""
+    db = session_factory()
+    try:
+        if refresh:
+            api_key_index.load(db)
+        else:
+            api_key_index.sync(db)
+        if flush:
+            api_key_index.flush_last_used(db)
+    finally:
+        db.close()
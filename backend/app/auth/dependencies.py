@@ -4,16 +4,21 @@ Provides current user extraction from JWT tokens.
 """
 
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.db.models import User
+from app.db.models import User, OrganizationMember
 from app.auth.security import decode_access_token
+from app.auth.api_keys import API_KEY_PREFIX, api_key_index
+from app.auth.revocation import token_denylist
 
 # Security scheme for JWT bearer tokens
 security = HTTPBearer()
 
+# Role granted to API keys within their own organization
+API_KEY_ROLE = "member"
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -42,7 +47,7 @@ async def get_current_user(
     token = credentials.credentials
     payload = decode_access_token(token)
     
-    if payload is None:
+    if payload is None or token_denylist.contains(payload.get("jti")):
         raise credentials_exception
     
     user_id: str = payload.get("sub")
@@ -148,13 +153,14 @@ class RoleChecker:
     """
     Dependency to check if a user has the required role (or higher) in an organization.
     Usage: Depends(RoleChecker(["admin", "owner"])) or Depends(RoleChecker("admin"))
-    """
-    def __init__(self, allowed_roles: list[str] | str):
-        if isinstance(allowed_roles, str):
-            self.allowed_roles = [allowed_roles]
-        else:
-            self.allowed_roles = allowed_roles
 
+    The organization is taken from the ``org_id`` path parameter of the route, and the
+    resolved OrganizationMember is returned so handlers don't need to query it again.
+
+    With ``allow_api_keys=True`` the route also accepts ``Authorization: Bearer pk_...``.
+    An API key acts as a member (with role API_KEY_ROLE) of the organization that owns
+    it; the returned membership is transient and has no ``user_id``.
+    """
     # Role hierarchy: owner > admin > member > viewer
     ROLE_HIERARCHY = {
         "owner": 4,
@@ -163,45 +169,114 @@ class RoleChecker:
         "viewer": 1
     }
 
-    def __call__(self, user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-        from app.db.models import OrganizationMember
-        
-        # Get membership (assuming single org context for now, or primary org)
-        # In a real multi-org setup, org_id should be passed as a path param, 
-        # but for simplicity we'll check the user's primary/active membership.
-        # Ideally, we should check against the org_id in the URL path if present.
-        
-        member = db.query(OrganizationMember).filter(
-            OrganizationMember.user_id == user.id
-        ).first()
+    def __init__(self, allowed_roles: list[str] | str, allow_api_keys: bool = False):
+        self.allow_api_keys = allow_api_keys
+        if isinstance(allowed_roles, str):
+            self.allowed_roles = [allowed_roles]
+        else:
+            self.allowed_roles = allowed_roles
+
+        # RBAC is hierarchical: Depends(RoleChecker("admin")) means admin OR owner,
+        # so the lowest level among the allowed roles is the one to enforce.
+        levels = [self.ROLE_HIERARCHY[role] for role in self.allowed_roles if role in self.ROLE_HIERARCHY]
+        self.min_required_level = min(levels, default=0)
+
+    async def __call__(
+        self,
+        request: Request,
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        db: Session = Depends(get_db)
+    ) -> OrganizationMember:
+        org_id = request.path_params.get("org_id")
+
+        if self.allow_api_keys and credentials.credentials.startswith(API_KEY_PREFIX):
+            member = get_api_key_membership(credentials.credentials, org_id)
+        else:
+            user = await get_current_active_user(await get_current_user(credentials, db))
+            member = get_org_membership(request, db, user.id, org_id)
 
         if not member:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not a member of any organization"
+                detail="Not a member of this organization" if org_id else "Not a member of any organization"
             )
 
-        user_role_level = self.ROLE_HIERARCHY.get(member.role, 0)
-        
-        # Check if user has ANY of the allowed roles (or higher)
-        # We can implement this as: if "admin" is allowed, then "owner" is also allowed.
-        # Let's find the minimum required level from allowed_roles.
-        
-        min_required_level = 0
-        for role in self.allowed_roles:
-            level = self.ROLE_HIERARCHY.get(role, 99)
-            if level < 99:
-                # We assume allowed_roles usually contains just one minimum role, like "admin"
-                # If multiple are passed, we might want to check against specific ones.
-                # But typically RBAC is hierarchical.
-                # If we say Depends(RoleChecker("admin")), we mean admin OR owner.
-                min_required_level = level
-                break
-        
-        if user_role_level < min_required_level:
+        if self.ROLE_HIERARCHY.get(member.role, 0) < self.min_required_level:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Insufficient permissions. Required: {self.allowed_roles}"
             )
-            
+
         return member
+
+
+def get_org_membership(
+    request: Request,
+    db: Session,
+    user_id: str,
+    org_id: Optional[str] = None
+) -> Optional[OrganizationMember]:
+    """
+    Resolve a user's membership in an organization, at most once per request.
+
+    Results are cached on ``request.state`` so several role checks on the same
+    route share a single query.
+
+    Args:
+        request: Current request
+        db: Database session
+        user_id: User ID
+        org_id: Organization ID, or None for the user's primary membership
+
+    Returns:
+        OrganizationMember if the user belongs to the organization, None otherwise
+    """
+    cache = getattr(request.state, "org_memberships", None)
+    if cache is None:
+        cache = request.state.org_memberships = {}
+
+    key = (user_id, org_id)
+    if key not in cache:
+        query = db.query(OrganizationMember).filter(OrganizationMember.user_id == user_id)
+        if org_id is not None:
+            query = query.filter(OrganizationMember.org_id == org_id)
+        cache[key] = query.first()
+
+    return cache[key]
+
+
+def get_api_key_membership(
+    secret_key: str,
+    org_id: Optional[str] = None
+) -> OrganizationMember:
+    """
+    Resolve an API key to a transient membership in the organization that owns it.
+
+    Keys are resolved from the in-memory index, so no key, valid or not, costs a query.
+
+    Args:
+        secret_key: Raw `pk_...` key from the Authorization header
+        org_id: Organization ID from the route, if any
+
+    Returns:
+        Unsaved OrganizationMember with role API_KEY_ROLE and no user
+
+    Raises:
+        HTTPException: If the key is unknown/revoked or belongs to another organization
+    """
+    api_key = api_key_index.lookup(secret_key)
+    if api_key is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if org_id is not None and api_key.org_id != org_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="API key does not belong to this organization"
+        )
+
+    api_key_index.touch(api_key.id)
+    return OrganizationMember(org_id=api_key.org_id, user_id=None, role=API_KEY_ROLE)
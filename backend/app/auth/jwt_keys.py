@@ -0,0 +1,153 @@
+"""
+Asymmetric JWT signing keys with kid-tagged rotation.
+
+Private keys are stored as PEM files in JWT_KEYS_DIR, one per key id (``<kid>.pem``).
+The newest kid (or JWT_ACTIVE_KID) signs new tokens; every key in the directory
+is accepted for verification and published on the JWKS endpoint.
+
+Rotation: drop a new key in the directory (or let the app generate one when the
+directory is empty), and remove the old key once its tokens have expired.
+Workers starting together on an empty directory serialize on a lock file, so
+only one of them generates the first key and all of them sign with it.
+"""
+
+import fcntl
+import logging
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+from jose.backends.base import Key
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Curves for the EC algorithms supported by python-jose
+_EC_CURVES = {
+    "ES256": ec.SECP256R1,
+    "ES384": ec.SECP384R1,
+    "ES512": ec.SECP521R1,
+}
+
+
+def generate_private_key_pem(algorithm: str) -> bytes:
+    """Generate a new private key suitable for the given JWS algorithm."""
+    if algorithm in _EC_CURVES:
+        private_key = ec.generate_private_key(_EC_CURVES[algorithm]())
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+
+
+class JWTKeyRing:
+    """
+    Signing and verification keys loaded from JWT_KEYS_DIR.
+
+    Parsed keys are cached; an unknown kid triggers a directory reload (at most
+    once per JWT_KEY_RELOAD_SECONDS) so keys added by another worker or during
+    rotation are picked up without a restart.
+    """
+
+    def __init__(self, keys_dir: str, algorithm: str):
+        self.keys_dir = keys_dir
+        self.algorithm = algorithm
+        self._lock = threading.Lock()
+        self._private_keys: dict[str, Key] = {}
+        self._public_keys: dict[str, Key] = {}
+        self._signing_kid: Optional[str] = None
+        self._loaded_at = 0.0
+
+    def load(self) -> None:
+        """(Re)load all keys from disk, generating a first key if none exist."""
+        os.makedirs(self.keys_dir, exist_ok=True)
+        kids = self._list_kids() or self._generate_first_key()
+
+        private_keys = {}
+        public_keys = {}
+        for kid in kids:
+            with open(os.path.join(self.keys_dir, f"{kid}.pem"), "rb") as f:
+                private_key = jwk.construct(f.read(), self.algorithm)
+            private_keys[kid] = private_key
+            public_keys[kid] = private_key.public_key()
+
+        signing_kid = settings.JWT_ACTIVE_KID or max(kids)
+        if signing_kid not in private_keys:
+            raise ValueError(f"JWT_ACTIVE_KID '{signing_kid}' not found in {self.keys_dir}")
+
+        with self._lock:
+            self._private_keys = private_keys
+            self._public_keys = public_keys
+            self._signing_kid = signing_kid
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"🔏 Loaded {len(kids)} JWT signing keys (active kid: {signing_kid})")
+
+    def signing_key(self) -> tuple[str, Key]:
+        """Return the (kid, private key) pair used to sign new tokens."""
+        if self._signing_kid is None:
+            self.load()
+        return self._signing_kid, self._private_keys[self._signing_kid]
+
+    def public_key(self, kid: Optional[str]) -> Optional[Key]:
+        """Return the cached public key for a kid, reloading once if it is unknown."""
+        if self._signing_kid is None:
+            self.load()
+        if kid is None:
+            return None
+
+        key = self._public_keys.get(kid)
+        if key is None and time.monotonic() - self._loaded_at > settings.JWT_KEY_RELOAD_SECONDS:
+            self.load()
+            key = self._public_keys.get(kid)
+        return key
+
+    def jwks(self) -> dict:
+        """Public keys as a JWK Set (RFC 7517)."""
+        if self._signing_kid is None:
+            self.load()
+        keys = []
+        for kid, public_key in sorted(self._public_keys.items()):
+            entry = public_key.to_dict()
+            entry.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+            keys.append(entry)
+        return {"keys": keys}
+
+    def _list_kids(self) -> list[str]:
+        return sorted(
+            name[:-len(".pem")] for name in os.listdir(self.keys_dir)
+            if name.endswith(".pem")
+        )
+
+    def _generate_first_key(self) -> list[str]:
+        """Generate a key for an empty directory, unless another worker just did."""
+        with open(os.path.join(self.keys_dir, ".generate.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            return self._list_kids() or [self._generate_key()]
+
+    def _generate_key(self) -> str:
+        """Write a new private key; kids sort chronologically."""
+        kid = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(4)}"
+        path = os.path.join(self.keys_dir, f"{kid}.pem")
+        tmp_path = f"{path}.tmp"
+
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(generate_private_key_pem(self.algorithm))
+        os.replace(tmp_path, path)
+
+        logger.warning(f"⚠️  Generated JWT signing key '{kid}' in {self.keys_dir}. Provision keys explicitly in production!")
+        return kid
+
+
+# Global key ring (loaded lazily on first use)
+jwt_key_ring = JWTKeyRing(settings.JWT_KEYS_DIR, settings.JWT_ALGORITHM)
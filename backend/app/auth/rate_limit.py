@@ -0,0 +1,188 @@
+"""
+Admission control for authentication endpoints.
+
+Login and register are gated by a per-IP token bucket and by the backlog of
+the password hashing pool, so over-limit requests are rejected with 429 before
+any bcrypt work is queued. Logins also take from a per-account bucket, which
+a successful login refills, so in effect it only counts failed attempts.
+
+Behind a reverse proxy every request comes from the proxy's address; list it
+in TRUSTED_PROXY_IPS and the client address is read from
+TRUSTED_PROXY_HEADER instead.
+
+Buckets live in process memory by default. Set RATE_LIMIT_REDIS_URL (and
+install `redis`) to share them across workers.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException, Request, status
+from app.core.config import settings
+from app.auth.security import password_hash_metrics
+
+
+class MemoryBucketBackend:
+    """Token buckets in a bounded LRU dict (per worker process)."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate_per_minute: int, burst: int) -> float:
+        """
+        Take one token from a bucket.
+
+        Returns:
+            0 if allowed, otherwise seconds until a token is available
+        """
+        rate = rate_per_minute / 60.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated_at) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate
+
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return retry_after
+
+    async def reset(self, key: str) -> None:
+        """Refill a bucket."""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class RedisBucketBackend:
+    """Token buckets in Redis, updated atomically with a Lua script."""
+
+    # KEYS[1] = bucket; ARGV = rate (tokens/s), burst, now (s)
+    _SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(retry_after)
+"""
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_REDIS_URL is set but the 'redis' package is not installed") from e
+
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(self._SCRIPT)
+
+    async def take(self, key: str, rate_per_minute: int, burst: int) -> float:
+        retry_after = await self._script(
+            keys=[f"piee:ratelimit:{key}"],
+            args=[rate_per_minute / 60.0, burst, time.time()]
+        )
+        return float(retry_after)
+
+    async def reset(self, key: str) -> None:
+        await self._client.delete(f"piee:ratelimit:{key}")
+
+
+def _create_backend():
+    if settings.RATE_LIMIT_REDIS_URL:
+        return RedisBucketBackend(settings.RATE_LIMIT_REDIS_URL)
+    return MemoryBucketBackend()
+
+
+# Global bucket store
+rate_limit_backend = _create_backend()
+
+
+def _too_many_requests(retry_after: float, detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+def client_ip(request: Request) -> str:
+    """
+    The client's address, as seen by the first untrusted hop.
+
+    The proxy header is only believed when the request comes from a trusted
+    proxy; its entries are read right to left, skipping other trusted proxies,
+    because only the entries proxies appended can't be forged by the client.
+    """
+    peer = request.client.host if request.client else "unknown"
+    proxies = settings.trusted_proxy_ips
+    if not (peer in proxies or "*" in proxies):
+        return peer
+
+    forwarded = [ip.strip() for ip in request.headers.get(settings.TRUSTED_PROXY_HEADER, "").split(",") if ip.strip()]
+    for ip in reversed(forwarded):
+        if "*" in proxies or ip not in proxies:
+            return ip
+    return forwarded[0] if forwarded else peer
+
+
+def _account_bucket(account: str) -> str:
+    return f"auth:account:{account.lower()}"
+
+
+async def admit_auth_attempt(request: Request, account: Optional[str] = None) -> None:
+    """
+    Admit a login/register attempt or reject it before any password hashing.
+
+    Args:
+        request: Current request (for the client IP)
+        account: Account identifier (email) a login targets; its bucket is
+            refilled by `reset_account_attempts` when the login succeeds
+
+    Raises:
+        HTTPException: 429 with Retry-After if a limit is exceeded
+    """
+    # Global cap: don't queue more bcrypt work than the pool can drain quickly
+    if password_hash_metrics.queued >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise _too_many_requests(1, "Authentication service busy, please retry")
+
+    retry_after = await rate_limit_backend.take(
+        f"auth:ip:{client_ip(request)}",
+        settings.AUTH_RATE_LIMIT_PER_IP_PER_MINUTE,
+        settings.AUTH_RATE_LIMIT_PER_IP_BURST
+    )
+    if retry_after:
+        raise _too_many_requests(retry_after, "Too many authentication attempts from this address")
+
+    if account is None:
+        return
+    retry_after = await rate_limit_backend.take(
+        _account_bucket(account),
+        settings.AUTH_RATE_LIMIT_PER_ACCOUNT_PER_MINUTE,
+        settings.AUTH_RATE_LIMIT_PER_ACCOUNT_BURST
+    )
+    if retry_after:
+        raise _too_many_requests(retry_after, "Too many failed login attempts for this account")
+
+
+async def reset_account_attempts(account: str) -> None:
+    """Forget an account's failed logins after a successful one."""
+    await rate_limit_backend.reset(_account_bucket(account))
@@ -0,0 +1,127 @@
+"""
+In-memory denylist of revoked access tokens.
+
+The `revoked_tokens` table is the source of truth. Each worker loads the live
+entries at startup, polls for entries revoked on other workers, and forgets
+entries once the token they block has expired anyway.
+"""
+
+import asyncio
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class TokenDenylist:
+    """
+    Exact set of revoked token ids (jti) with expiry-ordered pruning.
+
+    Lookups are a single dict probe, which in CPython is already cheaper than
+    hashing a token for a Bloom filter, and the set only ever holds tokens that
+    were revoked within the last ACCESS_TOKEN_EXPIRE_MINUTES.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked: dict[str, datetime] = {}
+        self._expiry_heap: list[tuple[datetime, str]] = []
+        self._synced_until: Optional[datetime] = None
+
+    def contains(self, jti: Optional[str]) -> bool:
+        """Check whether a token id has been revoked."""
+        return jti is not None and jti in self._revoked
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        """Deny a token id until it expires."""
+        with self._lock:
+            if jti not in self._revoked:
+                self._revoked[jti] = expires_at
+                heapq.heappush(self._expiry_heap, (expires_at, jti))
+
+    def revoke(self, db: Session, jti: str, expires_at: datetime) -> None:
+        """Persist a revocation and apply it to this worker immediately."""
+        if db.get(RevokedToken, jti) is None:
+            db.add(RevokedToken(jti=jti, expires_at=expires_at))
+            db.commit()
+        self.add(jti, expires_at)
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Drop entries whose tokens have expired. Returns the number removed."""
+        now = now or datetime.utcnow()
+        removed = 0
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, jti = heapq.heappop(self._expiry_heap)
+                self._revoked.pop(jti, None)
+                removed += 1
+        return removed
+
+    def load(self, db: Session) -> None:
+        """Rebuild from the database, deleting rows that have already expired."""
+        now = datetime.utcnow()
+        db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+        db.commit()
+
+        rows = db.query(RevokedToken.jti, RevokedToken.expires_at).all()
+        with self._lock:
+            self._revoked = {row.jti: row.expires_at for row in rows}
+            self._expiry_heap = [(row.expires_at, row.jti) for row in rows]
+            heapq.heapify(self._expiry_heap)
+            self._synced_until = now - timedelta(seconds=settings.REVOCATION_SYNC_OVERLAP_SECONDS)
+        logger.info(f"🚫 Loaded {len(rows)} revoked tokens")
+
+    def sync(self, db: Session) -> int:
+        """
+        Pull revocations recorded by other workers since the last sync.
+
+        `created_at` is stamped before the row commits, so a revocation can
+        become visible after a sync whose window already covers its timestamp.
+        Each window therefore starts REVOCATION_SYNC_OVERLAP_SECONDS before the
+        previous sync; `add` ignores ids seen already.
+        """
+        now = datetime.utcnow()
+        query = db.query(RevokedToken.jti, RevokedToken.expires_at).filter(RevokedToken.expires_at > now)
+        if self._synced_until is not None:
+            query = query.filter(RevokedToken.created_at >= self._synced_until)
+        rows = query.all()
+
+        for row in rows:
+            self.add(row.jti, row.expires_at)
+        self._synced_until = now - timedelta(seconds=settings.REVOCATION_SYNC_OVERLAP_SECONDS)
+        return len(rows)
+
+
+# Global denylist consulted by get_current_user
+token_denylist = TokenDenylist()
+
+
+async def run_denylist_maintenance() -> None:
+    """
+    Background loop that syncs revocations from the database and prunes
+    expired entries. Started from the application startup hook.
+    """
+    from app.db.session import SessionLocal
+
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(settings.TOKEN_DENYLIST_SYNC_SECONDS)
+        try:
+            await loop.run_in_executor(None, _sync_denylist, SessionLocal)
+            token_denylist.prune()
+        except Exception as e:
+            logger.error(f"Token denylist sync failed: {e}")
+
+
+def _sync_denylist(session_factory) -> None:
+    db = session_factory()
+    try:
+        token_denylist.sync(db)
+    finally:
+        db.close()
@@ -3,11 +3,90 @@ Security utilities for authentication and password management.
 Handles JWT token generation/validation and password hashing.
 """
 
+import asyncio
+import hashlib
+import logging
+import secrets
+import threading
+import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 import bcrypt
 from jose import JWTError, jwt
 from app.core.config import settings
+from app.auth.jwt_keys import jwt_key_ring
+
+logger = logging.getLogger(__name__)
+
+# Dedicated pool for bcrypt so hashing never runs on the event loop.
+# Its size caps how many CPU cores login/register can occupy at once.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+
+
+class PasswordHashMetrics:
+    """Counters for the password hashing pool (queue time, run time, backlog)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.queued = 0
+        self.total_queue_ms = 0.0
+        self.max_queue_ms = 0.0
+        self.total_run_ms = 0.0
+
+    def submitted(self) -> None:
+        with self._lock:
+            self.queued += 1
+
+    def record(self, queue_ms: float, run_ms: float) -> None:
+        with self._lock:
+            self.queued -= 1
+            self.completed += 1
+            self.total_queue_ms += queue_ms
+            self.max_queue_ms = max(self.max_queue_ms, queue_ms)
+            self.total_run_ms += run_ms
+
+    def snapshot(self) -> dict:
+        """Return current values for reporting."""
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": settings.PASSWORD_HASH_WORKERS,
+                "queued": self.queued,
+                "completed": self.completed,
+                "avg_queue_ms": round(self.total_queue_ms / completed, 2),
+                "max_queue_ms": round(self.max_queue_ms, 2),
+                "avg_run_ms": round(self.total_run_ms / completed, 2),
+            }
+
+
+password_hash_metrics = PasswordHashMetrics()
+
+
+async def _run_in_hash_pool(func, *args):
+    """Run a bcrypt call on the hashing pool and record queue/run times."""
+    submitted_at = time.perf_counter()
+    password_hash_metrics.submitted()
+
+    def timed():
+        started_at = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished_at = time.perf_counter()
+            queue_ms = (started_at - submitted_at) * 1000
+            password_hash_metrics.record(queue_ms, (finished_at - started_at) * 1000)
+            if queue_ms > settings.PASSWORD_HASH_QUEUE_WARN_MS:
+                logger.warning(f"Password hash waited {queue_ms:.0f}ms for a worker")
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, timed)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -35,11 +114,32 @@ def get_password_hash(password: str) -> str:
     # We truncate to 72 bytes to be compatible with bcrypt's limit
     password_bytes = password_bytes[:72]
     
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash was made with a different cost than BCRYPT_ROUNDS.
+    Hashes look like ``$2b$12$<salt+digest>``; the third field is the cost.
+    """
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool without blocking the event loop."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the hashing pool without blocking the event loop."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token.
@@ -59,11 +159,33 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    to_encode.setdefault("jti", uuid.uuid4().hex)  # Lets the token be revoked individually
+    
+    if settings.jwt_is_asymmetric:
+        kid, signing_key = jwt_key_ring.signing_key()
+        encoded_jwt = jwt.encode(to_encode, signing_key, algorithm=settings.JWT_ALGORITHM, headers={"kid": kid})
+    else:
+        encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     
     return encoded_jwt
 
 
+def create_refresh_token() -> tuple[str, str]:
+    """
+    Create an opaque refresh token.
+    
+    Returns:
+        Tuple of (token for the client, hash to store in the sessions table)
+    """
+    token = secrets.token_urlsafe(48)
+    return token, hash_refresh_token(token)
+
+
+def hash_refresh_token(token: str) -> str:
+    """Hash a refresh token for lookup; refresh tokens are never stored in plain text."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def decode_access_token(token: str) -> Optional[dict]:
     """
     Decode and validate a JWT access token.
@@ -75,7 +197,14 @@ def decode_access_token(token: str) -> Optional[dict]:
         Decoded token payload if valid, None otherwise
     """
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        if settings.jwt_is_asymmetric:
+            # Select the cached public key by the token's kid
+            key = jwt_key_ring.public_key(jwt.get_unverified_header(token).get("kid"))
+            if key is None:
+                return None
+        else:
+            key = settings.JWT_SECRET_KEY
+        payload = jwt.decode(token, key, algorithms=[settings.JWT_ALGORITHM])
         return payload
     except JWTError:
         return None
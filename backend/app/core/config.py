@@ -13,15 +13,101 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./data/piee.db"
+    DB_AUTO_MIGRATE: bool = False  # Apply pending migrations at startup (single-process setups only)
+    
+    # Connection pools (PostgreSQL/MySQL primary and replicas)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a connection before failing
+    DB_POOL_RECYCLE: int = 1800  # Reconnect connections older than this (-1 to disable)
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WAIT_WARN_MS: int = 100  # Log checkouts that waited longer than this
+    
+    # Per-request query accounting
+    DB_QUERY_HEADERS: bool = False  # Add X-DB-Query-Count / X-DB-Query-Time-Ms to responses
+    DB_QUERY_WARN_THRESHOLD: int = 20  # Default per-request query budget
+    DB_REPEATED_QUERY_THRESHOLD: int = 5  # Same statement this often in one request = likely N+1
+    DB_ECHO: bool = False  # Log every SQL statement
+    SLOW_QUERY_MS: int = 200  # Log statements slower than this
+    SLOW_QUERY_EXPLAIN: bool = False  # Include the query plan of slow SELECTs
+    
+    # SQLite tuning (applied on every connection)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Durable with WAL except on power loss
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE: int = 268435456  # 256MB
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_READ_POOL_SIZE: int = 8
+    SQLITE_READ_MAX_OVERFLOW: int = 64  # Extra short-lived read connections when all pooled ones are busy
+    SQLITE_WRITER_TIMEOUT_SECONDS: int = 30  # Max wait for the single writer connection
+    
+    # Read replicas (comma-separated URLs); read-only endpoints use them when set
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_STICKY_SECONDS: int = 5  # Clients read from the primary this long after writing
+    REPLICA_MAX_LAG_SECONDS: float = 5.0  # Replicas further behind are skipped
+    REPLICA_LAG_CHECK_SECONDS: int = 5
+    
+    # Monitoring
+    METRICS_TOKEN: Optional[str] = None  # Bearer token for GET /metrics; the endpoint is disabled when unset
     
     # Security
-    JWT_SECRET_KEY: str = "change-this-to-a-random-secret-key-in-production"
-    JWT_ALGORITHM: str = "HS256"
+    JWT_SECRET_KEY: str = "change-this-to-a-random-secret-key-in-production"  # Only used with HS* algorithms
+    JWT_ALGORITHM: str = "HS256"  # HS* sign with JWT_SECRET_KEY; RS*/ES* (opt-in) with the key ring below
+    JWT_KEYS_DIR: str = "./data/jwt_keys"  # Private keys as <kid>.pem
+    JWT_ACTIVE_KID: Optional[str] = None  # Defaults to the newest kid
+    JWT_KEY_RELOAD_SECONDS: int = 60  # Min interval between reloads on unknown kid
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    TOKEN_DENYLIST_SYNC_SECONDS: int = 10  # How quickly revocations reach other workers
+    REVOCATION_SYNC_OVERLAP_SECONDS: int = 120  # Each sync re-reads this much of the last window, for late commits
+    
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # Existing hashes are upgraded on next login when this changes
+    PASSWORD_HASH_WORKERS: int = 2  # Max concurrent bcrypt operations per worker process
+    PASSWORD_HASH_QUEUE_WARN_MS: int = 500
+    PASSWORD_HASH_MAX_PENDING: int = 32  # Reject auth attempts with 429 beyond this backlog
+    
+    # Auth rate limiting (token buckets)
+    AUTH_RATE_LIMIT_PER_IP_PER_MINUTE: int = 20
+    AUTH_RATE_LIMIT_PER_IP_BURST: int = 10
+    AUTH_RATE_LIMIT_PER_ACCOUNT_PER_MINUTE: int = 5  # Failed logins only; a successful login resets it
+    AUTH_RATE_LIMIT_PER_ACCOUNT_BURST: int = 5
+    TRUSTED_PROXY_IPS: str = ""  # Comma-separated peers whose TRUSTED_PROXY_HEADER is believed ("*" = any)
+    TRUSTED_PROXY_HEADER: str = "X-Forwarded-For"  # Client address as appended by the proxy
+    RATE_LIMIT_REDIS_URL: Optional[str] = None  # Share buckets across workers (requires redis)
+    
+    # API Keys
+    API_KEY_FLUSH_INTERVAL_SECONDS: int = 30  # Batch window for last_used_at writes
+    API_KEY_SYNC_SECONDS: int = 10  # How quickly new and revoked keys reach other workers
+    API_KEY_INDEX_REFRESH_SECONDS: int = 60  # Full reload (also drops keys deleted with their organization)
+    
+    # Encryption (provider keys)
+    ENCRYPTION_MASTER_KEY: Optional[str] = None  # Comma-separated, newest first, for rotation
+    ENCRYPTION_KEY_FILE: str = "./data/encryption.key"  # Generated dev key when no master key is set
+    PROVIDER_KEY_CACHE_TTL_SECONDS: int = 60  # 0 disables caching of decrypted keys
+    PROVIDER_KEY_CACHE_MAX_ENTRIES: int = 1000
+    PROMPT_VERSION_CACHE_MAX_ENTRIES: int = 2000  # Versions are immutable, so no TTL
+    
+    # Prompt library import/export
+    PROMPT_IMPORT_MAX_BYTES: int = 104857600  # 100MB of JSONL per import
+    PROMPT_EXPORT_BATCH_SIZE: int = 500  # Prompts loaded per query while streaming an export
     
     # File Storage
     UPLOAD_DIR: str = "./data/uploads"
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 1048576  # Bytes buffered per disk write while streaming an upload
+    RESUMABLE_UPLOAD_MAX_SIZE: int = 10737418240  # 10GB per resumable upload
+    RESUMABLE_UPLOAD_EXPIRE_HOURS: int = 24  # Sessions without new chunks for this long are deleted
+    RESUMABLE_UPLOAD_CLEANUP_SECONDS: int = 600
+    METADATA_WORKERS: int = 2  # Processes extracting media metadata after upload
+    METADATA_TIMEOUT_SECONDS: int = 120  # Jobs running longer are killed (extraction is marked failed)
+    THUMBNAIL_WIDTHS: str = "160,320,640,1280"  # Variant widths; requested widths snap up to one of these
+    THUMBNAIL_DEFAULT_WIDTH: int = 320  # Rendered on upload and linked as thumbnail_url
+    THUMBNAIL_QUALITY: int = 80  # WebP quality of variants
+    DERIVED_CACHE_MAX_BYTES: int = 1073741824  # 1GB of thumbnails; least recently served are evicted
+    DERIVED_CACHE_SWEEP_SECONDS: int = 300
+    FFMPEG_PATH: str = "ffmpeg"  # Used for video poster frames; without it videos have no thumbnail
     
     # CORS
     FRONTEND_URL: str = "http://localhost:3000"
@@ -37,6 +123,21 @@ class Settings(BaseSettings):
         extra="allow"
     )
     
+    @property
+    def jwt_is_asymmetric(self) -> bool:
+        """Check if JWTs are signed with a public/private key pair."""
+        return not self.JWT_ALGORITHM.startswith("HS")
+    
+    @property
+    def replica_urls(self) -> list[str]:
+        """Configured read replica URLs."""
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+    
+    @property
+    def trusted_proxy_ips(self) -> set[str]:
+        """Reverse proxies allowed to report the client address."""
+        return {ip.strip() for ip in self.TRUSTED_PROXY_IPS.split(",") if ip.strip()}
+    
     @property
     def is_sqlite(self) -> bool:
         """Check if using SQLite database."""
@@ -4,9 +4,11 @@ Automatically detects and configures SQLite, PostgreSQL, or MySQL.
 """
 
 import logging
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import declarative_base
 from app.core.config import settings
+from app.db.pool_metrics import InstrumentedQueuePool, instrument_pool
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +16,42 @@ logger = logging.getLogger(__name__)
 Base = declarative_base()
 
 
+class WriterHeldError(RuntimeError):
+    """Raised when a thread asks for the SQLite writer while it already holds it."""
+
+
+class SQLiteWriterPool(InstrumentedQueuePool):
+    """
+    Pool for the single SQLite writer connection.
+    
+    Async handlers run their (synchronous) queries on the event loop thread, so
+    waiting for the writer blocks the loop. That is only safe while the holder
+    is another thread: a coroutine on the loop that awaits mid-transaction
+    can't resume to release the writer while the loop is blocked. Writes must
+    therefore commit before awaiting, and a checkout by the thread that
+    already holds the writer raises at once instead of stalling the loop until
+    SQLITE_WRITER_TIMEOUT_SECONDS.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._holder = None
+    
+    def _do_get(self):
+        if self._holder == threading.get_ident():
+            raise WriterHeldError(
+                "SQLite writer requested by the thread already holding it; "
+                "commit before awaiting (or before opening a second session)"
+            )
+        connection = super()._do_get()
+        self._holder = threading.get_ident()
+        return connection
+    
+    def _do_return_conn(self, record):
+        self._holder = None
+        super()._do_return_conn(record)
+
+
 def get_engine():
     """
     Create SQLAlchemy engine with appropriate configuration based on database URL.
@@ -28,21 +66,26 @@ def get_engine():
     if settings.is_sqlite:
         db_path = database_url.replace("sqlite:///", "")
         logger.info(f"📦 Using SQLite database: {db_path}")
+        # Single writer connection: SQLite allows one writer at a time, so writes
+        # queue here instead of failing with "database is locked"
         engine = create_engine(
             database_url,
             connect_args={"check_same_thread": False},  # Required for SQLite
-            echo=False  # Set to True for SQL query logging
+            poolclass=SQLiteWriterPool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=settings.SQLITE_WRITER_TIMEOUT_SECONDS,
+            echo=settings.DB_ECHO  # Log every statement (debugging only)
         )
+        configure_sqlite_engine(engine, read_only=False)
     
     # PostgreSQL configuration
     elif settings.is_postgres:
         logger.info("🐘 Using PostgreSQL database")
         engine = create_engine(
             database_url,
-            pool_pre_ping=True,  # Verify connections before using
-            pool_size=5,
-            max_overflow=10,
-            echo=False
+            **get_pool_options(),
+            echo=settings.DB_ECHO
         )
     
     # MySQL configuration
@@ -50,27 +93,112 @@ def get_engine():
         logger.info("🐬 Using MySQL database")
         engine = create_engine(
             database_url,
-            pool_pre_ping=True,
-            pool_size=5,
-            max_overflow=10,
-            echo=False
+            **get_pool_options(),
+            echo=settings.DB_ECHO
         )
     
     else:
         raise ValueError(f"Unsupported database URL: {database_url}")
     
+    instrument_pool(engine, "primary")
     return engine
 
 
-# Create global engine instance
+def get_pool_options() -> dict:
+    """Connection pool settings for server databases (primary and replicas)."""
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,  # Verify connections before using
+    }
+
+
+def get_read_engine(primary_engine):
+    """
+    Create the engine used for read-only queries.
+    SQLite gets a pool of query-only connections next to the single writer;
+    other databases read from the primary engine.
+    """
+    if not settings.is_sqlite:
+        return primary_engine
+    
+    # Requests hold their read connection across awaits, so a full pool would block
+    # the loop that has to release it; overflow connections are cheap for SQLite
+    read_engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=settings.SQLITE_READ_MAX_OVERFLOW,
+        echo=settings.DB_ECHO
+    )
+    configure_sqlite_engine(read_engine, read_only=True)
+    instrument_pool(read_engine, "read")
+    return read_engine
+
+
+def configure_sqlite_engine(engine, read_only: bool) -> None:
+    """
+    Apply the production SQLite profile to every new connection:
+    WAL journaling, relaxed fsync, larger page cache and mmap, busy timeout.
+    
+    Foreign keys are enforced (SQLite leaves them off by default), so
+    ON DELETE CASCADE / SET NULL behave as on PostgreSQL and MySQL, and
+    inserts referencing missing rows fail with IntegrityError.
+    
+    Transactions are started explicitly; the writer uses BEGIN IMMEDIATE so it takes
+    the write lock up front (waiting up to busy_timeout) rather than failing
+    mid-transaction when a deferred read lock can't be upgraded.
+    """
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # Disable pysqlite's implicit transaction handling; the "begin" hook below emits BEGIN
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    
+    @event.listens_for(engine, "begin")
+    def begin_transaction(conn):
+        conn.exec_driver_sql("BEGIN" if read_only else "BEGIN IMMEDIATE")
+
+
+def get_replica_engines() -> list:
+    """Create engines for the read replicas in DATABASE_REPLICA_URLS."""
+    engines = []
+    for i, url in enumerate(settings.replica_urls, start=1):
+        replica = create_engine(url, **get_pool_options(), echo=settings.DB_ECHO)
+        instrument_pool(replica, f"replica_{i}")
+        engines.append(replica)
+    if engines:
+        logger.info(f"📚 Using {len(engines)} read replica(s)")
+    return engines
+
+
+# Create global engine instances
 engine = get_engine()
+read_engine = get_read_engine(engine)
+replica_engines = get_replica_engines()
 
 
 def init_db():
     """
-    Initialize database by creating all tables.
-    This should be called on application startup.
+    Bring the database schema up to date by applying migrations.
+    Run once before starting workers (e.g. `python -m app.db.migrate`), not on every boot.
     """
-    logger.info("🔧 Initializing database tables...")
-    Base.metadata.create_all(bind=engine)
+    from app.db.migrate import run_migrations
+    
+    logger.info("🔧 Migrating database schema...")
+    run_migrations()
     logger.info("✅ Database initialized successfully")
@@ -0,0 +1,84 @@
+"""
+Schema migrations (Alembic).
+
+Run once per deploy, before starting the API workers:
+    python -m app.db.migrate
+
+Workers only compare the database revision with the migration head at startup
+(see `check_schema_version`), so scaling out never races on DDL.
+"""
+
+import logging
+import os
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from app.core.config import settings
+from app.db.base import engine
+
+logger = logging.getLogger(__name__)
+
+# backend/alembic.ini
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+# Revision matching databases created by create_all before migrations existed
+BASELINE_REVISION = "0001"
+
+
+def get_alembic_config(configure_logger: bool = False) -> Config:
+    """Alembic config bound to backend/alembic.ini."""
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = configure_logger
+    return config
+
+
+def get_current_revision() -> str | None:
+    """Revision recorded in the database's alembic_version table."""
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def get_head_revision() -> str | None:
+    """Latest revision in alembic/versions."""
+    return ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+
+
+def run_migrations(configure_logger: bool = False) -> None:
+    """Upgrade the database to the latest revision."""
+    config = get_alembic_config(configure_logger)
+
+    # Adopt databases created by create_all: mark them as the baseline first
+    if get_current_revision() is None and inspect(engine).has_table("users"):
+        logger.info(f"📌 Existing unversioned database, stamping baseline {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+
+    command.upgrade(config, "head")
+
+
+def check_schema_version() -> None:
+    """
+    Verify the database is at the migration head.
+
+    Raises:
+        RuntimeError: If migrations are pending and DB_AUTO_MIGRATE is off
+    """
+    current, head = get_current_revision(), get_head_revision()
+    if current == head:
+        return
+
+    if settings.DB_AUTO_MIGRATE:
+        logger.info(f"🔧 Migrating database schema {current} -> {head}")
+        run_migrations()
+        return
+
+    raise RuntimeError(
+        f"Database schema is at revision {current}, expected {head}. "
+        f"Run `python -m app.db.migrate` before starting the API."
+    )
+
+
+if __name__ == "__main__":
+    run_migrations(configure_logger=True)
+    print(f"✅ Database at revision {get_current_revision()}")
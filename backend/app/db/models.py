@@ -3,23 +3,23 @@ SQLAlchemy database models for PIEE platform.
 Replaces Supabase tables with internal database schema.
 """
 
-import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, Integer, DateTime, Text, ForeignKey
+from sqlalchemy import BigInteger, Column, String, Boolean, Integer, DateTime, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db.base import Base
+from app.db.types import UUIDType, uuid7
 
 
 def generate_uuid():
-    """Generate UUID as string for compatibility across databases."""
-    return str(uuid.uuid4())
+    """Generate a time-ordered id (UUIDv7) as a canonical string."""
+    return str(uuid7())
 
 
 class User(Base):
     """User account model."""
     __tablename__ = "users"
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
     email = Column(String(255), unique=True, nullable=False, index=True)
     hashed_password = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
@@ -48,7 +48,7 @@ class Organization(Base):
     """Organization model for multi-tenancy."""
     __tablename__ = "organizations"
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
     name = Column(String(255), nullable=False)
     slug = Column(String(255), unique=True, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -65,10 +65,14 @@ class Organization(Base):
 class OrganizationMember(Base):
     """Link between Users and Organizations with roles."""
     __tablename__ = "organization_members"
-    
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    org_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
-    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    __table_args__ = (
+        UniqueConstraint("org_id", "user_id", name="uq_organization_members_org_id_user_id"),
+        Index("ix_organization_members_user_id", "user_id"),
+    )
+    
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    org_id = Column(UUIDType(), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(UUIDType(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     role = Column(String(50), default="member", nullable=False) # owner, member, api_consumer
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
@@ -80,25 +84,36 @@ class OrganizationMember(Base):
 class Prompt(Base):
     """Prompt management model."""
     __tablename__ = "prompts"
+    __table_args__ = (Index("ix_prompts_org_id_slug", "org_id", "slug"),)
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    org_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    org_id = Column(UUIDType(), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(255), nullable=False)
     slug = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=True)
+    # Maintained by create_prompt_version: last version number issued and the newest version
+    version_count = Column(Integer, default=0, server_default="0", nullable=False)
+    latest_version_id = Column(
+        UUIDType(),
+        ForeignKey("prompt_versions.id", ondelete="SET NULL", use_alter=True, name="fk_prompts_latest_version_id"),
+        nullable=True
+    )
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     # Relationships
     organization = relationship("Organization", back_populates="prompts")
-    versions = relationship("PromptVersion", back_populates="prompt", cascade="all, delete-orphan")
+    versions = relationship(
+        "PromptVersion", back_populates="prompt", cascade="all, delete-orphan", foreign_keys="PromptVersion.prompt_id"
+    )
 
 
 class PromptVersion(Base):
     """Immutable versioning for prompts."""
     __tablename__ = "prompt_versions"
+    __table_args__ = (UniqueConstraint("prompt_id", "version", name="uq_prompt_versions_prompt_id_version"),)
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    prompt_id = Column(String(36), ForeignKey("prompts.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    prompt_id = Column(UUIDType(), ForeignKey("prompts.id", ondelete="CASCADE"), nullable=False)
     version = Column(Integer, nullable=False)
     content = Column(Text, nullable=False) # Content with ${variable} placeholders
     model = Column(String(100), nullable=False)
@@ -107,18 +122,19 @@ class PromptVersion(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     # Relationships
-    prompt = relationship("Prompt", back_populates="versions")
+    prompt = relationship("Prompt", back_populates="versions", foreign_keys=[prompt_id])
 
 
 class Generation(Base):
     """Immutable log of prompt executions."""
     __tablename__ = "generations"
+    __table_args__ = (Index("ix_generations_org_id_created_at", "org_id", "created_at"),)
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    org_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
-    prompt_id = Column(String(36), ForeignKey("prompts.id", ondelete="SET NULL"), nullable=True)
-    prompt_version_id = Column(String(36), ForeignKey("prompt_versions.id", ondelete="SET NULL"), nullable=True)
-    user_id = Column(String(36), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    org_id = Column(UUIDType(), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    prompt_id = Column(UUIDType(), ForeignKey("prompts.id", ondelete="SET NULL"), nullable=True)
+    prompt_version_id = Column(UUIDType(), ForeignKey("prompt_versions.id", ondelete="SET NULL"), nullable=True)
+    user_id = Column(UUIDType(), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     
     input_variables = Column(Text, nullable=True) # JSON of provided variables
     output_text = Column(Text, nullable=False)
@@ -136,9 +152,11 @@ class Generation(Base):
 class CreditLedger(Base):
     """Append-only credit ledger for balance calculation."""
     __tablename__ = "credit_ledger"
+    # Covers the balance SUM(amount) per org without touching the table
+    __table_args__ = (Index("ix_credit_ledger_org_id_amount", "org_id", "amount"),)
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    org_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    org_id = Column(UUIDType(), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
     amount = Column(Integer, nullable=False) # Positive for recharge, negative for usage
     description = Column(String(255), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -151,14 +169,15 @@ class APIKey(Base):
     """Hashed API keys for secure developer access."""
     __tablename__ = "api_keys"
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    org_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    org_id = Column(UUIDType(), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
     key_hash = Column(String(255), unique=True, nullable=False, index=True)
     name = Column(String(255), nullable=False)
     prefix = Column(String(10), nullable=False) # e.g., 'pk_...'
     last_used_at = Column(DateTime, nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    revoked_at = Column(DateTime, nullable=True, index=True)  # Other workers poll this to drop revoked keys
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # ...and this to add new ones
     
     # Relationships
     organization = relationship("Organization", back_populates="api_keys")
@@ -167,12 +186,14 @@ class APIKey(Base):
 class ProviderKey(Base):
     """Provider API key model for BYOK (Bring Your Own Key)."""
     __tablename__ = "provider_keys"
+    __table_args__ = (Index("ix_provider_keys_org_id_provider_is_active", "org_id", "provider", "is_active"),)
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    org_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    org_id = Column(UUIDType(), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
     provider = Column(String(50), nullable=False)  # openai, anthropic, google, etc.
     key_name = Column(String(255), nullable=False)  # User-friendly name
     encrypted_key = Column(Text, nullable=False)  # Encrypted API key
+    key_version = Column(Integer, nullable=True)  # OrganizationDataKey.version; NULL = legacy master-key encryption
     key_prefix = Column(String(20), nullable=True)  # First few chars for identification
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -182,13 +203,44 @@ class ProviderKey(Base):
     organization = relationship("Organization", back_populates="provider_keys")
 
 
+class OrganizationDataKey(Base):
+    """Per-organization data encryption key, stored wrapped by the master key."""
+    __tablename__ = "organization_data_keys"
+    __table_args__ = (UniqueConstraint("org_id", "version"),)
+    
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    org_id = Column(UUIDType(), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    wrapped_key = Column(Text, nullable=False)  # Data key encrypted under the master key
+    master_key_id = Column(String(16), nullable=False)  # Fingerprint of the wrapping master key
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Relationships
+    organization = relationship("Organization", backref="data_keys")
+
+
+class KeyRotationJob(Base):
+    """Progress of a resumable bulk re-encryption of provider keys."""
+    __tablename__ = "key_rotation_jobs"
+    
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    org_id = Column(UUIDType(), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=True, index=True)  # NULL = all orgs
+    status = Column(String(20), default="pending", nullable=False)  # pending, running, completed, failed
+    cursor = Column(UUIDType(), nullable=True)  # Last processed ProviderKey.id
+    processed = Column(Integer, default=0, nullable=False)
+    total = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
 # Existing models kept for now
 class Session(Base):
-    """Authentication session model for JWT tokens."""
+    """Refresh-token session; `token` holds the SHA-256 hash of the refresh token."""
     __tablename__ = "sessions"
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    user_id = Column(UUIDType(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     token = Column(String(500), unique=True, nullable=False, index=True)
     expires_at = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -197,12 +249,22 @@ class Session(Base):
     user = relationship("User", back_populates="sessions")
 
 
+class RevokedToken(Base):
+    """Access tokens revoked before expiry (source of the in-memory denylist)."""
+    __tablename__ = "revoked_tokens"
+    
+    jti = Column(String(36), primary_key=True)  # Token id, not a row id
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
 class Workspace(Base):
     """Workspace model for organizing user content."""
     __tablename__ = "workspaces"
+    __table_args__ = (Index("ix_workspaces_user_id_created_at", "user_id", "created_at"),)
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    user_id = Column(UUIDType(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -213,19 +275,39 @@ class Workspace(Base):
     files = relationship("File", back_populates="workspace", cascade="all, delete-orphan")
 
 
+class Blob(Base):
+    """
+    Content-addressed file contents, stored once and shared by every File with
+    the same SHA-256. `ref_count` is the number of File rows pointing at it.
+    """
+    __tablename__ = "blobs"
+    
+    sha256 = Column(String(64), primary_key=True)  # Hex digest
+    size_bytes = Column(BigInteger, nullable=False)
+    storage_path = Column(String(500), nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class File(Base):
     """File metadata model for file storage tracking."""
     __tablename__ = "files"
-    
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    workspace_id = Column(String(36), ForeignKey("workspaces.id", ondelete="SET NULL"), nullable=True)
+    __table_args__ = (
+        Index("ix_files_user_id_created_at", "user_id", "created_at"),
+        Index("ix_files_user_id_workspace_id_created_at", "user_id", "workspace_id", "created_at"),
+    )
+    
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    user_id = Column(UUIDType(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    workspace_id = Column(UUIDType(), ForeignKey("workspaces.id", ondelete="SET NULL"), nullable=True)
     filename = Column(String(255), nullable=False)  # Stored filename
     original_filename = Column(String(255), nullable=False)  # Original upload name
     storage_path = Column(String(500), nullable=False)  # Full path to file
+    content_hash = Column(String(64), ForeignKey("blobs.sha256", name="fk_files_content_hash"), nullable=True, index=True)  # NULL for files stored before dedup
     mime_type = Column(String(100), nullable=False)
-    size_bytes = Column(Integer, nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
     meta_data = Column(Text, nullable=True)  # JSON string of metadata (duration, resolution, etc.)
+    metadata_status = Column(String(20), default="ready", server_default="ready", nullable=False)  # pending, ready, failed
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     # Relationships
@@ -233,6 +315,23 @@ class File(Base):
     workspace = relationship("Workspace", back_populates="files")
 
 
+class UploadSession(Base):
+    """Resumable upload in progress; chunks are written in place to a staging file."""
+    __tablename__ = "upload_sessions"
+    
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    user_id = Column(UUIDType(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    workspace_id = Column(UUIDType(), ForeignKey("workspaces.id", ondelete="SET NULL"), nullable=True)
+    filename = Column(String(255), nullable=False)  # Original upload name
+    size_bytes = Column(BigInteger, nullable=False)  # Declared total length
+    received_ranges = Column(Text, default="[]", nullable=False)  # JSON list of merged [start, end) byte ranges
+    bytes_received = Column(BigInteger, default=0, nullable=False)
+    staging_path = Column(String(500), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # Pushed back on every chunk
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
 class Waitlist(Base):
     """Waitlist model for early signups."""
     __tablename__ = "waitlist"
@@ -246,8 +345,8 @@ class OnboardingProgress(Base):
     """Track user onboarding progress."""
     __tablename__ = "onboarding_progress"
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    user_id = Column(UUIDType(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
     
     # Step completion flags
     profile_completed = Column(Boolean, default=False, nullable=False)
@@ -268,11 +367,11 @@ class OrganizationInvitation(Base):
     """Invitations to join organizations."""
     __tablename__ = "organization_invitations"
     
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    org_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
+    id = Column(UUIDType(), primary_key=True, default=generate_uuid)
+    org_id = Column(UUIDType(), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
     email = Column(String(255), nullable=False, index=True)
     role = Column(String(50), default="member", nullable=False)
-    invited_by = Column(String(36), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    invited_by = Column(UUIDType(), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     token = Column(String(255), unique=True, nullable=False, index=True)
     status = Column(String(20), default="pending", nullable=False)  # pending, accepted, expired
     expires_at = Column(DateTime, nullable=False)
@@ -0,0 +1,146 @@
+"""
+Connection pool instrumentation.
+
+Every engine is created with InstrumentedQueuePool, which times how long
+checkouts wait for a free connection. Pool events count checkouts,
+new connections, overflow use and invalidations. Snapshots are served on
+/metrics so pool sizes can be tuned from observed waits.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the checkout wait histogram buckets; the last bucket is open-ended
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """Counters for one connection pool."""
+
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.peak_in_use = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, wait_ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.wait_histogram[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+        if wait_ms >= settings.DB_POOL_WAIT_WARN_MS:
+            logger.warning(f"⚠️  Waited {wait_ms:.0f}ms for a '{self.name}' DB connection ({self.pool.status()})")
+
+    @property
+    def pool(self) -> QueuePool:
+        # Looked up each time: engine.dispose() replaces the pool
+        return self.engine.pool
+
+    def checked_out(self) -> None:
+        in_use = self.pool.checkedout()
+        with self._lock:
+            self.checkouts += 1
+            if self.pool.overflow() > 0:
+                self.overflow_checkouts += 1
+            self.peak_in_use = max(self.peak_in_use, in_use)
+
+    def connected(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def invalidated(self) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        """Return current values for reporting."""
+        with self._lock:
+            checkouts = self.checkouts or 1
+            labels = [f"le_{bound}ms" for bound in WAIT_BUCKETS_MS] + ["inf"]
+            return {
+                "size": self.pool.size(),
+                "max_overflow": self.pool._max_overflow,
+                "in_use": self.pool.checkedout(),
+                "idle": self.pool.checkedin(),
+                "overflow": max(self.pool.overflow(), 0),
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_ms / checkouts, 3),
+                "max_wait_ms": round(self.max_wait_ms, 2),
+                "wait_histogram": dict(zip(labels, self.wait_histogram)),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_wait((time.perf_counter() - started_at) * 1000, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait((time.perf_counter() - started_at) * 1000)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+# Metrics for every instrumented pool, by name
+pool_metrics: dict[str, PoolMetrics] = {}
+
+
+def instrument_pool(engine, name: str) -> None:
+    """Attach metrics to an engine created with poolclass=InstrumentedQueuePool."""
+    metrics = PoolMetrics(name, engine)
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checked_out()
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connected()
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidated()
+
+    pool_metrics[name] = metrics
+
+
+def pool_metrics_snapshot() -> dict:
+    """Snapshots of all instrumented pools for /metrics."""
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
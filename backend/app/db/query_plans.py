@@ -0,0 +1,160 @@
+"""
+Query plan checks for the hot query paths.
+
+Each query below mirrors one issued by a router or the auth layer. `check_plans`
+runs EXPLAIN for each of them on the configured database and reports any that
+would read a whole table instead of using an index. The test suite runs it
+(tests/test_query_plans.py); to check a migrated database by hand:
+    python -m app.db.query_plans
+
+On PostgreSQL sequential scans are disabled for the check, so small or empty
+tables don't hide a missing index behind a cheaper seq scan.
+"""
+
+import json
+import sys
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from app.db.base import engine
+from app.db.models import (
+    APIKey,
+    CreditLedger,
+    File,
+    Generation,
+    Organization,
+    OrganizationMember,
+    Prompt,
+    PromptVersion,
+    ProviderKey,
+    Session,
+    UploadSession,
+    User,
+    Workspace
+)
+
+ID = "00000000-0000-0000-0000-000000000000"
+
+HOT_QUERIES = {
+    "user_by_email": select(User).where(User.email == "user@example.com"),
+    "org_membership": select(OrganizationMember).where(
+        OrganizationMember.org_id == ID, OrganizationMember.user_id == ID
+    ),
+    "user_organizations": select(Organization).join(OrganizationMember).where(OrganizationMember.user_id == ID),
+    "api_key_by_hash": select(APIKey).where(APIKey.key_hash == "hash", APIKey.is_active == True),
+    "list_api_keys": select(APIKey).where(APIKey.org_id == ID),
+    "revoked_api_keys": select(APIKey.key_hash).where(APIKey.is_active == False, APIKey.revoked_at >= func.now()),
+    "created_api_keys": select(APIKey.key_hash).where(APIKey.is_active == True, APIKey.created_at >= func.now()),
+    "session_by_refresh_token": select(Session).where(Session.token == "hash"),
+    "list_prompts": select(Prompt).where(Prompt.org_id == ID),
+    "prompt_version_by_id": select(PromptVersion).where(PromptVersion.id == ID),
+    "list_generations": select(Generation).where(Generation.org_id == ID).order_by(Generation.created_at.desc()),
+    "credit_balance": select(func.sum(CreditLedger.amount)).where(CreditLedger.org_id == ID),
+    "active_provider_key": select(ProviderKey).where(
+        ProviderKey.org_id == ID, ProviderKey.provider == "openai", ProviderKey.is_active == True
+    ),
+    "list_provider_keys": select(ProviderKey).where(ProviderKey.org_id == ID),
+    "list_files": select(File).where(File.user_id == ID).order_by(File.created_at.desc()),
+    "list_workspace_files": select(File).where(
+        File.user_id == ID, File.workspace_id == ID
+    ).order_by(File.created_at.desc()),
+    "file_by_content_hash": select(File).where(File.user_id == ID, File.content_hash == "0" * 64),
+    "file_stats": select(func.count(File.id), func.sum(File.size_bytes)).where(File.user_id == ID),
+    "list_workspaces": select(Workspace).where(Workspace.user_id == ID).order_by(Workspace.created_at.desc()),
+    "expired_upload_sessions": select(UploadSession).where(UploadSession.expires_at <= func.now()),
+}
+
+
+def _run_explain(conn, prefix: str, statement) -> list:
+    """Run `prefix + statement` with the statement's parameters, returning raw plan rows."""
+    compiled = statement.compile(dialect=conn.dialect)
+    values = {}
+    for name, value in compiled.construct_params().items():
+        processor = compiled.binds[name].type.bind_processor(conn.dialect)
+        values[name] = processor(value) if processor else value
+    params = tuple(values[name] for name in compiled.positiontup) if compiled.positional else values
+    return conn.exec_driver_sql(prefix + compiled.string, params).all()
+
+
+def _explain_sqlite(conn, statement) -> tuple[list[str], bool]:
+    details = [row[3] for row in _run_explain(conn, "EXPLAIN QUERY PLAN ", statement)]
+    full_scan = any(
+        detail.startswith("SCAN ") and " USING " not in detail
+        for detail in details
+    )
+    return details, full_scan
+
+
+def _explain_postgres(conn, statement) -> tuple[list[str], bool]:
+    conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    plan = _run_explain(conn, "EXPLAIN (FORMAT JSON) ", statement)[0][0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    details = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        details.append(f"{node['Node Type']} {node.get('Index Name') or node.get('Relation Name') or ''}".strip())
+        nodes.extend(node.get("Plans", []))
+    return details, any(detail.startswith("Seq Scan") for detail in details)
+
+
+def _explain_mysql(conn, statement) -> tuple[list[str], bool]:
+    rows = [row._mapping for row in _run_explain(conn, "EXPLAIN ", statement)]
+    details = [f"{row['table']}: {row['type']} {row['key'] or ''}".strip() for row in rows]
+    return details, any(row["type"] == "ALL" for row in rows)
+
+
+def explain(conn, statement) -> tuple[list[str], bool]:
+    """
+    Explain a statement on the connection's database.
+
+    Returns:
+        Tuple of (plan lines, whether any table is read with a full scan)
+    """
+    if conn.dialect.name == "sqlite":
+        return _explain_sqlite(conn, statement)
+    if conn.dialect.name == "postgresql":
+        return _explain_postgres(conn, statement)
+    if conn.dialect.name == "mysql":
+        return _explain_mysql(conn, statement)
+    raise ValueError(f"Unsupported database: {conn.dialect.name}")
+
+
+def check_plans(queries: dict = HOT_QUERIES, bind: Optional[Engine] = None) -> dict[str, list[str]]:
+    """
+    Explain every hot query.
+
+    Args:
+        queries: Statements to explain, by name
+        bind: Database to explain them on (default: the configured one)
+
+    Returns:
+        Plan lines of the queries that fall back to a full table scan, by name
+    """
+    regressions = {}
+    with (bind or engine).connect() as conn:
+        for name, statement in queries.items():
+            # SET LOCAL on PostgreSQL lasts until the end of this transaction
+            with conn.begin() as transaction:
+                details, full_scan = explain(conn, statement)
+                transaction.rollback()
+            if full_scan:
+                regressions[name] = details
+    return regressions
+
+
+def main():
+    regressions = check_plans()
+    for name, details in regressions.items():
+        print(f"❌ {name}: full table scan")
+        for detail in details:
+            print(f"    {detail}")
+    if regressions:
+        sys.exit(1)
+    print(f"✅ {len(HOT_QUERIES)} hot queries use indexes")
+
+
+if __name__ == "__main__":
+    main()
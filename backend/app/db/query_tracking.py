@@ -0,0 +1,197 @@
+"""
+Per-request SQL query accounting.
+
+Engine events count every statement and its execution time against the
+QueryStats of the current request (held in a context variable, so it follows
+the request into the threadpool). The request middleware in main.py reports
+the totals, logs requests over their query budget, and flags statements
+repeated within one request, the usual sign of an N+1 lazy load.
+
+`query_budget` applies the same accounting to a block of code, for scripts
+and tests that pin the number of queries an endpoint may issue.
+
+The same events feed the slow-query log and per-route DB time histograms
+(see slow_queries.py).
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from app.core.config import settings
+from app.db.slow_queries import db_time_histograms, log_slow_query
+
+logger = logging.getLogger(__name__)
+
+# Query budgets per route (METHOD + path template); other routes use DB_QUERY_WARN_THRESHOLD
+ENDPOINT_QUERY_BUDGETS = {
+    "GET /api/v1/prompts/{org_id}": 4,
+    "GET /api/v1/generations/{org_id}": 4,
+    "GET /api/v1/files/": 3,
+    "GET /api/v1/files/stats": 3,
+    "POST /api/v1/executions/{org_id}/{prompt_id}/execute": 10,
+}
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+# Blocks inside `query_budget`; they see queries from every thread (e.g. a TestClient's app thread)
+_budget_stats: list["QueryStats"] = []
+_budget_lock = threading.Lock()
+
+
+class QueryStats:
+    """Statements executed during one request (or one `query_budget` block)."""
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: Counter[str] = Counter()
+
+    @property
+    def route(self) -> Optional[str]:
+        """METHOD and path template of the request, once it has been routed."""
+        if self.scope is None:
+            return None
+        return f"{self.scope['method']} {route_template(self.scope)}"
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int = None) -> list[tuple[str, int]]:
+        """Statements executed at least `threshold` times, most repeated first."""
+        threshold = threshold or settings.DB_REPEATED_QUERY_THRESHOLD
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Stats of the request being handled, if any."""
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries(scope: Optional[dict] = None):
+    """Count the queries issued inside the block (for the request `scope`, if given)."""
+    stats = QueryStats(scope)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by `query_budget` when a block issues more queries than allowed."""
+
+
+@contextmanager
+def query_budget(max_queries: int):
+    """
+    Fail if the block issues more than `max_queries` statements.
+
+    Usage:
+        with query_budget(4):
+            client.get(f"/api/v1/prompts/{org_id}", headers=auth)
+    """
+    stats = QueryStats()
+    with _budget_lock:
+        _budget_stats.append(stats)
+    try:
+        yield stats
+    finally:
+        with _budget_lock:
+            _budget_stats.remove(stats)
+    if stats.count > max_queries:
+        listed = "\n".join(f"  {n}x {sql}" for sql, n in stats.statements.most_common())
+        raise QueryBudgetExceeded(f"{stats.count} queries, budget {max_queries}:\n{listed}")
+
+
+def route_template(scope) -> str:
+    """Path template of the matched route, e.g. /api/v1/prompts/{org_id}, or the raw path if none matched."""
+    route = scope.get("route")
+    if route is None:
+        return scope["path"]
+    # Routes of an included router may only know their own part of the path (e.g. /{org_id});
+    # the router prefixes are the request path's segments ahead of it
+    parts = scope["path"].split("/")
+    prefix = "/".join(parts[:len(parts) - route.path.count("/")])
+    return prefix + route.path
+
+
+def route_budget(method: str, route_path: str) -> int:
+    """Query budget for a route template, falling back to the global threshold."""
+    return ENDPOINT_QUERY_BUDGETS.get(f"{method} {route_path}", settings.DB_QUERY_WARN_THRESHOLD)
+
+
+def report_request_queries(stats: QueryStats, method: str, route_path: str) -> None:
+    """Record DB time for the route; log requests over their query budget and repeated statements."""
+    endpoint = f"{method} {route_path}"
+    # Unmatched paths (404s) would give every URL its own histogram
+    if stats.scope is not None and stats.scope.get("endpoint") is not None:
+        db_time_histograms.record(endpoint, stats.total_ms, stats.count)
+    budget = route_budget(method, route_path)
+    if stats.count > budget:
+        logger.warning(f"⚠️  {endpoint} ran {stats.count} queries (budget {budget}, {stats.total_ms:.1f}ms)")
+    for sql, n in stats.repeated():
+        logger.warning(f"⚠️  Possible N+1 in {endpoint}: {n}x {_shorten(sql)}")
+
+
+class QueryTrackingMiddleware:
+    """ASGI middleware that tracks each HTTP request's queries and reports them when the response ends."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(scope) as stats:
+            async def send_with_query_stats(message):
+                if message["type"] == "http.response.start" and settings.DB_QUERY_HEADERS:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("X-DB-Query-Count", str(stats.count))
+                    headers.append("X-DB-Query-Time-Ms", f"{stats.total_ms:.1f}")
+                elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                    report_request_queries(stats, scope["method"], route_template(scope))
+                await send(message)
+
+            await self.app(scope, receive, send_with_query_stats)
+
+
+def _shorten(sql: str, limit: int = 200) -> str:
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return sql if len(sql) <= limit else sql[:limit] + "..."
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context.query_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    started_at = getattr(context, "query_started_at", None)
+    # Transaction control isn't a query worth budgeting
+    if started_at is None or statement.startswith("BEGIN"):
+        return
+    duration_ms = (time.perf_counter() - started_at) * 1000
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration_ms)
+    if duration_ms >= settings.SLOW_QUERY_MS:
+        log_slow_query(conn, statement, parameters, executemany, duration_ms, stats.route if stats else None)
+    if _budget_stats:
+        with _budget_lock:
+            for budget in _budget_stats:
+                budget.record(statement, duration_ms)
@@ -0,0 +1,155 @@
+"""
+Read replica routing.
+
+Read-only endpoints take their session from `get_read_db`, which sends reads
+to a replica chosen round-robin among those within REPLICA_MAX_LAG_SECONDS of
+the primary. A client that has just written reads from the primary for
+REPLICA_STICKY_SECONDS so it sees its own changes; this is tracked per worker
+process, keyed by the request's credentials.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.db.base import replica_engines
+
+logger = logging.getLogger(__name__)
+
+# 0 on a primary or a fully replayed standby, otherwise seconds since the last replayed commit
+POSTGRES_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+def measure_replica_lag(engine: Engine) -> Optional[float]:
+    """
+    Measure how far a replica is behind the primary.
+
+    Returns:
+        Lag in seconds, or None if the replica is unreachable or not replicating
+    """
+    try:
+        with engine.connect() as conn:
+            if engine.dialect.name == "postgresql":
+                return float(conn.execute(text(POSTGRES_LAG_SQL)).scalar())
+            if engine.dialect.name == "mysql":
+                row = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+                if row is None:
+                    return 0.0
+                lag = row.get("Seconds_Behind_Source")
+                return None if lag is None else float(lag)
+            return 0.0
+    except Exception as e:
+        logger.warning(f"Replica {engine.url.host} lag check failed: {e}")
+        return None
+
+
+class ReplicaRouter:
+    """Round-robin over healthy replicas, plus the set of clients that must read from the primary."""
+
+    def __init__(self, engines: list[Engine], max_lag_seconds: float, sticky_seconds: int, max_clients: int = 100_000):
+        self.engines = engines
+        self.max_lag_seconds = max_lag_seconds
+        self.sticky_seconds = sticky_seconds
+        self.max_clients = max_clients
+        self._healthy = list(engines)
+        self._lag: dict[str, Optional[float]] = {}
+        self._next = 0
+        # client key -> monotonic deadline, oldest first (every write moves the key to the end)
+        self._recent_writers: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def choose(self) -> Optional[Engine]:
+        """Pick the next healthy replica, or None to read from the primary."""
+        with self._lock:
+            if not self._healthy:
+                return None
+            engine = self._healthy[self._next % len(self._healthy)]
+            self._next += 1
+            return engine
+
+    def mark_write(self, client_key: str) -> None:
+        """Pin a client to the primary for the next REPLICA_STICKY_SECONDS."""
+        if self.sticky_seconds <= 0:
+            return
+        with self._lock:
+            self._recent_writers.pop(client_key, None)
+            self._recent_writers[client_key] = time.monotonic() + self.sticky_seconds
+            while len(self._recent_writers) > self.max_clients:
+                self._recent_writers.popitem(last=False)
+
+    def is_sticky(self, client_key: str) -> bool:
+        """Check whether a client wrote recently enough to need the primary."""
+        now = time.monotonic()
+        with self._lock:
+            while self._recent_writers:
+                oldest = next(iter(self._recent_writers.values()))
+                if oldest > now:
+                    break
+                self._recent_writers.popitem(last=False)
+            return client_key in self._recent_writers
+
+    def check_lag(self) -> None:
+        """Re-measure every replica and route only to those within the lag limit."""
+        lag = {engine: measure_replica_lag(engine) for engine in self.engines}
+        healthy = [
+            engine for engine in self.engines
+            if lag[engine] is not None and lag[engine] <= self.max_lag_seconds
+        ]
+        with self._lock:
+            if len(healthy) != len(self._healthy):
+                logger.warning(f"⚠️  {len(healthy)}/{len(self.engines)} read replicas within lag limit")
+            self._healthy = healthy
+            self._lag = {engine.url.render_as_string(hide_password=True): seconds for engine, seconds in lag.items()}
+
+    def snapshot(self) -> dict:
+        """Current replica lag and routing state for /metrics."""
+        with self._lock:
+            return {
+                "replicas": len(self.engines),
+                "healthy": len(self._healthy),
+                "lag_seconds": dict(self._lag),
+                "sticky_clients": len(self._recent_writers)
+            }
+
+
+# Global router used by the session dependencies
+replica_router = ReplicaRouter(
+    replica_engines,
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS
+)
+
+
+def client_key(request: Request) -> str:
+    """Identify the client for read-your-writes stickiness (credentials, else address)."""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.sha256(authorization.encode()).hexdigest()[:32]
+    return request.client.host if request.client else "unknown"
+
+
+async def run_replica_lag_checks() -> None:
+    """
+    Background loop that re-checks replica lag. Started from the application
+    startup hook when DATABASE_REPLICA_URLS is set.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, replica_router.check_lag)
+        except Exception as e:
+            logger.error(f"Replica lag check failed: {e}")
+        await asyncio.sleep(settings.REPLICA_LAG_CHECK_SECONDS)
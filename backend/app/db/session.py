@@ -3,14 +3,47 @@ Database session management for FastAPI dependency injection.
 """
 
 from typing import Generator
+from fastapi import Request
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker, Session
-from app.db.base import engine
+from app.db.base import engine, read_engine
+from app.db.replicas import client_key, replica_router
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to `read_engine` and writes to the primary `engine`.
+    
+    Once a transaction has written, it stays on the primary until commit or
+    rollback so it can read its own uncommitted changes.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or (clause is not None and clause.is_dml):
+            self.info["wrote"] = True
+        if self.info.get("wrote"):
+            return engine
+        return self.info.get("read_bind", read_engine)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def pin_writer_to_primary(session):
+    # Read-your-writes: the client's next reads skip the replicas for a while
+    if session.info.get("wrote") and "client_key" in session.info:
+        replica_router.mark_write(session.info["client_key"])
+    session.info.pop("wrote", None)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def reset_write_routing(session):
+    session.info.pop("wrote", None)
+
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
 
 
-def get_db() -> Generator[Session, None, None]:
+def get_db(request: Request) -> Generator[Session, None, None]:
     """
     FastAPI dependency that provides a database session.
     Ensures proper cleanup with try/finally block.
@@ -21,6 +54,25 @@ def get_db() -> Generator[Session, None, None]:
             return db.query(Item).all()
     """
     db = SessionLocal()
+    if replica_router.engines:
+        db.info["client_key"] = client_key(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """
+    FastAPI dependency for read-only endpoints.
+    Reads go to a read replica when one is configured and caught up, unless
+    this client wrote within REPLICA_STICKY_SECONDS.
+    """
+    db = SessionLocal()
+    if replica_router.engines and not replica_router.is_sticky(client_key(request)):
+        replica = replica_router.choose()
+        if replica is not None:
+            db.info["read_bind"] = replica
     try:
         yield db
     finally:
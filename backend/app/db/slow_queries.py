@@ -0,0 +1,135 @@
+"""
+Slow-query log and per-route database time histograms.
+
+Statements slower than SLOW_QUERY_MS are logged to the `app.db.slow_queries`
+logger with their normalized SQL, the shape (not the values) of their
+parameters, the duration and the route that issued them. With
+SLOW_QUERY_EXPLAIN, the plan of a slow SELECT is captured as well.
+
+Every routed request's total DB time is added to a histogram for its route
+template, served on /metrics, so a deploy that makes an endpoint slower shows
+up as a shift between buckets.
+"""
+
+import bisect
+import logging
+import re
+import threading
+from typing import Any, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the per-request DB time buckets; the last bucket is open-ended
+DB_TIME_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# A parenthesized list of bind placeholders (?, %s, %(name)s or :name), e.g. an expanded IN
+_PLACEHOLDER = r"\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*"
+_PLACEHOLDER_LIST = re.compile(rf"\({_PLACEHOLDER}(?:,{_PLACEHOLDER})+\)")
+
+_EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+    "mysql": "EXPLAIN ",
+}
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapse whitespace and placeholder lists so the same query always logs the same text."""
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return _PLACEHOLDER_LIST.sub("(...)", statement)
+
+
+def params_shape(parameters: Any, executemany: bool = False) -> str:
+    """Describe parameters by type only; values may be secrets or personal data."""
+    if executemany and parameters:
+        return f"{len(parameters)} x {params_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def capture_plan(conn, statement: str, parameters: Any) -> Optional[list[str]]:
+    """EXPLAIN a SELECT on the connection it ran on; None if unsupported or it fails."""
+    prefix = _EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith("SELECT"):
+        return None
+    try:
+        cursor = conn.connection.driver_connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception as e:
+        logger.debug(f"Could not capture plan for slow query: {e}")
+        return None
+    if conn.dialect.name == "sqlite":
+        return [row[3] for row in rows]
+    if conn.dialect.name == "postgresql":
+        return [row[0] for row in rows]
+    return [str(row) for row in rows]
+
+
+def log_slow_query(conn, statement: str, parameters: Any, executemany: bool, duration_ms: float, route: Optional[str]) -> None:
+    """Log a statement that took longer than SLOW_QUERY_MS."""
+    message = (
+        f"🐢 Slow query ({duration_ms:.1f}ms) in {route or 'background'}: "
+        f"{normalize_sql(statement)} params={params_shape(parameters, executemany)}"
+    )
+    if settings.SLOW_QUERY_EXPLAIN and not executemany:
+        plan = capture_plan(conn, statement, parameters)
+        if plan:
+            message += "\n    plan: " + "\n          ".join(plan)
+    logger.warning(message)
+
+
+class RouteTimer:
+    """Histogram of per-request DB time for one route."""
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(DB_TIME_BUCKETS_MS) + 1)
+
+
+class DbTimeHistograms:
+    """Per-route DB time histograms (route = METHOD + path template)."""
+
+    def __init__(self):
+        self._routes: dict[str, RouteTimer] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, db_ms: float, queries: int) -> None:
+        with self._lock:
+            timer = self._routes.get(route)
+            if timer is None:
+                timer = self._routes[route] = RouteTimer()
+            timer.requests += 1
+            timer.queries += queries
+            timer.total_ms += db_ms
+            timer.max_ms = max(timer.max_ms, db_ms)
+            timer.buckets[bisect.bisect_left(DB_TIME_BUCKETS_MS, db_ms)] += 1
+
+    def snapshot(self) -> dict:
+        """Return current values for reporting."""
+        labels = [f"le_{bound}ms" for bound in DB_TIME_BUCKETS_MS] + ["inf"]
+        with self._lock:
+            return {
+                route: {
+                    "requests": timer.requests,
+                    "avg_queries": round(timer.queries / timer.requests, 2),
+                    "avg_db_ms": round(timer.total_ms / timer.requests, 3),
+                    "max_db_ms": round(timer.max_ms, 2),
+                    "histogram": dict(zip(labels, timer.buckets)),
+                }
+                for route, timer in sorted(self._routes.items())
+            }
+
+
+# Global histograms fed by QueryTrackingMiddleware
+db_time_histograms = DbTimeHistograms()
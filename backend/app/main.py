@@ -3,21 +3,28 @@ PIEE Platform Backend API
 FastAPI application with internal database system.
 """
 
-# Increase multipart upload limit - MUST be before importing FastAPI/Starlette
-import multipart
-try:
-    multipart.MAX_MEMORY_FILE_SIZE = 1024 * 1024 * 1024  # 1GB
-    multipart.MAX_FILE_SIZE = 1024 * 1024 * 1024 * 10    # 10GB
-    print(f"DEBUG: Set MAX_MEMORY_FILE_SIZE to {multipart.MAX_MEMORY_FILE_SIZE}")
-    print(f"DEBUG: Set MAX_FILE_SIZE to {multipart.MAX_FILE_SIZE}")
-except Exception as e:
-    print(f"DEBUG: Failed to configure multipart: {e}")
-
+import asyncio
 import logging
-from fastapi import FastAPI
+import secrets
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.db.base import init_db
+from app.db.migrate import check_schema_version
+from app.db.session import SessionLocal
+from app.db.replicas import replica_router, run_replica_lag_checks
+from app.db.pool_metrics import pool_metrics_snapshot
+from app.db.query_tracking import QueryTrackingMiddleware
+from app.db.slow_queries import db_time_histograms
+from app.auth.api_keys import api_key_index, run_api_key_maintenance
+from app.auth.security import password_hash_metrics
+from app.auth.jwt_keys import jwt_key_ring
+from app.auth.revocation import token_denylist, run_denylist_maintenance
+from app.services.encryption import get_fernet
+from app.services.resumable_uploads import run_upload_session_cleanup
+from app.services.metadata_pipeline import requeue_pending_metadata, shutdown_metadata_pool
+from app.services.thumbnails import run_derived_cache_eviction
 
 
 # Configure logging
@@ -50,16 +57,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Count queries per request; flags query-heavy endpoints and N+1 patterns
+app.add_middleware(QueryTrackingMiddleware)
+
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on application startup."""
+    """Verify the schema and warm in-memory state on application startup."""
     logger.info("🚀 Starting PIEE Backend API...")
-    init_db()
+    check_schema_version()
+    
+    # Warm the API key index and token denylist, then keep them in sync
+    db = SessionLocal()
+    try:
+        api_key_index.load(db)
+        token_denylist.load(db)
+    finally:
+        db.close()
+    app.state.api_key_maintenance = asyncio.create_task(run_api_key_maintenance())
+    app.state.denylist_maintenance = asyncio.create_task(run_denylist_maintenance())
+    app.state.upload_session_cleanup = asyncio.create_task(run_upload_session_cleanup())
+    app.state.derived_cache_eviction = asyncio.create_task(run_derived_cache_eviction())
+    requeue_pending_metadata()
+    if replica_router.engines:
+        app.state.replica_lag_checks = asyncio.create_task(run_replica_lag_checks())
+    
+    if settings.jwt_is_asymmetric:
+        jwt_key_ring.load()
+    
+    # Derive provider-key encryption keys once, not on the first execution
+    get_fernet()
+    
     logger.info(f"✅ API ready at http://localhost:8000")
     logger.info(f"📚 Docs available at http://localhost:8000/docs")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Persist pending API key usage before the worker exits."""
+    app.state.api_key_maintenance.cancel()
+    app.state.denylist_maintenance.cancel()
+    app.state.upload_session_cleanup.cancel()
+    app.state.derived_cache_eviction.cancel()
+    shutdown_metadata_pool()
+    if replica_router.engines:
+        app.state.replica_lag_checks.cancel()
+    db = SessionLocal()
+    try:
+        api_key_index.flush_last_used(db)
+    finally:
+        db.close()
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API information."""
@@ -80,13 +129,47 @@ async def health_check():
     }
 
 
+@app.get("/.well-known/jwks.json")
+async def jwks():
+    """Public JWT verification keys so other services can validate tokens locally."""
+    keys = jwt_key_ring.jwks() if settings.jwt_is_asymmetric else {"keys": []}
+    return JSONResponse(keys, headers={"Cache-Control": "public, max-age=300"})
+
+
+@app.get("/metrics")
+async def metrics(authorization: Optional[str] = Header(None)):
+    """
+    Runtime metrics for capacity planning.
+
+    Pool state and per-route timings are not public: the endpoint answers 404
+    unless METRICS_TOKEN is set, and then requires it as a Bearer token.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not secrets.compare_digest((authorization or "").encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    data = {
+        "password_hashing": password_hash_metrics.snapshot(),
+        "db_pools": pool_metrics_snapshot(),
+        "db_time_by_route": db_time_histograms.snapshot()
+    }
+    if replica_router.engines:
+        data["replicas"] = replica_router.snapshot()
+    return data
+
+
 
 
 # Register API routers
-from app.routers import auth, files, workspaces, waitlist, organizations, prompts, executions, api_keys, provider_keys, onboarding
+from app.routers import auth, files, workspaces, waitlist, organizations, prompts, executions, api_keys, provider_keys, onboarding, uploads
 
 app.include_router(auth.router, prefix=f"{settings.API_V1_PREFIX}/auth", tags=["Authentication"])
 app.include_router(onboarding.router, prefix=f"{settings.API_V1_PREFIX}/onboarding", tags=["Onboarding"])
+app.include_router(uploads.router, prefix=f"{settings.API_V1_PREFIX}/files/uploads", tags=["Files"])
 app.include_router(files.router, prefix=f"{settings.API_V1_PREFIX}/files", tags=["Files"])
 app.include_router(workspaces.router, prefix=f"{settings.API_V1_PREFIX}/workspaces", tags=["Workspaces"])
 app.include_router(waitlist.router, prefix=f"{settings.API_V1_PREFIX}/waitlist", tags=["Waitlist"])
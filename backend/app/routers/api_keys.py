@@ -3,13 +3,14 @@ API Key management endpoints.
 """
 
 import secrets
-import hashlib
+from datetime import datetime
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models import User, OrganizationMember, APIKey
 from app.auth.dependencies import get_current_active_user
+from app.auth.api_keys import API_KEY_PREFIX, api_key_index, hash_api_key
 from app.routers.schemas import APIKeyCreate, APIKeyResponse, APIKeyCreatedResponse
 
 router = APIRouter()
@@ -35,8 +36,8 @@ async def create_api_key(
     await check_org_membership(org_id, current_user.id, db)
     
     # Generate secret key
-    secret_key = f"pk_{secrets.token_urlsafe(32)}"
-    key_hash = hashlib.sha256(secret_key.encode()).hexdigest()
+    secret_key = f"{API_KEY_PREFIX}{secrets.token_urlsafe(32)}"
+    key_hash = hash_api_key(secret_key)
     
     api_key = APIKey(
         org_id=org_id,
@@ -47,6 +48,7 @@ async def create_api_key(
     db.add(api_key)
     db.commit()
     db.refresh(api_key)
+    api_key_index.add(api_key)
     
     # Return response with secret key (only once)
     response = APIKeyCreatedResponse(
@@ -67,10 +69,10 @@ async def list_api_keys(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """List all API keys for an organization."""
+    """List the active API keys of an organization (revoked keys are kept only for revocation sync)."""
     await check_org_membership(org_id, current_user.id, db)
     
-    keys = db.query(APIKey).filter(APIKey.org_id == org_id).all()
+    keys = db.query(APIKey).filter(APIKey.org_id == org_id, APIKey.is_active == True).all()
     return keys
 
 @router.delete("/{org_id}/{key_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -80,13 +82,22 @@ async def revoke_api_key(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Deactivate/Revoke an API key."""
+    """
+    Deactivate/Revoke an API key.
+    
+    The row is kept (inactive, with `revoked_at`) so other workers can find the
+    revocation and evict the key from their indexes.
+    """
     await check_org_membership(org_id, current_user.id, db)
     
     api_key = db.query(APIKey).filter(APIKey.id == key_id, APIKey.org_id == org_id).first()
     if not api_key:
         raise HTTPException(status_code=404, detail="API Key not found")
         
-    db.delete(api_key)
-    db.commit()
+    key_hash = api_key.key_hash
+    if api_key.is_active:
+        api_key.is_active = False
+        api_key.revoked_at = datetime.utcnow()
+        db.commit()
+    api_key_index.remove(key_hash)
     return None
@@ -2,25 +2,55 @@
 Authentication endpoints for user registration and login.
 """
 
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.db.session import get_db
-from app.db.models import User
-from app.auth.security import verify_password, get_password_hash, create_access_token
-from app.auth.dependencies import get_current_active_user
-from app.routers.schemas import UserRegister, UserLogin, Token, UserResponse
+from app.db.models import User, Session as AuthSession
+from app.auth.security import (
+    verify_password_async,
+    get_password_hash_async,
+    password_needs_rehash,
+    create_access_token,
+    create_refresh_token,
+    hash_refresh_token,
+    decode_access_token
+)
+from app.auth.dependencies import get_current_active_user, security
+from app.auth.revocation import token_denylist
+from app.auth.rate_limit import admit_auth_attempt, reset_account_attempts
+from app.routers.schemas import UserRegister, UserLogin, Token, UserResponse, RefreshTokenRequest
 
 router = APIRouter()
 
 
+def issue_token_pair(user_id: str, session_id: str, refresh_token: str) -> dict:
+    """Build the token response for a session."""
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user_id, "sid": session_id},
+        expires_delta=access_token_expires
+    )
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds())
+    }
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, request: Request, db: Session = Depends(get_db)):
     """
     Register a new user account.
     """
     from app.db.models import Organization, OrganizationMember, OnboardingProgress
     
+    await admit_auth_attempt(request)
+    
     # Check if user already exists
     existing_user = db.query(User).filter(User.email == user_data.email).first()
     if existing_user:
@@ -30,7 +60,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -81,14 +111,16 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, request: Request, db: Session = Depends(get_db)):
     """
     Login and receive JWT access token.
     """
+    await admit_auth_attempt(request, user_data.email)
+    
     # Find user by email
     user = db.query(User).filter(User.email == user_data.email).first()
     
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user or not await verify_password_async(user_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -100,15 +132,62 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
+    await reset_account_attempts(user_data.email)
     
-    # Create access token
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": user.id},
-        expires_delta=access_token_expires
+    # Transparently upgrade hashes made with an outdated cost factor
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(user_data.password)
+        db.commit()
+    
+    # Start a refresh-token session
+    refresh_token, refresh_hash = create_refresh_token()
+    session = AuthSession(
+        user_id=user.id,
+        token=refresh_hash,
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     )
+    db.add(session)
+    db.commit()
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return issue_token_pair(user.id, session.id, refresh_token)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(data: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and a rotated refresh token.
+    No password check is involved; the old refresh token stops working.
+    """
+    invalid_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    old_hash = hash_refresh_token(data.refresh_token)
+    session = db.query(AuthSession).filter(AuthSession.token == old_hash).first()
+    if not session or session.expires_at <= datetime.utcnow():
+        raise invalid_exception
+    
+    user = db.query(User).filter(User.id == session.user_id).first()
+    if not user or not user.is_active:
+        raise invalid_exception
+    
+    # Rotate atomically: a concurrent refresh with the same token matches no row
+    refresh_token, refresh_hash = create_refresh_token()
+    rotated = db.query(AuthSession).filter(
+        AuthSession.id == session.id,
+        AuthSession.token == old_hash
+    ).update({
+        AuthSession.token: refresh_hash,
+        AuthSession.expires_at: datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    }, synchronize_session=False)
+    db.commit()
+    
+    if not rotated:
+        raise invalid_exception
+    
+    return issue_token_pair(user.id, session.id, refresh_token)
 
 
 @router.get("/me", response_model=UserResponse)
@@ -120,8 +199,26 @@ async def get_current_user_info(current_user: User = Depends(get_current_active_
 
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_active_user)):
+async def logout(
+    current_user: User = Depends(get_current_active_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
     """
     Logout current user.
+    
+    Revokes the presented access token and ends its refresh-token session.
     """
+    payload = decode_access_token(credentials.credentials)
+    
+    if payload.get("sid"):
+        db.query(AuthSession).filter(
+            AuthSession.id == payload["sid"],
+            AuthSession.user_id == current_user.id
+        ).delete(synchronize_session=False)
+        db.commit()
+    
+    if payload.get("jti"):
+        token_denylist.revoke(db, payload["jti"], datetime.utcfromtimestamp(payload["exp"]))
+    
     return {"message": "Successfully logged out"}
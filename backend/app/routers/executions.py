@@ -9,15 +9,17 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.db.session import get_db
-from app.db.models import User, Organization, OrganizationMember, Prompt, PromptVersion, Generation, CreditLedger
-from app.auth.dependencies import get_current_active_user, RoleChecker
+from app.db.models import Organization, OrganizationMember, Prompt, PromptVersion, Generation, CreditLedger
+from app.auth.dependencies import RoleChecker
 from app.routers.schemas import PromptExecutionRequest, GenerationResponse
 from app.services.providers import get_provider
+from app.services.provider_key_cache import provider_key_cache
+from app.services.prompt_version_cache import prompt_version_cache
 
 router = APIRouter()
 
 # Role checkers
-check_member = RoleChecker(["member"]) # member, admin, or owner
+check_member = RoleChecker(["member"], allow_api_keys=True) # member, admin, owner, or org API key
 
 def resolve_variables(content: str, variables: dict) -> str:
     """Replace ${var} with values from variables dict."""
@@ -37,22 +39,12 @@ async def execute_prompt(
     org_id: str,
     prompt_id: str,
     exec_data: PromptExecutionRequest,
-    current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
-    _ = Depends(check_member)
+    member: OrganizationMember = Depends(check_member)
 ):
     """Execute the latest version of a prompt using BYOK provider keys. Requires MEMBER role."""
     from app.db.models import ProviderKey
-    from app.services.encryption import decrypt_api_key
-    
-    # Check specific membership
-    member = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
-    
-    if not member:
-        raise HTTPException(status_code=403, detail="Not a member of this organization")
+    from app.services.encryption import decrypt_for_org
     
     # Check balance
     balance = await get_org_balance(org_id, db)
@@ -64,28 +56,37 @@ async def execute_prompt(
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
         
-    version = db.query(PromptVersion).filter(PromptVersion.prompt_id == prompt_id).order_by(PromptVersion.version.desc()).first()
-    if not version:
+    if not prompt.latest_version_id:
         raise HTTPException(status_code=400, detail="Prompt has no versions")
+    version = prompt_version_cache.get(prompt.latest_version_id)
+    if version is None:
+        version = prompt_version_cache.put(db.get(PromptVersion, prompt.latest_version_id))
     
-    # Get provider API key from BYOK
-    provider_key = db.query(ProviderKey).filter(
-        ProviderKey.org_id == org_id,
-        ProviderKey.provider == version.provider,
-        ProviderKey.is_active == True
-    ).first()
-    
-    if not provider_key:
-        raise HTTPException(
-            status_code=400,
-            detail=f"No active API key found for provider '{version.provider}'. Please add one in Settings > Providers."
-        )
-    
-    # Decrypt the API key
-    try:
-        api_key = decrypt_api_key(provider_key.encrypted_key)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to decrypt API key: {str(e)}")
+    # Get provider API key from BYOK (cached briefly to skip the query and decryption)
+    cached_key = provider_key_cache.get(org_id, version.provider)
+    if cached_key:
+        provider_key_id, api_key = cached_key
+    else:
+        provider_key = db.query(ProviderKey).filter(
+            ProviderKey.org_id == org_id,
+            ProviderKey.provider == version.provider,
+            ProviderKey.is_active == True
+        ).first()
+        
+        if not provider_key:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No active API key found for provider '{version.provider}'. Please add one in Settings > Providers."
+            )
+        
+        # Decrypt the API key
+        try:
+            api_key = decrypt_for_org(db, org_id, provider_key.encrypted_key, provider_key.key_version)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to decrypt API key: {str(e)}")
+        
+        provider_key_id = provider_key.id
+        provider_key_cache.put(org_id, version.provider, provider_key_id, api_key)
         
     # Resolve variables
     final_prompt = resolve_variables(version.content, exec_data.variables or {})
@@ -100,14 +101,16 @@ async def execute_prompt(
         raise HTTPException(status_code=500, detail=f"Provider API call failed: {str(e)}")
     
     # Update last_used_at for provider key
-    provider_key.last_used_at = datetime.utcnow()
+    db.query(ProviderKey).filter(ProviderKey.id == provider_key_id).update(
+        {ProviderKey.last_used_at: datetime.utcnow()}, synchronize_session=False
+    )
     
     # Log generation
     generation = Generation(
         org_id=org_id,
         prompt_id=prompt_id,
         prompt_version_id=version.id,
-        user_id=current_user.id,
+        user_id=member.user_id,
         input_variables=json.dumps(exec_data.variables) if exec_data.variables else None,
         output_text=result["text"],
         model=result["model"],
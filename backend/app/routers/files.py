@@ -2,38 +2,77 @@
 File management endpoints for upload, download, and listing.
 """
 
+import asyncio
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File as FastAPIFile
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.db.models import User, File
 from app.auth.dependencies import get_current_active_user
 from app.routers.schemas import (
+    BlobResponse,
+    FileFromBlobCreate,
+    FileMetadataResponse,
     FileResponse as FileResponseSchema,
     FilesListResponse,
     FileStatsResponse
 )
-from app.services.file_storage import save_upload_file, delete_file, get_mime_type
+from app.services.file_storage import save_upload_file, generate_unique_filename
+from app.services.blob_store import add_blob_reference, delete_files, remove_stored_files, store_blob
+from app.services.metadata_pipeline import schedule_metadata_extraction
+from app.services.thumbnails import (
+    ThumbnailError,
+    get_variant,
+    schedule_thumbnail,
+    snap_width,
+    supports_thumbnail
+)
 from sqlalchemy import func
-from app.core.config import settings
+import json
 import os
 
 router = APIRouter()
 
 
-@router.post("/upload", response_model=FileResponseSchema, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/upload",
+    response_model=FileResponseSchema,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {"file": {"type": "string", "format": "binary"}}
+                    }
+                }
+            }
+        }
+    }
+)
 async def upload_file(
-    file: UploadFile = FastAPIFile(...),
-    workspace_id: Optional[str] = None,
+    request: Request,
+    workspace_id: Optional[UUID] = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
     Upload a file and store its metadata.
     
+    The multipart body is parsed here rather than by FastAPI so the file is
+    streamed to disk once, and rejected as soon as it exceeds MAX_UPLOAD_SIZE.
+    Contents already stored (by any user) are not stored again. The response
+    is sent before metadata extraction finishes (`metadata_status` "pending").
+    
     Args:
-        file: File to upload
+        request: Upload request with a multipart `file` field
         workspace_id: Optional workspace ID to associate with
         current_user: Current authenticated user
         db: Database session
@@ -44,39 +83,116 @@ async def upload_file(
     Raises:
         HTTPException: If file is too large or upload fails
     """
-    # Check file size
-    contents = await file.read()
-    file_size = len(contents)
+    staging_path, original_filename, file_size, sha256, mime_type = await save_upload_file(request)
+    
+    # Store the contents once per hash, with the database record pointing at them
+    async with store_blob(db, staging_path, sha256, file_size) as blob:
+        db_file = File(
+            user_id=current_user.id,
+            workspace_id=workspace_id,
+            filename=generate_unique_filename(original_filename),
+            original_filename=original_filename,
+            storage_path=blob.storage_path,
+            content_hash=blob.sha256,
+            mime_type=mime_type,
+            size_bytes=file_size,
+            metadata_status="pending"
+        )
+        
+        db.add(db_file)
+        db.commit()
+        db.refresh(db_file)
+    
+    # Duration, resolution etc. and the grid thumbnail are filled in in the background
+    schedule_metadata_extraction(db_file.id, db_file.storage_path)
+    schedule_thumbnail(db_file.content_hash, db_file.storage_path, db_file.mime_type)
+    
+    return db_file
+
+
+@router.get("/blobs/{sha256}", response_model=BlobResponse)
+async def check_blob(
+    sha256: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Check whether the current user already has a file with these contents.
     
-    if file_size > settings.MAX_UPLOAD_SIZE:
+    Clients hash a file before uploading it; on 200 they can create the file
+    with `POST /files/blobs/{sha256}` instead of sending the bytes. Only the
+    user's own files count, so a hash alone can't be used to obtain contents
+    someone else uploaded.
+    
+    Raises:
+        HTTPException: 404 if the user has no file with this hash
+    """
+    existing = db.query(File.size_bytes).filter(
+        File.user_id == current_user.id,
+        File.content_hash == sha256.lower()
+    ).first()
+    
+    if not existing:
         raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File too large. Max size: {settings.MAX_UPLOAD_SIZE} bytes"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contents not found"
         )
     
-    # Reset file pointer
-    await file.seek(0)
+    return {"sha256": sha256.lower(), "size_bytes": existing.size_bytes}
+
+
+@router.post("/blobs/{sha256}", response_model=FileResponseSchema, status_code=status.HTTP_201_CREATED)
+async def create_file_from_blob(
+    sha256: str,
+    file_data: FileFromBlobCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create a file from contents the current user already uploaded, without sending them again.
     
-    # Save file to disk
-    # storage_path, filename, file_size, metadata_json, mime_type
-    storage_path, filename, file_size, metadata_json, mime_type = await save_upload_file(current_user.id, file)
+    Raises:
+        HTTPException: 404 if the user has no file with this hash
+    """
+    existing = db.query(File).filter(
+        File.user_id == current_user.id,
+        File.content_hash == sha256.lower()
+    ).first()
     
-    # Create database record
+    if not existing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contents not found"
+        )
+    
+    try:
+        add_blob_reference(db, existing.content_hash)
+    except ValueError:
+        # The user's last file with these contents was deleted meanwhile
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contents not found"
+        )
     db_file = File(
         user_id=current_user.id,
-        workspace_id=workspace_id,
-        filename=filename,
-        original_filename=file.filename or "unnamed",
-        storage_path=storage_path,
-        mime_type=mime_type,
-        size_bytes=file_size,
-        meta_data=metadata_json
+        workspace_id=file_data.workspace_id,
+        filename=generate_unique_filename(file_data.filename),
+        original_filename=file_data.filename,
+        storage_path=existing.storage_path,
+        content_hash=existing.content_hash,
+        mime_type=existing.mime_type,
+        size_bytes=existing.size_bytes,
+        meta_data=existing.meta_data,
+        metadata_status=existing.metadata_status
     )
     
     db.add(db_file)
     db.commit()
     db.refresh(db_file)
     
+    if db_file.metadata_status == "pending":
+        schedule_metadata_extraction(db_file.id, db_file.storage_path)
+    
     return db_file
 
 
@@ -84,7 +200,7 @@ async def upload_file(
 async def list_files(
     workspace_id: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     List all files for the current user.
@@ -109,7 +225,7 @@ async def list_files(
 @router.get("/stats", response_model=FileStatsResponse)
 async def get_file_stats(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get file statistics for the current user.
@@ -159,27 +275,62 @@ async def get_file_metadata(
     return file
 
 
-@router.get("/{file_id}/download")
-async def download_file(
+@router.get("/{file_id}/metadata", response_model=FileMetadataResponse)
+async def get_file_metadata_status(
     file_id: str,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
-    Download a file by ID.
+    Get the extracted metadata of a file and whether extraction has finished.
+    
+    Raises:
+        HTTPException: If file not found or unauthorized
+    """
+    file = db.query(File).filter(
+        File.id == file_id,
+        File.user_id == current_user.id
+    ).first()
+    
+    if not file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    
+    return {
+        "id": file.id,
+        "status": file.metadata_status,
+        "meta_data": json.loads(file.meta_data) if file.meta_data else None
+    }
+
+
+@router.get("/{file_id}/thumbnail")
+async def get_thumbnail(
+    file_id: str,
+    w: Optional[int] = Query(None, ge=1, description="Width in pixels, rounded up to a configured variant width"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get a resized WebP variant of an image, or a poster frame of a video.
+    
+    Variants are rendered on first request (or on upload for the default
+    width) and then served from the derived-asset cache.
     
     Args:
         file_id: File ID
+        w: Requested width (defaults to THUMBNAIL_DEFAULT_WIDTH)
         current_user: Current authenticated user
         db: Database session
     
     Returns:
-        File content
+        WebP image
     
     Raises:
-        HTTPException: If file not found or unauthorized
+        HTTPException: If file not found, unauthorized or it has no thumbnail
     """
-    file = db.query(File).filter(
+    file = db.query(File.id, File.content_hash, File.storage_path, File.mime_type).filter(
         File.id == file_id,
         File.user_id == current_user.id
     ).first()
@@ -189,17 +340,126 @@ async def download_file(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found"
         )
+    if not supports_thumbnail(file.mime_type):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No thumbnail for this file type"
+        )
     
-    if not os.path.exists(file.storage_path):
+    try:
+        path = await get_variant(file.content_hash or file.id, file.storage_path, file.mime_type, snap_width(w))
+    except ThumbnailError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Thumbnail not available"
+        )
+    
+    # Stored contents never change, so a variant of them can be cached indefinitely
+    return FileResponse(
+        path=path,
+        media_type="image/webp",
+        headers={"Cache-Control": "private, max-age=31536000, immutable"}
+    )
+
+
+def _not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when it is absent (RFC 9110 section 13.2.2)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return int(last_modified.timestamp()) <= since.timestamp()
+    return False
+
+
+async def _stat_stored_file(storage_path: str) -> os.stat_result:
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(None, os.stat, storage_path)
+    except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found on disk"
         )
+
+
+@router.api_route("/{file_id}/download", methods=["GET", "HEAD"])
+async def download_file(
+    file_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Download a file by ID.
+    
+    Responses carry a strong ETag and Last-Modified, so clients revalidate
+    with If-None-Match / If-Modified-Since and get 304 without a body.
+    Range requests (with If-Range) return 206 with the requested bytes.
+    Content-addressed files never change, so their validators come from the
+    database and a 304 doesn't touch the disk; they are also marked immutable.
+    
+    Args:
+        file_id: File ID
+        request: Current request, for conditional and range headers
+        current_user: Current authenticated user
+        db: Database session
+    
+    Returns:
+        File content, part of it (206) or nothing (304)
+    
+    Raises:
+        HTTPException: If file not found or unauthorized
+    """
+    file = db.query(File).filter(
+        File.id == file_id,
+        File.user_id == current_user.id
+    ).first()
+    
+    if not file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    
+    stat_result = None
+    if file.content_hash:
+        etag = f'"{file.content_hash}"'
+        last_modified = file.created_at.replace(tzinfo=timezone.utc)
+        cache_control = "private, max-age=31536000, immutable"
+    else:
+        # Stored before deduplication: validate on modification time and size
+        stat_result = await _stat_stored_file(file.storage_path)
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        last_modified = datetime.fromtimestamp(int(stat_result.st_mtime), timezone.utc)
+        cache_control = "private, no-cache"
     
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified.timestamp(), usegmt=True),
+        "Cache-Control": cache_control
+    }
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    # Passing the stat result saves FileResponse a second one; it serves Range/If-Range itself
+    if stat_result is None:
+        stat_result = await _stat_stored_file(file.storage_path)
     return FileResponse(
         path=file.storage_path,
         filename=file.original_filename,
-        media_type=file.mime_type
+        media_type=file.mime_type,
+        headers=headers,
+        stat_result=stat_result
     )
 
 
@@ -231,11 +491,9 @@ async def delete_file_endpoint(
             detail="File not found"
         )
     
-    # Delete file from disk
-    delete_file(file.storage_path)
-    
-    # Delete from database
-    db.delete(file)
+    # Delete from database, then the stored contents once nothing references them
+    unused = delete_files(db, [file])
     db.commit()
+    await remove_stored_files(unused)
     
     return None
@@ -65,23 +65,10 @@ async def list_organizations(
 async def update_organization(
     org_id: str,
     org_data: OrganizationUpdate,
-    current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
-    _ = Depends(check_admin)
+    member: OrganizationMember = Depends(check_admin)
 ):
     """Update organization details (requires ADMIN or OWNER)."""
-    # Check specific membership
-    member = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
-    
-    if not member or member.role not in ["admin", "owner"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Insufficient permissions"
-        )
-        
     org = db.query(Organization).filter(Organization.id == org_id).first()
     if not org:
         raise HTTPException(status_code=404, detail="Organization not found")
@@ -103,22 +90,9 @@ async def update_organization(
 @router.get("/{org_id}", response_model=OrganizationResponse)
 async def get_organization(
     org_id: str,
-    current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
-    _ = Depends(check_member)
+    member: OrganizationMember = Depends(check_member)
 ):
     """Get organization details if the user is a member."""
-    # Check specific membership
-    member = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
-    
-    if not member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this organization"
-        )
-        
     org = db.query(Organization).filter(Organization.id == org_id).first()
     return org
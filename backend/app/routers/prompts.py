@@ -1,15 +1,26 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.db.models import User, OrganizationMember, Prompt, PromptVersion
-from app.auth.dependencies import get_current_active_user, RoleChecker
-from app.routers.schemas import PromptCreate, PromptResponse, PromptVersionCreate, PromptVersionResponse
+from typing import List, Literal
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session, selectinload
+from app.core.config import settings
+from app.db.session import get_db, get_read_db
+from app.db.models import OrganizationMember, Prompt, PromptVersion
+from app.auth.dependencies import RoleChecker
+from app.routers.schemas import (
+    PromptCreate,
+    PromptImportRecord,
+    PromptImportResponse,
+    PromptResponse,
+    PromptVersionCreate,
+    PromptVersionResponse
+)
+from app.services.prompt_library import SlugConflictError, export_prompts, import_prompts
 
 router = APIRouter()
 
 # Role checkers
-check_member = RoleChecker(["member"]) # member, admin, or owner
+check_member = RoleChecker(["member"], allow_api_keys=True) # member, admin, owner, or org API key
 
 def generate_slug(name: str) -> str:
     """Simple slug generator."""
@@ -19,20 +30,10 @@ def generate_slug(name: str) -> str:
 async def create_prompt(
     org_id: str,
     prompt_data: PromptCreate,
-    current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
-    _ = Depends(check_member)
+    member: OrganizationMember = Depends(check_member)
 ):
     """Create a new prompt in an organization. Requires MEMBER role."""
-    # Validate membership for this specific org
-    member = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
-    
-    if not member:
-        raise HTTPException(status_code=403, detail="Not a member of this organization")
-
     slug = generate_slug(prompt_data.name)
     prompt = Prompt(
         org_id=org_id,
@@ -49,20 +50,12 @@ async def create_prompt(
 @router.get("/{org_id}", response_model=List[PromptResponse])
 async def list_prompts(
     org_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
-    _ = Depends(check_member)
+    db: Session = Depends(get_read_db),
+    member: OrganizationMember = Depends(check_member)
 ):
     """List all prompts for an organization. Requires MEMBER role."""
-    member = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
-    
-    if not member:
-        raise HTTPException(status_code=403, detail="Not a member of this organization")
-    
-    prompts = db.query(Prompt).filter(Prompt.org_id == org_id).all()
+    # Load all versions in one query instead of one lazy load per prompt
+    prompts = db.query(Prompt).options(selectinload(Prompt.versions)).filter(Prompt.org_id == org_id).all()
     return prompts
 
 @router.post("/{org_id}/{prompt_id}/versions", response_model=PromptVersionResponse, status_code=status.HTTP_201_CREATED)
@@ -70,27 +63,17 @@ async def create_prompt_version(
     org_id: str,
     prompt_id: str,
     version_data: PromptVersionCreate,
-    current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
-    _ = Depends(check_member)
+    member: OrganizationMember = Depends(check_member)
 ):
     """Create a new version for a prompt. Requires MEMBER role."""
-    member = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
-    
-    if not member:
-        raise HTTPException(status_code=403, detail="Not a member of this organization")
-    
-    # Check if prompt exists and belongs to org
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_id, Prompt.org_id == org_id).first()
-    if not prompt:
+    # Claim the next version number; the UPDATE row lock serializes concurrent creates
+    claimed = db.query(Prompt).filter(Prompt.id == prompt_id, Prompt.org_id == org_id).update(
+        {Prompt.version_count: Prompt.version_count + 1}, synchronize_session=False
+    )
+    if not claimed:
         raise HTTPException(status_code=404, detail="Prompt not found")
-        
-    # Get latest version number
-    latest = db.query(PromptVersion).filter(PromptVersion.prompt_id == prompt_id).order_by(PromptVersion.version.desc()).first()
-    version_num = (latest.version + 1) if latest else 1
+    version_num = db.query(Prompt.version_count).filter(Prompt.id == prompt_id).scalar()
     
     version = PromptVersion(
         prompt_id=prompt_id,
@@ -101,28 +84,90 @@ async def create_prompt_version(
         parameters=version_data.parameters
     )
     db.add(version)
+    db.flush()
+    db.query(Prompt).filter(Prompt.id == prompt_id).update(
+        {Prompt.latest_version_id: version.id}, synchronize_session=False
+    )
     db.commit()
     db.refresh(version)
     
     return version
 
+@router.post("/{org_id}/import", response_model=PromptImportResponse)
+async def import_prompt_library(
+    org_id: str,
+    request: Request,
+    on_conflict: Literal["skip", "append", "error"] = "skip",
+    db: Session = Depends(get_db),
+    member: OrganizationMember = Depends(check_member)
+):
+    """
+    Import prompts with their versions from a JSONL body (one prompt per line,
+    as produced by the export endpoint). Requires MEMBER role.
+
+    Everything is inserted in one transaction. `on_conflict` decides what
+    happens to a prompt whose slug already exists: skip it, append its
+    versions to the existing prompt, or reject the import with 409.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.PROMPT_IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Import file too large")
+
+    records = []
+    line_number = 0
+    received = 0
+    buffer = b""
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > settings.PROMPT_IMPORT_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Import file too large")
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            records.append(_parse_import_line(line, line_number))
+    records.append(_parse_import_line(buffer, line_number + 1))
+    records = [record for record in records if record is not None]
+
+    try:
+        return import_prompts(db, org_id, records, on_conflict)
+    except SlugConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+def _parse_import_line(line: bytes, line_number: int):
+    """Parse one JSONL import line, skipping blank lines."""
+    if not line.strip():
+        return None
+    try:
+        record = PromptImportRecord.model_validate_json(line)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Line {line_number}: {e.errors(include_url=False)[0]['msg']}"
+        )
+    record.slug = record.slug or generate_slug(record.name)
+    return record
+
+@router.get("/{org_id}/export")
+async def export_prompt_library(
+    org_id: str,
+    member: OrganizationMember = Depends(check_member)
+):
+    """Stream all prompts with their versions as JSONL. Requires MEMBER role."""
+    return StreamingResponse(
+        export_prompts(org_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="prompts-{org_id}.jsonl"'}
+    )
+
 @router.get("/{org_id}/{prompt_id}", response_model=PromptResponse)
 async def get_prompt(
     org_id: str,
     prompt_id: str,
-    current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
-    _ = Depends(check_member)
+    member: OrganizationMember = Depends(check_member)
 ):
     """Get prompt details with all versions. Requires MEMBER role."""
-    member = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
-    
-    if not member:
-        raise HTTPException(status_code=403, detail="Not a member of this organization")
-    
     prompt = db.query(Prompt).filter(Prompt.id == prompt_id, Prompt.org_id == org_id).first()
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
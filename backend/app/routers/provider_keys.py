@@ -1,11 +1,13 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.db.models import User, OrganizationMember, ProviderKey
-from app.auth.dependencies import get_current_active_user, RoleChecker
-from app.routers.schemas import ProviderKeyCreate, ProviderKeyResponse
-from app.services.encryption import encrypt_api_key
+from app.db.models import OrganizationMember, ProviderKey, KeyRotationJob
+from app.auth.dependencies import RoleChecker
+from app.routers.schemas import ProviderKeyCreate, ProviderKeyResponse, KeyRotationJobResponse
+from app.services.encryption import encrypt_for_org
+from app.services.key_rotation import rotate_org_data_key, run_reencryption_job_in_background
+from app.services.provider_key_cache import provider_key_cache
 
 router = APIRouter()
 
@@ -17,29 +19,12 @@ check_member = RoleChecker(["member"]) # member, admin, or owner
 async def add_provider_key(
     org_id: str,
     key_data: ProviderKeyCreate,
-    current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
-    _ = Depends(check_admin)
+    member: OrganizationMember = Depends(check_admin)
 ):
     """Add a new provider API key (BYOK). Requires ADMIN or OWNER role."""
-    # Note: RoleChecker validates membership but doesn't strictly check org_id match unless we pass it.
-    # Current RoleChecker gets user's membership. 
-    # TODO: Enhance RoleChecker to validate org_id context if needed.
-    # For now, explicit check:
-    member = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
-    
-    if not member or member.role not in ["admin", "owner"]:
-        # Double check in case RoleChecker passed via loop but context mismatch
-        # Actually RoleChecker as is checks ANY membership. 
-        # We need to check SPECIFIC org membership.
-        # Let's refine check_org_membership logic inside endpoints for now combined with RoleChecker concept.
-        raise HTTPException(status_code=403, detail="Insufficient permissions")
-
-    # Encrypt the API key
-    encrypted = encrypt_api_key(key_data.api_key)
+    # Encrypt the API key with the organization's data key
+    encrypted, key_version = encrypt_for_org(db, org_id, key_data.api_key)
     
     # Store prefix for identification (first 10 chars)
     prefix = key_data.api_key[:10] if len(key_data.api_key) >= 10 else key_data.api_key[:4]
@@ -49,30 +34,24 @@ async def add_provider_key(
         provider=key_data.provider,
         key_name=key_data.key_name,
         encrypted_key=encrypted,
+        key_version=key_version,
         key_prefix=prefix
     )
     db.add(provider_key)
     db.commit()
     db.refresh(provider_key)
+    # Executions pick the new key up instead of a cached older one for this provider
+    provider_key_cache.evict_provider(org_id, key_data.provider)
     
     return provider_key
 
 @router.get("/{org_id}", response_model=List[ProviderKeyResponse])
 async def list_provider_keys(
     org_id: str,
-    current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
-    _ = Depends(check_member)
+    member: OrganizationMember = Depends(check_member)
 ):
     """List all provider keys for an organization (keys are masked). Requires MEMBER role."""
-    member = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
-    
-    if not member:
-         raise HTTPException(status_code=403, detail="Not a member of this organization")
-
     keys = db.query(ProviderKey).filter(ProviderKey.org_id == org_id).all()
     return keys
 
@@ -80,19 +59,10 @@ async def list_provider_keys(
 async def delete_provider_key(
     org_id: str,
     key_id: str,
-    current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
-    _ = Depends(check_admin)
+    member: OrganizationMember = Depends(check_admin)
 ):
     """Delete a provider key. Requires ADMIN or OWNER role."""
-    member = db.query(OrganizationMember).filter(
-        OrganizationMember.org_id == org_id,
-        OrganizationMember.user_id == current_user.id
-    ).first()
-    
-    if not member or member.role not in ["admin", "owner"]:
-        raise HTTPException(status_code=403, detail="Insufficient permissions")
-    
     key = db.query(ProviderKey).filter(
         ProviderKey.id == key_id,
         ProviderKey.org_id == org_id
@@ -103,4 +73,38 @@ async def delete_provider_key(
     
     db.delete(key)
     db.commit()
+    provider_key_cache.evict(key_id)
     return None
+
+@router.post("/{org_id}/rotate", response_model=KeyRotationJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def rotate_provider_key_encryption(
+    org_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    member: OrganizationMember = Depends(check_admin)
+):
+    """
+    Rotate the organization's data key and re-encrypt its provider keys in the background.
+    Requires ADMIN or OWNER role.
+    """
+    job = rotate_org_data_key(db, org_id)
+    background_tasks.add_task(run_reencryption_job_in_background, job.id)
+    return job
+
+@router.get("/{org_id}/rotate/{job_id}", response_model=KeyRotationJobResponse)
+async def get_rotation_status(
+    org_id: str,
+    job_id: str,
+    db: Session = Depends(get_db),
+    member: OrganizationMember = Depends(check_admin)
+):
+    """Get progress of a key rotation job. Requires ADMIN or OWNER role."""
+    job = db.query(KeyRotationJob).filter(
+        KeyRotationJob.id == job_id,
+        KeyRotationJob.org_id == org_id
+    ).first()
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Rotation job not found")
+    
+    return job
@@ -4,8 +4,10 @@ Pydantic schemas for request/response validation.
 
 from datetime import datetime
 from typing import Optional, List
+from uuid import UUID
 from pydantic import BaseModel, EmailStr, Field, model_validator
 from app.core.config import settings
+from app.services.thumbnails import supports_thumbnail
 
 
 # ========== Auth Schemas ==========
@@ -27,6 +29,13 @@ class Token(BaseModel):
     """Schema for JWT token response."""
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
+
+
+class RefreshTokenRequest(BaseModel):
+    """Schema for exchanging a refresh token for a new token pair."""
+    refresh_token: str
 
 
 class UserResponse(BaseModel):
@@ -108,6 +117,8 @@ class FileResponse(BaseModel):
     original_filename: str
     mime_type: str
     size_bytes: int
+    content_hash: Optional[str] = None  # SHA-256 of the contents
+    metadata_status: str = "ready"  # pending, ready, failed
     created_at: datetime
     
     # Computed fields for frontend compatibility
@@ -129,8 +140,10 @@ class FileResponse(BaseModel):
         api_base = "http://localhost:8000"
         self.public_url = f"{api_base}/api/v1/files/{self.id}/download"
         
-        # Simple thumbnail logic
-        if self.mime_type.startswith("image/"):
+        # Resized WebP variant for images and videos; SVGs scale on their own
+        if supports_thumbnail(self.mime_type):
+            self.thumbnail_url = f"{api_base}/api/v1/files/{self.id}/thumbnail?w={settings.THUMBNAIL_DEFAULT_WIDTH}"
+        elif self.mime_type.startswith("image/"):
             self.thumbnail_url = self.public_url
         else:
             self.thumbnail_url = "" # Frontend uses icons for non-images
@@ -141,6 +154,44 @@ class FileResponse(BaseModel):
         from_attributes = True
 
 
+class FileMetadataResponse(BaseModel):
+    """Schema for extracted file metadata."""
+    id: str
+    status: str  # pending, ready, failed
+    meta_data: Optional[dict] = None
+
+
+class BlobResponse(BaseModel):
+    """Schema for stored contents the current user already has."""
+    sha256: str
+    size_bytes: int
+
+
+class FileFromBlobCreate(BaseModel):
+    """Schema for creating a file from contents the user already uploaded."""
+    filename: str = Field(..., min_length=1, max_length=255)
+    workspace_id: Optional[UUID] = None
+
+
+class UploadSessionCreate(BaseModel):
+    """Schema for starting a resumable upload."""
+    filename: str = Field(..., min_length=1, max_length=255)
+    size_bytes: int = Field(..., ge=0)
+    workspace_id: Optional[UUID] = None
+
+
+class UploadSessionResponse(BaseModel):
+    """Schema for resumable upload progress."""
+    id: str
+    filename: str
+    size_bytes: int
+    bytes_received: int
+    offset: int  # End of the contiguous received prefix; where a sequential client resumes
+    received_ranges: List[List[int]]
+    expires_at: datetime
+    created_at: datetime
+
+
 class FileStatsResponse(BaseModel):
     """Schema for file statistics response."""
     total_count: int
@@ -240,6 +291,7 @@ class PromptResponse(BaseModel):
     name: str
     slug: str
     description: Optional[str]
+    latest_version_id: Optional[str] = None
     created_at: datetime
     versions: List[PromptVersionResponse] = []
     
@@ -247,6 +299,31 @@ class PromptResponse(BaseModel):
         from_attributes = True
 
 
+class PromptImportVersion(BaseModel):
+    """One version in a prompt import line."""
+    version: Optional[int] = None  # Only used for ordering; versions are renumbered on import
+    content: str
+    model: str
+    provider: str
+    parameters: Optional[str] = None
+
+
+class PromptImportRecord(BaseModel):
+    """One line of a JSONL prompt import."""
+    name: str = Field(..., min_length=1, max_length=255)
+    slug: Optional[str] = Field(None, min_length=1, max_length=255)  # Derived from name when omitted
+    description: Optional[str] = None
+    versions: List[PromptImportVersion] = []
+
+
+class PromptImportResponse(BaseModel):
+    """Schema for prompt import results."""
+    created: int
+    appended: int
+    skipped: int
+    versions: int
+
+
 # ========== Execution & Logging Schemas ==========
 
 class PromptExecutionRequest(BaseModel):
@@ -344,3 +421,18 @@ class ProviderKeyResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class KeyRotationJobResponse(BaseModel):
+    """Schema for provider key re-encryption progress."""
+    id: str
+    org_id: Optional[str]
+    status: str
+    processed: int
+    total: int
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,268 @@
+"""
+Resumable upload endpoints (tus-style).
+
+    POST   /files/uploads                  start a session for a file of known size
+    PATCH  /files/uploads/{id}             write the body at the `Upload-Offset` header
+    HEAD   /files/uploads/{id}             current `Upload-Offset` / `Upload-Length`
+    GET    /files/uploads/{id}             progress, including every received range
+    POST   /files/uploads/{id}/complete    turn the finished upload into a file
+    DELETE /files/uploads/{id}             abandon the upload
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import get_db
+from app.db.models import File, UploadSession, User, generate_uuid
+from app.auth.dependencies import get_current_active_user
+from app.routers.schemas import FileResponse as FileResponseSchema, UploadSessionCreate, UploadSessionResponse
+from app.services.blob_store import store_blob
+from app.services.file_storage import (
+    generate_unique_filename,
+    get_mime_type_from_buffer,
+    get_staging_dir,
+    read_file_head
+)
+from app.services.metadata_pipeline import schedule_metadata_extraction
+from app.services.thumbnails import schedule_thumbnail
+from app.services.resumable_uploads import (
+    contiguous_offset,
+    copy_staging_file,
+    create_staging_file,
+    get_ranges,
+    is_complete,
+    lock_staging_file,
+    record_chunk,
+    remove_staging_file,
+    session_expiry
+)
+from app.services.upload_stream import write_body_at
+
+router = APIRouter()
+
+
+def _get_upload(db: Session, upload_id: str, user_id: str) -> UploadSession:
+    upload = db.query(UploadSession).filter(
+        UploadSession.id == upload_id,
+        UploadSession.user_id == user_id
+    ).first()
+    if not upload:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    return upload
+
+
+def _progress_headers(upload: UploadSession) -> dict[str, str]:
+    return {
+        "Upload-Offset": str(contiguous_offset(get_ranges(upload))),
+        "Upload-Length": str(upload.size_bytes),
+        "Cache-Control": "no-store"
+    }
+
+
+def _session_response(upload: UploadSession) -> UploadSessionResponse:
+    ranges = get_ranges(upload)
+    return UploadSessionResponse(
+        id=upload.id,
+        filename=upload.filename,
+        size_bytes=upload.size_bytes,
+        bytes_received=upload.bytes_received,
+        offset=contiguous_offset(ranges),
+        received_ranges=ranges,
+        expires_at=upload.expires_at,
+        created_at=upload.created_at
+    )
+
+
+@router.post("", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    upload_data: UploadSessionCreate,
+    response: Response,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Start a resumable upload.
+    
+    The staging file is allocated at its full size up front, so chunks can be
+    sent in any order, including in parallel.
+    """
+    if upload_data.size_bytes > settings.RESUMABLE_UPLOAD_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Max size: {settings.RESUMABLE_UPLOAD_MAX_SIZE} bytes"
+        )
+    
+    upload_id = generate_uuid()
+    staging_path = os.path.join(get_staging_dir(), upload_id)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, create_staging_file, staging_path, upload_data.size_bytes)
+    
+    upload = UploadSession(
+        id=upload_id,
+        user_id=current_user.id,
+        workspace_id=upload_data.workspace_id,
+        filename=upload_data.filename,
+        size_bytes=upload_data.size_bytes,
+        staging_path=staging_path,
+        expires_at=session_expiry()
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+    
+    response.headers["Location"] = f"{settings.API_V1_PREFIX}/files/uploads/{upload.id}"
+    response.headers.update(_progress_headers(upload))
+    return _session_response(upload)
+
+
+@router.head("/{upload_id}")
+async def get_upload_offset(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the offset a sequential client should resume from."""
+    upload = _get_upload(db, upload_id, current_user.id)
+    return Response(status_code=status.HTTP_200_OK, headers=_progress_headers(upload))
+
+
+@router.get("/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload(
+    upload_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get upload progress, including every received byte range."""
+    upload = _get_upload(db, upload_id, current_user.id)
+    response.headers.update(_progress_headers(upload))
+    return _session_response(upload)
+
+
+@router.patch("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Write the request body into the upload at `Upload-Offset`.
+    
+    Chunks may arrive in any order and may overlap. If the connection drops,
+    the bytes received so far are kept; the response carries the new
+    `Upload-Offset`.
+    """
+    upload = _get_upload(db, upload_id, current_user.id)
+    remaining = upload.size_bytes - upload_offset
+    if remaining < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload-Offset is past the end of the upload")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > remaining:
+        raise HTTPException(status_code=413, detail="Chunk extends past the end of the upload")
+    
+    # Don't hold a database connection while the body streams in
+    staging_path = upload.staging_path
+    db.commit()
+    
+    written, _ = await write_body_at(request, staging_path, upload_offset, remaining)
+    
+    if written:
+        # Lock the session row before merging ranges so parallel chunks don't lose each other's updates
+        claimed = db.query(UploadSession).filter(UploadSession.id == upload_id).update(
+            {UploadSession.updated_at: datetime.utcnow()}, synchronize_session=False
+        )
+        if not claimed:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+        db.refresh(upload)
+        record_chunk(upload, upload_offset, upload_offset + written)
+        db.commit()
+    
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_progress_headers(upload))
+
+
+@router.post("/{upload_id}/complete", response_model=FileResponseSchema, status_code=status.HTTP_201_CREATED)
+async def complete_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Create the file from a fully received upload and end the session."""
+    upload = _get_upload(db, upload_id, current_user.id)
+    if not is_complete(upload):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload incomplete: {upload.bytes_received} of {upload.size_bytes} bytes received"
+        )
+    staging_path, original_filename, size_bytes, workspace_id = (
+        upload.staging_path, upload.filename, upload.size_bytes, upload.workspace_id
+    )
+    
+    db.commit()
+    loop = asyncio.get_running_loop()
+    # Chunk requests hold a shared lock on the staging file while they write
+    lock_fd = await loop.run_in_executor(None, lock_staging_file, staging_path)
+    if lock_fd is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A chunk is still being written")
+    copy_path = os.path.join(get_staging_dir(), f"{upload_id}.complete")
+    try:
+        # Deleting the session claims it, so a concurrent completion can't create a second file.
+        # Committed on its own: storing the contents awaits a file move before its first statement
+        claimed = db.query(UploadSession).filter(UploadSession.id == upload_id).delete(synchronize_session=False)
+        if not claimed:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+        db.commit()
+        
+        # The blob is made from a copy: a chunk request that opened the staging file
+        # before the claim may still write to it once the lock is released
+        sha256 = await loop.run_in_executor(None, copy_staging_file, lock_fd, copy_path)
+    except BaseException:
+        await loop.run_in_executor(None, remove_staging_file, copy_path)
+        raise
+    finally:
+        await loop.run_in_executor(None, os.close, lock_fd)
+    await loop.run_in_executor(None, remove_staging_file, staging_path)
+    head = await loop.run_in_executor(None, read_file_head, copy_path)
+    mime_type = get_mime_type_from_buffer(head, original_filename)
+    
+    async with store_blob(db, copy_path, sha256, size_bytes) as blob:
+        db_file = File(
+            user_id=current_user.id,
+            workspace_id=workspace_id,
+            filename=generate_unique_filename(original_filename),
+            original_filename=original_filename,
+            storage_path=blob.storage_path,
+            content_hash=blob.sha256,
+            mime_type=mime_type,
+            size_bytes=size_bytes,
+            metadata_status="pending"
+        )
+        db.add(db_file)
+        db.commit()
+        db.refresh(db_file)
+    
+    schedule_metadata_extraction(db_file.id, db_file.storage_path)
+    schedule_thumbnail(db_file.content_hash, db_file.storage_path, db_file.mime_type)
+    
+    return db_file
+
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Abandon an upload and delete what was received."""
+    upload = _get_upload(db, upload_id, current_user.id)
+    staging_path = upload.staging_path
+    db.delete(upload)
+    db.commit()
+    
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, remove_staging_file, staging_path)
+    return None
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models import User, Workspace
 from app.auth.dependencies import get_current_active_user
+from app.services.blob_store import delete_files, remove_stored_files
 from app.routers.schemas import WorkspaceCreate, WorkspaceUpdate, WorkspaceResponse
 
 router = APIRouter()
@@ -172,7 +173,12 @@ async def delete_workspace(
             detail="Workspace not found"
         )
     
+    # Files go through the blob store so their contents are released too
+    unused = delete_files(db, workspace.files)
+    # Reload the (now empty) collection so the workspace's cascade doesn't delete the rows again
+    db.expire(workspace, ["files"])
     db.delete(workspace)
     db.commit()
+    await remove_stored_files(unused)
     
     return None
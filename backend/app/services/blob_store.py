@@ -0,0 +1,174 @@
+"""
+Content-addressed blob store for uploaded files.
+
+Uploads are hashed (SHA-256) while they stream in. Contents are stored once
+under UPLOAD_DIR/blobs/<aa>/<bb>/<sha256>.<suffix>, and every File with the
+same hash points at that single Blob. Blob.ref_count tracks the number of
+such File rows. The blob is deleted when its last file is deleted, so file
+deletion must go through `delete_files`.
+
+Reference counts change with an atomic UPDATE on the blob row. That row lock
+orders uploads and deletions of the same contents. On SQLite the UPDATE
+takes the single writer until commit, so nothing here awaits between the
+first statement and the commit: files are moved into place before it and
+deleted after it. Each blob gets its own path (the suffix), so deleting a
+blob's file after commit can't remove the file of a newer blob with the
+same contents.
+"""
+
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.models import Blob, File
+from app.services.thumbnails import remove_variants
+
+
+def new_blob_path(sha256: str) -> str:
+    """Storage path for a new blob with these contents."""
+    return os.path.join(settings.UPLOAD_DIR, "blobs", sha256[:2], sha256[2:4], f"{sha256}.{uuid.uuid4().hex[:8]}")
+
+
+def _move_into_place(temp_path: str, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(temp_path, path)
+
+
+def _remove(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _add_reference(db: Session, sha256: str) -> bool:
+    return bool(db.query(Blob).filter(Blob.sha256 == sha256).update(
+        {Blob.ref_count: Blob.ref_count + 1}, synchronize_session=False
+    ))
+
+
+def _reference_blob(db: Session, sha256: str, size_bytes: int, path: str) -> Blob:
+    """Add a reference to the blob with these contents, creating it at `path` if new."""
+    if _add_reference(db, sha256):
+        return db.get(Blob, sha256)
+    blob = Blob(sha256=sha256, size_bytes=size_bytes, storage_path=path, ref_count=1)
+    try:
+        with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        # Another upload of the same contents created the blob first
+        _add_reference(db, sha256)
+        blob = db.get(Blob, sha256)
+    return blob
+
+
+@asynccontextmanager
+async def store_blob(db: Session, temp_path: str, sha256: str, size_bytes: int) -> AsyncIterator[Blob]:
+    """
+    Add a reference to the blob with these contents, creating it from temp_path if new.
+
+    The block adds the File row that uses the blob and commits, without
+    awaiting: the reference is written before the block runs, and the writer
+    is held until the commit.
+
+    Usage:
+        async with store_blob(db, staging_path, sha256, size_bytes) as blob:
+            db.add(File(..., storage_path=blob.storage_path, content_hash=blob.sha256))
+            db.commit()
+
+    temp_path is consumed either way. It becomes the new blob's file, or is
+    deleted after the block: as a duplicate, or because the block failed and
+    the session was rolled back.
+
+    Args:
+        db: Database session, with nothing written yet
+        temp_path: Fully written upload (on the same filesystem as UPLOAD_DIR)
+        sha256: Hex SHA-256 of the upload
+        size_bytes: Upload size
+
+    Yields:
+        The referenced blob
+    """
+    loop = asyncio.get_running_loop()
+    path = new_blob_path(sha256)
+    await loop.run_in_executor(None, _move_into_place, temp_path, path)
+    try:
+        blob = _reference_blob(db, sha256, size_bytes, path)
+        created = blob.storage_path == path
+        yield blob
+    except BaseException:
+        db.rollback()
+        await loop.run_in_executor(None, _remove, path)
+        raise
+    if not created:
+        await loop.run_in_executor(None, _remove, path)
+
+
+def add_blob_reference(db: Session, sha256: str) -> None:
+    """Reference an existing blob from a new File row."""
+    if not _add_reference(db, sha256):
+        raise ValueError(f"Blob {sha256} not found")
+
+
+def release_blob(db: Session, sha256: str) -> Optional[str]:
+    """
+    Drop one reference to a blob, deleting its row when none remain.
+
+    Returns:
+        Storage path of the deleted blob, to remove once the session is committed
+    """
+    db.query(Blob).filter(Blob.sha256 == sha256).update(
+        {Blob.ref_count: Blob.ref_count - 1}, synchronize_session=False
+    )
+    unreferenced = db.query(Blob.storage_path).filter(Blob.sha256 == sha256, Blob.ref_count <= 0).scalar()
+    if unreferenced is not None:
+        db.query(Blob).filter(Blob.sha256 == sha256).delete(synchronize_session=False)
+    return unreferenced
+
+
+def delete_files(db: Session, files: Iterable[File]) -> list[tuple[str, str]]:
+    """
+    Delete File rows and drop their references to stored contents.
+
+    Use for every deletion of files, including through a workspace or user
+    (their ORM cascades would skip the reference counts). Expire a parent's
+    loaded `files` collection before deleting the parent, so its cascade
+    doesn't delete the rows again. Commit, then pass the result to
+    `remove_stored_files`.
+
+    Args:
+        db: Database session
+        files: Files to delete
+
+    Returns:
+        (storage path, variant key) of each stored file that is no longer used
+    """
+    files = list(files)
+    for file in files:
+        db.delete(file)
+    db.flush()
+
+    unused = []
+    for file in files:
+        if file.content_hash:
+            path = release_blob(db, file.content_hash)
+            if path is not None:
+                unused.append((path, file.content_hash))
+        else:
+            # Stored before deduplication: the file owns its path and its variants
+            unused.append((file.storage_path, file.id))
+    return unused
+
+
+def _remove_stored_files(unused: list[tuple[str, str]]) -> None:
+    for path, key in unused:
+        _remove(path)
+        remove_variants(key)
+
+
+async def remove_stored_files(unused: list[tuple[str, str]]) -> None:
+    """Delete stored contents and their variants returned by `delete_files`, after the commit."""
+    if unused:
+        await asyncio.get_running_loop().run_in_executor(None, _remove_stored_files, unused)
@@ -1,42 +1,204 @@
 """
 Encryption utilities for secure API key storage.
+
+Provider keys use envelope encryption: each organization has data keys
+(OrganizationDataKey, versioned) that encrypt its rows, and only the data keys
+are encrypted ("wrapped") by the master key. Rotating the master key therefore
+re-wraps one small row per organization instead of re-encrypting every secret.
+Rows without a data key version predate envelope encryption and are
+encrypted directly under the master key.
 """
 
 import os
-from cryptography.fernet import Fernet
+import base64
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Optional
+from cryptography.fernet import Fernet, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-import base64
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.models import OrganizationDataKey
+
+logger = logging.getLogger(__name__)
 
-def get_encryption_key() -> bytes:
+
+def get_master_keys() -> list[str]:
     """
-    Get or generate encryption key from environment.
+    Get the configured master keys, newest first.
+
+    ENCRYPTION_MASTER_KEY may hold several comma-separated keys for rotation:
+    the first encrypts new values, all of them can decrypt.
     In production, this should come from a secure key management system.
     """
-    master_key = os.getenv("ENCRYPTION_MASTER_KEY")
-    if not master_key:
-        # For development, generate a key (NOT for production!)
-        master_key = base64.urlsafe_b64encode(os.urandom(32)).decode()
-        print(f"⚠️  WARNING: Using generated encryption key. Set ENCRYPTION_MASTER_KEY in production!")
-    
-    # Derive a Fernet key from the master key
+    if settings.ENCRYPTION_MASTER_KEY:
+        return [key.strip() for key in settings.ENCRYPTION_MASTER_KEY.split(",") if key.strip()]
+
+    # For development, generate a key once and persist it so stored keys stay readable (NOT for production!)
+    key_file = settings.ENCRYPTION_KEY_FILE
+    if not os.path.exists(key_file):
+        _create_key_file(key_file)
+    logger.warning(f"⚠️  Using generated encryption key from {key_file}. Set ENCRYPTION_MASTER_KEY in production!")
+    with open(key_file) as f:
+        return [f.read().strip()]
+
+
+def _create_key_file(key_file: str) -> None:
+    """
+    Write a new random key to `key_file` unless one exists.
+
+    The key is written to a temporary file first and then hard-linked into
+    place, so readers never see a partial file and, when workers start
+    together, the first link wins and everyone reads that key.
+    """
+    os.makedirs(os.path.dirname(key_file) or ".", exist_ok=True)
+    tmp_path = f"{key_file}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(base64.urlsafe_b64encode(os.urandom(32)).decode())
+        os.link(tmp_path, key_file)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp_path)
+
+
+def derive_key(master_key: str) -> bytes:
+    """Derive a Fernet key from a master key (PBKDF2, deliberately slow)."""
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=32,
         salt=b'piee_salt_v1',  # In production, use a random salt per key
         iterations=100000,
     )
-    key = base64.urlsafe_b64encode(kdf.derive(master_key.encode()))
-    return key
+    return base64.urlsafe_b64encode(kdf.derive(master_key.encode()))
+
+
+@lru_cache(maxsize=1)
+def get_fernet() -> MultiFernet:
+    """
+    Build the cipher once per process.
+    Key derivation is the expensive part, so it must not run per call.
+    """
+    return MultiFernet([Fernet(derive_key(master_key)) for master_key in get_master_keys()])
+
+
+@lru_cache(maxsize=1)
+def get_master_key_id() -> str:
+    """Short fingerprint of the current master key, recorded on wrapped data keys."""
+    return hashlib.sha256(derive_key(get_master_keys()[0])).hexdigest()[:16]
+
 
 def encrypt_api_key(api_key: str) -> str:
     """Encrypt an API key for storage."""
-    f = Fernet(get_encryption_key())
-    encrypted = f.encrypt(api_key.encode())
+    encrypted = get_fernet().encrypt(api_key.encode())
     return encrypted.decode()
 
+
 def decrypt_api_key(encrypted_key: str) -> str:
     """Decrypt an API key for use."""
-    f = Fernet(get_encryption_key())
-    decrypted = f.decrypt(encrypted_key.encode())
+    decrypted = get_fernet().decrypt(encrypted_key.encode())
     return decrypted.decode()
+
+
+def rotate_api_key(encrypted_key: str) -> str:
+    """Re-encrypt a stored value under the newest master key."""
+    return get_fernet().rotate(encrypted_key.encode()).decode()
+
+
+# ========== Envelope encryption (per-organization data keys) ==========
+
+# Unwrapped data keys by (org_id, version); versions are immutable once created
+_data_keys: dict[tuple[str, int], Fernet] = {}
+_data_keys_lock = threading.Lock()
+
+
+def wrap_data_key(data_key: bytes) -> str:
+    """Encrypt a data key under the current master key."""
+    return get_fernet().encrypt(data_key).decode()
+
+
+def create_org_data_key(db: Session, org_id: str) -> OrganizationDataKey:
+    """
+    Create the next data key version for an organization.
+
+    Uses its own session so the caller's transaction is untouched; if another
+    request creates the same version concurrently, that key is returned instead.
+    """
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as key_db:
+        latest = key_db.query(func.max(OrganizationDataKey.version)).filter(
+            OrganizationDataKey.org_id == org_id
+        ).scalar() or 0
+        data_key = OrganizationDataKey(
+            org_id=org_id,
+            version=latest + 1,
+            wrapped_key=wrap_data_key(Fernet.generate_key()),
+            master_key_id=get_master_key_id()
+        )
+        key_db.add(data_key)
+        try:
+            key_db.commit()
+        except IntegrityError:
+            key_db.rollback()
+        return key_db.query(OrganizationDataKey).filter(
+            OrganizationDataKey.org_id == org_id,
+            OrganizationDataKey.version == latest + 1
+        ).one()
+
+
+def get_org_data_key(db: Session, org_id: str, version: Optional[int] = None) -> tuple[int, Fernet]:
+    """
+    Get an organization's data key, unwrapped.
+
+    Args:
+        db: Database session
+        org_id: Organization ID
+        version: Data key version, or None for the latest (created on first use)
+
+    Returns:
+        Tuple of (version, cipher)
+    """
+    if version is not None:
+        cipher = _data_keys.get((org_id, version))
+        if cipher is not None:
+            return version, cipher
+
+    query = db.query(OrganizationDataKey).filter(OrganizationDataKey.org_id == org_id)
+    if version is None:
+        row = query.order_by(OrganizationDataKey.version.desc()).first() or create_org_data_key(db, org_id)
+    else:
+        row = query.filter(OrganizationDataKey.version == version).first()
+        if row is None:
+            raise ValueError(f"Data key v{version} not found for organization {org_id}")
+
+    cipher = Fernet(get_fernet().decrypt(row.wrapped_key.encode()))
+    with _data_keys_lock:
+        _data_keys[(org_id, row.version)] = cipher
+    return row.version, cipher
+
+
+def encrypt_for_org(db: Session, org_id: str, plaintext: str) -> tuple[str, int]:
+    """
+    Encrypt a value with the organization's latest data key.
+
+    Returns:
+        Tuple of (ciphertext, data key version) to store on the row
+    """
+    version, cipher = get_org_data_key(db, org_id)
+    return cipher.encrypt(plaintext.encode()).decode(), version
+
+
+def decrypt_for_org(db: Session, org_id: str, ciphertext: str, version: Optional[int]) -> str:
+    """Decrypt a value stored with `encrypt_for_org` (or a legacy master-key value when version is None)."""
+    if version is None:
+        return decrypt_api_key(ciphertext)
+    _, cipher = get_org_data_key(db, org_id, version)
+    return cipher.decrypt(ciphertext.encode()).decode()
@@ -6,32 +6,16 @@ import os
 import uuid
 import mimetypes
 from typing import Optional
-from fastapi import UploadFile
+from fastapi import Request
 from app.core.config import settings
+from app.services.upload_stream import MIME_SNIFF_BYTES, receive_upload
 
-import json
 import shutil
 from pathlib import Path
 from hachoir.parser import createParser
 from hachoir.metadata import extractMetadata
 import magic
 
-def get_user_upload_dir(user_id: str) -> str:
-    """
-    Get the upload directory for a specific user.
-    Creates the directory if it doesn't exist.
-    
-    Args:
-        user_id: User ID
-    
-    Returns:
-        Path to user's upload directory
-    """
-    user_dir = os.path.join(settings.UPLOAD_DIR, user_id)
-    os.makedirs(user_dir, exist_ok=True)
-    return user_dir
-
-
 def generate_unique_filename(original_filename: str) -> str:
     """
     Generate a unique filename to prevent conflicts.
@@ -53,47 +37,41 @@ def generate_unique_filename(original_filename: str) -> str:
     return f"{unique_id}_{safe_name}"
 
 
-async def save_upload_file(user_id: str, file: UploadFile) -> tuple[str, str, int, Optional[str], str]:
+async def save_upload_file(request: Request) -> tuple[str, str, int, str, str]:
     """
-    Save an uploaded file to disk using streaming.
+    Stream an uploaded file from a multipart request to a staging file, hashing it on the way.
+    
+    The MIME type is sniffed from the first bytes kept during streaming;
+    metadata extraction is left to the background pipeline.
     
     Args:
-        user_id: User ID
-        file: Uploaded file
+        request: Upload request (body not yet read)
     
     Returns:
-        Tuple of (storage_path, filename, file_size, metadata_json, mime_type)
-    """
-    # Generate unique filename
-    filename = generate_unique_filename(file.filename or "unnamed")
-    
-    # Get user directory
-    user_dir = get_user_upload_dir(user_id)
-    
-    # Full path
-    storage_path = os.path.join(user_dir, filename)
-    
-    # Save file using streaming to avoid memory issues
-    try:
-        with open(storage_path, "wb") as buffer:
-            while content := await file.read(1024 * 1024):  # Read in 1MB chunks
-                buffer.write(content)
-    except Exception as e:
-        # Cleanup if save fails
-        if os.path.exists(storage_path):
-            os.remove(storage_path)
-        raise e
+        Tuple of (staging_path, original_filename, file_size, sha256, mime_type);
+        the staging file is then handed to `store_blob`
     
-    file_size = os.path.getsize(storage_path)
-    
-    # Detect MIME type properly
-    mime_type = get_mime_type(storage_path)
-    
-    # Extract metadata
-    metadata = extract_file_metadata(storage_path)
-    metadata_json = json.dumps(metadata) if metadata else None
+    Raises:
+        HTTPException: If the file is too large or the body is malformed
+    """
+    staging_dir = get_staging_dir()
+    upload = await receive_upload(request, lambda name: os.path.join(staging_dir, str(uuid.uuid4())))
+    mime_type = get_mime_type_from_buffer(upload.head, upload.filename)
     
-    return storage_path, filename, file_size, metadata_json, mime_type
+    return upload.path, upload.filename, upload.size, upload.sha256, mime_type
+
+
+def get_staging_dir() -> str:
+    """Directory for uploads in progress (inside UPLOAD_DIR so they can be renamed into place)."""
+    staging_dir = os.path.join(settings.UPLOAD_DIR, ".staging")
+    os.makedirs(staging_dir, exist_ok=True)
+    return staging_dir
+
+
+def read_file_head(file_path: str) -> bytes:
+    """Read the leading bytes of a file for MIME sniffing."""
+    with open(file_path, "rb") as f:
+        return f.read(MIME_SNIFF_BYTES)
 
 
 def delete_file(storage_path: str) -> bool:
@@ -124,6 +102,18 @@ def get_mime_type(file_path: str) -> str:
         return mime_type or "application/octet-stream"
 
 
+def get_mime_type_from_buffer(head: bytes, filename: str) -> str:
+    """
+    Get MIME type from the first bytes of a file using python-magic.
+    Falls back to the filename extension if magic fails.
+    """
+    try:
+        return magic.from_buffer(head, mime=True)
+    except Exception:
+        mime_type, _ = mimetypes.guess_type(filename)
+        return mime_type or "application/octet-stream"
+
+
 def extract_file_metadata(file_path: str) -> Optional[dict]:
     """
     Extract metadata from file using Hachoir.
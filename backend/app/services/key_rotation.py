@@ -0,0 +1,184 @@
+"""
+Key rotation jobs for provider key encryption.
+
+- Master key rotation: put the new key first in ENCRYPTION_MASTER_KEY, then
+  `rewrap_data_keys` re-wraps each organization's data keys (one row per
+  org and version, committed per batch).
+- Data key rotation: `rotate_org_data_key` adds a new data key version, then a
+  KeyRotationJob re-encrypts the affected ProviderKey rows in batches.
+
+Jobs walk provider_keys in primary-key order and store the last processed id
+as their cursor, committing after each batch. A crashed or interrupted job
+resumes from its cursor, and no transaction is held longer than one batch.
+
+Usage:
+    python -m app.services.key_rotation rewrap
+    python -m app.services.key_rotation reencrypt [--org ORG_ID] [--batch-size N]
+"""
+
+import argparse
+import logging
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.db.models import KeyRotationJob, OrganizationDataKey, ProviderKey
+from app.services.encryption import (
+    create_org_data_key,
+    decrypt_for_org,
+    encrypt_for_org,
+    get_fernet,
+    get_master_key_id
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def rewrap_data_keys(db: Session, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Re-wrap data keys that were wrapped by an older master key.
+
+    Returns:
+        Number of data keys re-wrapped
+    """
+    master_key_id = get_master_key_id()
+    fernet = get_fernet()
+    rewrapped = 0
+
+    while True:
+        rows = db.query(OrganizationDataKey).filter(
+            OrganizationDataKey.master_key_id != master_key_id
+        ).limit(batch_size).all()
+        if not rows:
+            break
+
+        for row in rows:
+            row.wrapped_key = fernet.rotate(row.wrapped_key.encode()).decode()
+            row.master_key_id = master_key_id
+        db.commit()
+        rewrapped += len(rows)
+        logger.info(f"🔁 Re-wrapped {rewrapped} data keys")
+
+    return rewrapped
+
+
+def rotate_org_data_key(db: Session, org_id: str) -> KeyRotationJob:
+    """Create a new data key version for an organization and a job to re-encrypt its rows."""
+    create_org_data_key(db, org_id)
+    return create_reencryption_job(db, org_id)
+
+
+def create_reencryption_job(db: Session, org_id: Optional[str] = None) -> KeyRotationJob:
+    """Create a re-encryption job, or return the unfinished one for the same scope."""
+    job = db.query(KeyRotationJob).filter(
+        KeyRotationJob.org_id == org_id,
+        KeyRotationJob.status.in_(["pending", "running", "failed"])
+    ).order_by(KeyRotationJob.created_at.desc()).first()
+    if job:
+        return job
+
+    total_query = db.query(func.count(ProviderKey.id))
+    if org_id:
+        total_query = total_query.filter(ProviderKey.org_id == org_id)
+
+    job = KeyRotationJob(org_id=org_id, total=total_query.scalar() or 0)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def run_reencryption_job(db: Session, job_id: str, batch_size: int = DEFAULT_BATCH_SIZE) -> KeyRotationJob:
+    """
+    Re-encrypt provider keys under each organization's latest data key.
+
+    Safe to call again on a failed or interrupted job: it continues after the
+    last committed batch. Rows already on the latest version are skipped.
+    """
+    job = db.get(KeyRotationJob, job_id)
+    if job.status == "completed":
+        return job
+
+    job.status = "running"
+    job.error = None
+    db.commit()
+
+    latest_versions: dict[str, int] = {}
+    try:
+        while True:
+            query = db.query(ProviderKey).order_by(ProviderKey.id)
+            if job.org_id:
+                query = query.filter(ProviderKey.org_id == job.org_id)
+            if job.cursor:
+                query = query.filter(ProviderKey.id > job.cursor)
+            rows = query.limit(batch_size).all()
+            if not rows:
+                break
+
+            for row in rows:
+                if row.org_id not in latest_versions:
+                    latest_versions[row.org_id] = db.query(func.max(OrganizationDataKey.version)).filter(
+                        OrganizationDataKey.org_id == row.org_id
+                    ).scalar()
+                if row.key_version is not None and row.key_version == latest_versions[row.org_id]:
+                    continue
+
+                plaintext = decrypt_for_org(db, row.org_id, row.encrypted_key, row.key_version)
+                row.encrypted_key, row.key_version = encrypt_for_org(db, row.org_id, plaintext)
+                latest_versions[row.org_id] = row.key_version
+
+            job.cursor = rows[-1].id
+            job.processed += len(rows)
+            db.commit()
+            logger.info(f"🔁 Key rotation job {job.id}: {job.processed}/{job.total}")
+
+        job.status = "completed"
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        job.status = "failed"
+        job.error = str(e)
+        db.commit()
+        logger.error(f"Key rotation job {job.id} failed: {e}")
+
+    return job
+
+
+def run_reencryption_job_in_background(job_id: str) -> None:
+    """Entry point for FastAPI BackgroundTasks (runs in the threadpool)."""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        run_reencryption_job(db, job_id)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rotate provider key encryption")
+    parser.add_argument("command", choices=["rewrap", "reencrypt"])
+    parser.add_argument("--org", dest="org_id", default=None, help="Limit re-encryption to one organization")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "rewrap":
+            count = rewrap_data_keys(db, args.batch_size)
+            logger.info(f"✅ Re-wrapped {count} data keys")
+        else:
+            job = create_reencryption_job(db, args.org_id)
+            job = run_reencryption_job(db, job.id, args.batch_size)
+            logger.info(f"✅ Job {job.id} {job.status}: {job.processed}/{job.total}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
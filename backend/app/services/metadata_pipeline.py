@@ -0,0 +1,209 @@
+"""
+Background metadata extraction for uploaded files.
+
+Uploads return as soon as the contents are stored, with `metadata_status`
+"pending". Hachoir then parses the file in a small process pool
+(METADATA_WORKERS), so large videos cost neither event loop time nor the
+GIL, and the row is updated to "ready" (or "failed" on timeout or crash).
+Files whose contents were already analysed for another file copy that
+result instead of parsing again.
+
+Jobs are handed to the pool only when a worker is free, so
+METADATA_TIMEOUT_SECONDS counts running time, not time queued behind a
+burst. A running job can't be cancelled, so on timeout the pool's
+processes are killed and a new pool is started; jobs that were running
+beside it are retried once on the new pool.
+
+Rows left pending by a restart are picked up again at startup, by one
+worker only: the first to start holds a lock file for its lifetime, so
+with several uvicorn workers each pending file is extracted once.
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from app.core.config import settings
+from app.db.models import File
+from app.services.file_storage import extract_file_metadata
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# One slot per worker process; a job takes a slot before it is submitted
+_slots: Optional[asyncio.Semaphore] = None
+
+# Keep references so pending tasks aren't garbage collected
+_tasks: set[asyncio.Task] = set()
+
+# Held open by the one worker that requeues pending rows
+_requeue_lock = None
+
+
+def get_metadata_pool() -> ProcessPoolExecutor:
+    """Process pool for metadata extraction, created on first use."""
+    global _pool
+    if _pool is None:
+        # Spawned rather than forked: the server process already runs threads
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.METADATA_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_metadata_pool() -> None:
+    """Stop the worker processes, dropping queued work (it is requeued on next startup)."""
+    global _pool, _slots
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+    _slots = None
+
+
+def _kill_pool(pool: ProcessPoolExecutor) -> None:
+    """Kill a pool's processes, including one stuck in a job; the next job starts a new pool."""
+    global _pool
+    if _pool is pool:
+        _pool = None
+    # ProcessPoolExecutor has no way to stop a running job other than killing its process
+    for process in list((pool._processes or {}).values()):
+        process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_in_metadata_pool(func, *args):
+    """
+    Run a CPU-heavy media job in the worker pool, once a worker is free.
+
+    Args:
+        func: Picklable function to run in a worker process
+        *args: Its arguments
+
+    Returns:
+        The function's result
+
+    Raises:
+        asyncio.TimeoutError: If the job ran longer than METADATA_TIMEOUT_SECONDS (its worker is killed)
+        BrokenProcessPool: If the job crashed its worker (twice)
+    """
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.METADATA_WORKERS)
+    loop = asyncio.get_running_loop()
+    async with _slots:
+        for attempt in range(2):
+            pool = get_metadata_pool()
+            future = loop.run_in_executor(pool, func, *args)
+            try:
+                return await asyncio.wait_for(future, timeout=settings.METADATA_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                _kill_pool(pool)
+                raise
+            except BrokenProcessPool:
+                # A worker crashed, or was killed for another job's timeout: retry once on a new pool
+                _kill_pool(pool)
+                if attempt:
+                    raise
+
+
+def _find_known_metadata(file_id: str) -> tuple[Optional[str], bool]:
+    """Look for another file with the same contents whose metadata is ready."""
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        file = db.get(File, file_id)
+        if file is None or file.metadata_status != "pending":
+            return None, True
+        if file.content_hash:
+            known = db.query(File.meta_data).filter(
+                File.content_hash == file.content_hash,
+                File.metadata_status == "ready"
+            ).first()
+            if known:
+                return known.meta_data, True
+        return None, False
+
+
+def _save_metadata(file_id: str, metadata_json: Optional[str], status: str) -> None:
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        db.query(File).filter(File.id == file_id, File.metadata_status == "pending").update(
+            {File.meta_data: metadata_json, File.metadata_status: status}, synchronize_session=False
+        )
+        db.commit()
+
+
+async def extract_metadata(file_id: str, storage_path: str) -> None:
+    """Extract a file's metadata in the process pool and store the result on its row."""
+    loop = asyncio.get_running_loop()
+    try:
+        metadata_json, done = await loop.run_in_executor(None, _find_known_metadata, file_id)
+        if not done:
+            metadata = await run_in_metadata_pool(extract_file_metadata, storage_path)
+            metadata_json = json.dumps(metadata) if metadata else None
+        status = "ready"
+    except Exception as e:
+        logger.error(f"Metadata extraction failed for file {file_id}: {e!r}")
+        metadata_json, status = None, "failed"
+
+    await loop.run_in_executor(None, _save_metadata, file_id, metadata_json, status)
+
+
+def schedule_metadata_extraction(file_id: str, storage_path: str) -> None:
+    """Queue extraction for a newly stored file without waiting for it."""
+    task = asyncio.get_running_loop().create_task(extract_metadata(file_id, storage_path))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _claim_requeue() -> bool:
+    """Take the requeue lock for this process's lifetime, unless another worker holds it."""
+    global _requeue_lock
+    if _requeue_lock is not None:
+        return True
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    lock_file = open(os.path.join(settings.UPLOAD_DIR, ".metadata_requeue.lock"), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+    _requeue_lock = lock_file
+    return True
+
+
+def requeue_pending_metadata(limit: int = 1000) -> int:
+    """
+    Queue extraction for files left pending (e.g. by a restart). Call from the event loop.
+
+    Only the worker holding the requeue lock does this; the others return 0.
+    The lock is released when that worker exits, so the next worker to
+    start takes over.
+
+    Args:
+        limit: Maximum number of rows to requeue
+
+    Returns:
+        Number of files queued
+    """
+    from app.db.session import SessionLocal
+
+    if not _claim_requeue():
+        logger.info("🔎 Another worker requeues pending metadata; skipping")
+        return 0
+
+    with SessionLocal() as db:
+        pending = db.query(File.id, File.storage_path).filter(File.metadata_status == "pending").limit(limit).all()
+    for file_id, storage_path in pending:
+        schedule_metadata_extraction(file_id, storage_path)
+    if pending:
+        logger.info(f"🔎 Requeued metadata extraction for {len(pending)} files")
+    return len(pending)
@@ -0,0 +1,177 @@
+"""
+Bulk import and export of an organization's prompt library as JSONL.
+
+Each line is one prompt with all of its versions:
+
+    {"name": "...", "slug": "...", "description": "...",
+     "versions": [{"version": 1, "content": "...", "model": "...", "provider": "...", "parameters": null}]}
+
+Import inserts every prompt and version with multi-row INSERTs in a single
+transaction. Export walks the prompts in primary-key order, a batch at a
+time, so the whole library is never loaded at once.
+"""
+
+import json
+from typing import Iterator
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session, selectinload
+from app.core.config import settings
+from app.db.models import Prompt, PromptVersion, generate_uuid
+
+CONFLICT_MODES = ("skip", "append", "error")
+
+
+class SlugConflictError(Exception):
+    """Raised by an on_conflict="error" import when slugs already exist."""
+
+    def __init__(self, slugs: list[str]):
+        super().__init__(f"Slugs already exist: {', '.join(slugs[:20])}")
+        self.slugs = slugs
+
+
+def import_prompts(db: Session, org_id: str, records: list, on_conflict: str = "skip") -> dict[str, int]:
+    """
+    Import prompts and their versions into an organization.
+
+    Args:
+        db: Database session
+        org_id: Organization to import into
+        records: Parsed JSONL records (PromptImportRecord) with slugs filled in
+        on_conflict: What to do when a slug already exists (in the org or earlier in the file):
+            "skip" ignores the record, "append" adds its versions to the existing
+            prompt, "error" rejects the whole import
+
+    Returns:
+        Counts of created, appended and skipped prompts and imported versions
+
+    Raises:
+        SlugConflictError: If on_conflict is "error" and any slug conflicts
+    """
+    existing = {}
+    for prompt_id, slug in db.query(Prompt.id, Prompt.slug).filter(Prompt.org_id == org_id).order_by(Prompt.created_at):
+        existing.setdefault(slug, prompt_id)
+
+    if on_conflict == "error":
+        conflicts = set()
+        seen = set()
+        for record in records:
+            if record.slug in existing or record.slug in seen:
+                conflicts.add(record.slug)
+            seen.add(record.slug)
+        if conflicts:
+            raise SlugConflictError(sorted(set(conflicts)))
+
+    new_prompts: dict[str, dict] = {}
+    new_versions: dict[str, list] = {}
+    appended: dict[str, list] = {}
+    result = {"created": 0, "appended": 0, "skipped": 0, "versions": 0}
+
+    for record in records:
+        versions = sorted(record.versions, key=lambda v: v.version or 0)
+        target = new_prompts.get(record.slug)
+        if target is None and record.slug not in existing:
+            prompt_id = generate_uuid()
+            new_prompts[record.slug] = {
+                "id": prompt_id,
+                "org_id": org_id,
+                "name": record.name,
+                "slug": record.slug,
+                "description": record.description
+            }
+            new_versions[prompt_id] = versions
+            result["created"] += 1
+        elif on_conflict == "skip":
+            result["skipped"] += 1
+            continue
+        elif target is not None:
+            new_versions[target["id"]].extend(versions)
+            result["appended"] += 1
+        else:
+            appended.setdefault(existing[record.slug], []).extend(versions)
+            result["appended"] += 1
+
+    if new_prompts:
+        db.execute(insert(Prompt), list(new_prompts.values()))
+
+    # Existing prompts continue from their counter, claimed atomically like create_prompt_version
+    first_versions = {prompt_id: 1 for prompt_id in new_versions}
+    for prompt_id, versions in appended.items():
+        db.query(Prompt).filter(Prompt.id == prompt_id).update(
+            {Prompt.version_count: Prompt.version_count + len(versions)}, synchronize_session=False
+        )
+        count = db.query(Prompt.version_count).filter(Prompt.id == prompt_id).scalar()
+        first_versions[prompt_id] = count - len(versions) + 1
+        new_versions[prompt_id] = versions
+
+    version_rows = []
+    latest = []
+    for prompt_id, versions in new_versions.items():
+        if not versions:
+            continue
+        for offset, version in enumerate(versions):
+            version_rows.append({
+                "id": generate_uuid(),
+                "prompt_id": prompt_id,
+                "version": first_versions[prompt_id] + offset,
+                "content": version.content,
+                "model": version.model,
+                "provider": version.provider,
+                "parameters": version.parameters
+            })
+        latest.append({
+            "id": prompt_id,
+            "latest_version_id": version_rows[-1]["id"],
+            "version_count": version_rows[-1]["version"]
+        })
+
+    if version_rows:
+        db.execute(insert(PromptVersion), version_rows)
+        db.execute(update(Prompt), latest)
+
+    db.commit()
+    result["versions"] = len(version_rows)
+    return result
+
+
+def export_prompts(org_id: str) -> Iterator[str]:
+    """
+    Yield an organization's prompts as JSONL lines.
+
+    Uses its own session because the response is streamed after the
+    request's dependencies have finished.
+    """
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        last_id = None
+        while True:
+            query = db.query(Prompt).options(selectinload(Prompt.versions)).filter(
+                Prompt.org_id == org_id
+            ).order_by(Prompt.id)
+            if last_id:
+                query = query.filter(Prompt.id > last_id)
+            prompts = query.limit(settings.PROMPT_EXPORT_BATCH_SIZE).all()
+            if not prompts:
+                break
+
+            lines = []
+            for prompt in prompts:
+                lines.append(json.dumps({
+                    "name": prompt.name,
+                    "slug": prompt.slug,
+                    "description": prompt.description,
+                    "versions": [
+                        {
+                            "version": version.version,
+                            "content": version.content,
+                            "model": version.model,
+                            "provider": version.provider,
+                            "parameters": version.parameters
+                        }
+                        for version in sorted(prompt.versions, key=lambda v: v.version)
+                    ]
+                }) + "\n")
+            yield "".join(lines)
+
+            last_id = prompts[-1].id
+            db.expunge_all()
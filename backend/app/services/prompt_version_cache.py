@@ -0,0 +1,66 @@
+"""
+In-process cache of prompt versions for execution.
+
+Prompt versions are immutable once created, so entries never go stale; the
+cache is only bounded by size. Execution looks up `Prompt.latest_version_id`
+and resolves the version here before falling back to a primary-key query.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from app.core.config import settings
+from app.db.models import PromptVersion
+
+
+@dataclass(frozen=True)
+class CachedPromptVersion:
+    """The fields of a PromptVersion that execution needs."""
+    id: str
+    prompt_id: str
+    version: int
+    content: str
+    model: str
+    provider: str
+    parameters: Optional[str]
+
+
+class PromptVersionCache:
+    """LRU cache of prompt versions by id."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CachedPromptVersion] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version_id: str) -> Optional[CachedPromptVersion]:
+        with self._lock:
+            entry = self._entries.get(version_id)
+            if entry is not None:
+                self._entries.move_to_end(version_id)
+            return entry
+
+    def put(self, version: PromptVersion) -> CachedPromptVersion:
+        """Cache a loaded version and return the cached copy."""
+        entry = CachedPromptVersion(
+            id=version.id,
+            prompt_id=version.prompt_id,
+            version=version.version,
+            content=version.content,
+            model=version.model,
+            provider=version.provider,
+            parameters=version.parameters
+        )
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            self._entries[entry.id] = entry
+            self._entries.move_to_end(entry.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+# Global cache used by the execution endpoint
+prompt_version_cache = PromptVersionCache(max_entries=settings.PROMPT_VERSION_CACHE_MAX_ENTRIES)
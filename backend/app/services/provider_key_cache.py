@@ -0,0 +1,90 @@
+"""
+Short-lived cache of decrypted provider (BYOK) API keys.
+
+Lets prompt execution skip the ProviderKey query and decryption for an
+(org, provider) pair it has used in the last few seconds.
+
+Expiry is short, and entries are evicted as soon as a key is added or
+deleted on this worker. Other workers drop their copy within
+PROVIDER_KEY_CACHE_TTL_SECONDS. Decrypted secrets are plain strings here as
+everywhere else in the process, so eviction drops the reference but can't
+erase the secret from memory.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from app.core.config import settings
+
+
+class _CachedProviderKey:
+    __slots__ = ("key_id", "secret", "expires_at")
+
+    def __init__(self, key_id: str, secret: str, expires_at: float):
+        self.key_id = key_id
+        self.secret = secret
+        self.expires_at = expires_at
+
+
+class ProviderKeyCache:
+    """LRU cache of decrypted keys, indexed by (org_id, provider) and by ProviderKey.id."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], _CachedProviderKey] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, org_id: str, provider: str) -> Optional[tuple[str, str]]:
+        """
+        Get a cached key for an organization and provider.
+
+        Returns:
+            Tuple of (provider_key_id, api_key) or None if missing/expired
+        """
+        slot = (org_id, provider)
+        with self._lock:
+            entry = self._entries.get(slot)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[slot]
+                return None
+            self._entries.move_to_end(slot)
+            return entry.key_id, entry.secret
+
+    def put(self, org_id: str, provider: str, key_id: str, api_key: str) -> None:
+        """Cache a decrypted key."""
+        if self.ttl_seconds <= 0:
+            return
+        entry = _CachedProviderKey(key_id, api_key, time.monotonic() + self.ttl_seconds)
+        slot = (org_id, provider)
+        with self._lock:
+            self._entries.pop(slot, None)
+            self._entries[slot] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, key_id: str) -> None:
+        """Evict a key immediately, e.g. after it is deleted or deactivated."""
+        with self._lock:
+            for slot in [slot for slot, entry in self._entries.items() if entry.key_id == key_id]:
+                del self._entries[slot]
+
+    def evict_provider(self, org_id: str, provider: str) -> None:
+        """Evict an organization's cached key for a provider, e.g. after a key is added for it."""
+        with self._lock:
+            self._entries.pop((org_id, provider), None)
+
+    def clear(self) -> None:
+        """Evict everything (e.g. after rotating encryption keys)."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Global cache used by the execution endpoint
+provider_key_cache = ProviderKeyCache(
+    ttl_seconds=settings.PROVIDER_KEY_CACHE_TTL_SECONDS,
+    max_entries=settings.PROVIDER_KEY_CACHE_MAX_ENTRIES
+)
@@ -0,0 +1,172 @@
+"""
+Resumable (tus-style) uploads.
+
+An upload session reserves a sparse staging file of the declared size under
+UPLOAD_DIR/.staging. Clients PATCH chunks at explicit offsets, in any order
+and in parallel, and each chunk is written in place. The session records the
+byte ranges received so far; `Upload-Offset` is the end of the contiguous
+prefix, which is where a sequential client resumes. Completing the session
+copies the staging file while hashing it, hands the copy to the blob store
+and creates the File row. Chunk writes hold a shared lock on the staging
+file and completion an exclusive one, so the copy never takes in a chunk
+that is still being written, and a chunk request that opened the file before
+completion can't change the stored contents afterwards.
+
+Sessions that receive no chunk for RESUMABLE_UPLOAD_EXPIRE_HOURS are deleted
+with their staging files by a background loop.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.models import UploadSession
+from app.services.file_storage import get_staging_dir
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def create_staging_file(path: str, size: int) -> None:
+    """Create a sparse file of the final size so chunks can be written at any offset."""
+    with open(path, "xb") as f:
+        f.truncate(size)
+
+
+def session_expiry() -> datetime:
+    """Expiry for a session that just received data."""
+    return datetime.utcnow() + timedelta(hours=settings.RESUMABLE_UPLOAD_EXPIRE_HOURS)
+
+
+def get_ranges(upload: UploadSession) -> list[list[int]]:
+    """Received [start, end) ranges of a session."""
+    return json.loads(upload.received_ranges or "[]")
+
+
+def add_range(ranges: list[list[int]], start: int, end: int) -> list[list[int]]:
+    """Insert [start, end) into sorted, merged ranges, merging overlaps and neighbours."""
+    merged = []
+    for range_start, range_end in sorted(ranges + [[start, end]]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+def contiguous_offset(ranges: list[list[int]]) -> int:
+    """End of the received prefix starting at byte 0."""
+    return ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+
+
+def record_chunk(upload: UploadSession, start: int, end: int) -> None:
+    """Add a written byte range to a session and push back its expiry."""
+    ranges = add_range(get_ranges(upload), start, end)
+    upload.received_ranges = json.dumps(ranges)
+    upload.bytes_received = sum(range_end - range_start for range_start, range_end in ranges)
+    upload.expires_at = session_expiry()
+
+
+def is_complete(upload: UploadSession) -> bool:
+    """Check whether every byte of the upload has been received."""
+    return contiguous_offset(get_ranges(upload)) >= upload.size_bytes
+
+
+def lock_staging_file(path: str) -> Optional[int]:
+    """
+    Open a staging file and lock it against chunk writers.
+
+    Returns:
+        File descriptor holding the lock (close it to release), or None while a chunk is being written
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def copy_staging_file(fd: int, dest_path: str) -> str:
+    """
+    Copy a locked staging file to a new file, hashing the bytes copied.
+
+    Returns:
+        Hex SHA-256 of the copy
+    """
+    hasher = hashlib.sha256()
+    with open(dest_path, "xb") as dest:
+        offset = 0
+        while chunk := os.pread(fd, COPY_CHUNK_SIZE, offset):
+            hasher.update(chunk)
+            dest.write(chunk)
+            offset += len(chunk)
+    return hasher.hexdigest()
+
+
+def remove_staging_file(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def expire_upload_sessions(db: Session) -> int:
+    """
+    Delete expired sessions and their staging files, and staging files no
+    session refers to (left behind when a user was deleted or a worker
+    stopped mid-upload).
+
+    Returns:
+        Number of sessions deleted
+    """
+    now = datetime.utcnow()
+    expired = db.query(UploadSession).filter(UploadSession.expires_at <= now).all()
+    for upload in expired:
+        remove_staging_file(upload.staging_path)
+        db.delete(upload)
+    db.commit()
+
+    # Chunk writes update the mtime, so only files idle for a full expiry period are orphans
+    cutoff = time.time() - settings.RESUMABLE_UPLOAD_EXPIRE_HOURS * 3600
+    live = {path for (path,) in db.query(UploadSession.staging_path)}
+    staging_dir = get_staging_dir()
+    for name in os.listdir(staging_dir):
+        path = os.path.join(staging_dir, name)
+        if path not in live and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+    if expired:
+        logger.info(f"🧹 Expired {len(expired)} upload sessions")
+    return len(expired)
+
+
+async def run_upload_session_cleanup() -> None:
+    """
+    Background loop that expires abandoned upload sessions.
+    Started from the application startup hook.
+    """
+    from app.db.session import SessionLocal
+
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(settings.RESUMABLE_UPLOAD_CLEANUP_SECONDS)
+        try:
+            await loop.run_in_executor(None, _expire_upload_sessions, SessionLocal)
+        except Exception as e:
+            logger.error(f"Upload session cleanup failed: {e}")
+
+
+def _expire_upload_sessions(session_factory) -> None:
+    db = session_factory()
+    try:
+        expire_upload_sessions(db)
+    finally:
+        db.close()
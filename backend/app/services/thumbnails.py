@@ -0,0 +1,306 @@
+"""
+Thumbnails and resized WebP variants of images and videos.
+
+File listings used to point `thumbnail_url` at the full download, so a grid
+fetched every original at full resolution. Variants are instead rendered once
+per (contents, width) in the media worker pool, with Pillow for images and a
+poster frame taken by ffmpeg for videos, and kept in a derived-asset cache
+under UPLOAD_DIR/.derived:
+
+    .derived/<aa>/<key>_<width>.webp
+
+The key is the file's content hash, so files sharing contents share variants
+(files stored before deduplication use their id). Requested widths snap to
+THUMBNAIL_WIDTHS so the cache holds a handful of sizes per file. A zero-byte
+entry records contents that could not be decoded, so they aren't retried on
+every request. Failures that may pass (ffmpeg missing or slow, I/O errors, a
+render that timed out or crashed its worker) aren't recorded on disk; a
+render that timed out or crashed isn't retried by this process for
+RENDER_RETRY_SECONDS, so repeated requests don't each tie up a worker.
+
+The cache is bounded by DERIVED_CACHE_MAX_BYTES: a background sweep deletes
+the least recently served variants (by mtime, refreshed on hits) once it is
+over the limit. Variants are also deleted with their contents.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import subprocess
+import time
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Hits refresh a variant's mtime at most this often, to keep serving read-only
+TOUCH_INTERVAL_SECONDS = 3600
+
+# A sweep over the limit evicts down to this fraction of it, so it doesn't run on every new variant
+EVICT_TO_FRACTION = 0.9
+
+# A variant whose render timed out or crashed isn't rendered again by this process for this long
+RENDER_RETRY_SECONDS = 3600
+
+# Renders in progress in this process, so concurrent requests for a variant render it once
+_inflight: dict[str, asyncio.Future] = {}
+
+# When renders timed out or crashed, by variant path
+_failed_renders: dict[str, float] = {}
+
+_tasks: set[asyncio.Task] = set()
+
+
+class ThumbnailError(Exception):
+    """Raised when a file's contents can't be rendered as a thumbnail."""
+
+
+class UndecodableError(ThumbnailError):
+    """Raised when the contents themselves can't be decoded; recorded so they aren't tried again."""
+
+
+def supports_thumbnail(mime_type: str) -> bool:
+    """Check whether thumbnails can be rendered for a MIME type."""
+    if mime_type.startswith("video/"):
+        return True
+    # SVGs are already small and scale on their own
+    return mime_type.startswith("image/") and mime_type != "image/svg+xml"
+
+
+def get_thumbnail_widths() -> list[int]:
+    """Configured variant widths, ascending."""
+    return sorted(int(width) for width in settings.THUMBNAIL_WIDTHS.split(",") if width.strip())
+
+
+def snap_width(width: Optional[int]) -> int:
+    """Smallest configured width at least `width` (default THUMBNAIL_DEFAULT_WIDTH), or the largest."""
+    if width is None:
+        width = settings.THUMBNAIL_DEFAULT_WIDTH
+    widths = get_thumbnail_widths()
+    return next((w for w in widths if w >= width), widths[-1])
+
+
+def get_derived_dir() -> str:
+    return os.path.join(settings.UPLOAD_DIR, ".derived")
+
+
+def variant_path(key: str, width: int) -> str:
+    """Cache path of a variant."""
+    return os.path.join(get_derived_dir(), key[:2], f"{key}_{width}.webp")
+
+
+def render_variant(source_path: str, mime_type: str, width: int, dest_path: str) -> None:
+    """
+    Render a WebP variant at most `width` pixels wide (and 4x that high).
+    Runs in a worker process; writes a zero-byte file if the source can't be decoded.
+
+    Raises:
+        UndecodableError: If the source can't be decoded
+        ThumbnailError: If it can't be rendered for now (e.g. ffmpeg is missing)
+    """
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    try:
+        image = _load_image(source_path, mime_type, width)
+    except UndecodableError:
+        open(dest_path, "wb").close()
+        raise
+    except ThumbnailError:
+        raise
+    except OSError as e:
+        # Pillow reports broken images as OSErrors without an errno; those with one are I/O failures
+        if e.errno is not None:
+            raise ThumbnailError(f"Cannot read {source_path}: {e}") from e
+        open(dest_path, "wb").close()
+        raise UndecodableError(f"Cannot render {mime_type}: {e}") from e
+    except Exception as e:
+        open(dest_path, "wb").close()
+        raise UndecodableError(f"Cannot render {mime_type}: {e}") from e
+
+    temp_path = f"{dest_path}.{os.getpid()}.tmp"
+    try:
+        image.save(temp_path, "WEBP", quality=settings.THUMBNAIL_QUALITY, method=4)
+        os.replace(temp_path, dest_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _load_image(source_path: str, mime_type: str, width: int):
+    """Decode the source (a poster frame, for videos) and scale it down to the variant's size."""
+    from PIL import Image, ImageOps
+
+    if mime_type.startswith("video/"):
+        image = Image.open(io.BytesIO(_extract_poster_frame(source_path)))
+    else:
+        image = Image.open(source_path)
+        # JPEG can decode straight at a fraction of full size
+        image.draft("RGB", (width, width * 4))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((width, width * 4))
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    return image
+
+
+def _extract_poster_frame(source_path: str) -> bytes:
+    """PNG of a video frame one second in (or the first frame, for shorter videos)."""
+    for offset in ("1", "0"):
+        try:
+            result = subprocess.run(
+                [settings.FFMPEG_PATH, "-v", "error", "-ss", offset, "-i", source_path,
+                 "-frames:v", "1", "-f", "image2pipe", "-vcodec", "png", "-"],
+                capture_output=True,
+                timeout=settings.METADATA_TIMEOUT_SECONDS
+            )
+        except FileNotFoundError:
+            raise ThumbnailError("ffmpeg is not installed")
+        except subprocess.TimeoutExpired:
+            raise ThumbnailError("ffmpeg timed out")
+        if result.stdout:
+            return result.stdout
+    raise UndecodableError("No video frame could be decoded")
+
+
+def _cached_variant(path: str) -> Optional[int]:
+    """Size of a cached variant (0 for a recorded failure), or None if absent. Refreshes its mtime."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if time.time() - stat.st_mtime > TOUCH_INTERVAL_SECONDS:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+    return stat.st_size
+
+
+async def get_variant(key: str, source_path: str, mime_type: str, width: int) -> str:
+    """
+    Get the path of a variant, rendering it first if it isn't cached.
+
+    Args:
+        key: Derived-asset key of the file (content hash, or id for legacy files)
+        source_path: Stored contents
+        mime_type: MIME type of the contents
+        width: Snapped variant width
+
+    Returns:
+        Path of the WebP variant
+
+    Raises:
+        ThumbnailError: If the contents can't be rendered (now or previously)
+    """
+    from app.services.metadata_pipeline import run_in_metadata_pool
+
+    loop = asyncio.get_running_loop()
+    path = variant_path(key, width)
+    size = await loop.run_in_executor(None, _cached_variant, path)
+    if size == 0:
+        raise ThumbnailError("Contents could not be rendered")
+    if size is not None:
+        return path
+    failed_at = _failed_renders.get(path)
+    if failed_at is not None:
+        if time.monotonic() - failed_at < RENDER_RETRY_SECONDS:
+            raise ThumbnailError("Rendering failed recently")
+        del _failed_renders[path]
+
+    future = _inflight.get(path)
+    if future is None:
+        # Shares the metadata workers: both are bounded, CPU-heavy media jobs
+        future = asyncio.ensure_future(run_in_metadata_pool(render_variant, source_path, mime_type, width, path))
+        _inflight[path] = future
+        future.add_done_callback(lambda _: _inflight.pop(path, None))
+    try:
+        # Shielded so a client disconnecting doesn't cancel the render for other waiters
+        await asyncio.shield(future)
+    except (asyncio.TimeoutError, BrokenProcessPool) as e:
+        now = time.monotonic()
+        for failed_path, failed_at in list(_failed_renders.items()):
+            if now - failed_at >= RENDER_RETRY_SECONDS:
+                del _failed_renders[failed_path]
+        _failed_renders[path] = now
+        raise ThumbnailError(f"Rendering failed: {e!r}")
+    return path
+
+
+def schedule_thumbnail(key: str, source_path: str, mime_type: str) -> None:
+    """Render the default-width variant of a newly stored file in the background."""
+    if not supports_thumbnail(mime_type):
+        return
+
+    async def render():
+        try:
+            await get_variant(key, source_path, mime_type, snap_width(None))
+        except ThumbnailError as e:
+            logger.info(f"No thumbnail for {key}: {e}")
+        except Exception as e:
+            logger.error(f"Thumbnail rendering failed for {key}: {e!r}")
+
+    task = asyncio.get_running_loop().create_task(render())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def remove_variants(key: str) -> None:
+    """Delete every cached variant of a key, once its contents are deleted."""
+    directory = os.path.join(get_derived_dir(), key[:2])
+    for width in get_thumbnail_widths():
+        path = os.path.join(directory, f"{key}_{width}.webp")
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def evict_variants() -> int:
+    """
+    Delete the least recently served variants while the cache is over DERIVED_CACHE_MAX_BYTES.
+
+    Returns:
+        Number of variants deleted
+    """
+    entries = []
+    total = 0
+    for directory, _, names in os.walk(get_derived_dir()):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    if total <= settings.DERIVED_CACHE_MAX_BYTES:
+        return 0
+
+    target = settings.DERIVED_CACHE_MAX_BYTES * EVICT_TO_FRACTION
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        evicted += 1
+    logger.info(f"🧹 Evicted {evicted} cached thumbnails")
+    return evicted
+
+
+async def run_derived_cache_eviction() -> None:
+    """
+    Background loop that keeps the derived-asset cache within its size limit.
+    Started from the application startup hook.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(settings.DERIVED_CACHE_SWEEP_SECONDS)
+        try:
+            await loop.run_in_executor(None, evict_variants)
+        except Exception as e:
+            logger.error(f"Thumbnail cache eviction failed: {e}")
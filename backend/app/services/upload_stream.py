@@ -0,0 +1,258 @@
+"""
+Streaming multipart receiver for file uploads.
+
+Starlette's form parsing spools every uploaded file to a temporary file (or
+memory) before the endpoint runs, and the endpoint then copies it to its
+final location. `receive_upload` parses the request body itself and writes
+the file part straight to its destination as it arrives, hashing it
+(SHA-256) on the way: each write is up to UPLOAD_CHUNK_SIZE bytes and runs
+off the event loop, so memory per upload is bounded by the chunk size. Oversize uploads are rejected from Content-Length
+before anything is read, or as soon as the running byte count crosses the
+limit.
+
+`write_body_at` is the raw-body counterpart used by resumable uploads: it
+writes a request body into an existing file at a given offset.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Optional
+from fastapi import HTTPException, Request, status
+from starlette.requests import ClientDisconnect
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from app.core.config import settings
+
+# Allowance for boundaries, part headers and small form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Leading bytes kept in memory for MIME sniffing (libmagic needs only the first few KB)
+MIME_SNIFF_BYTES = 8192
+
+
+@dataclass
+class ReceivedUpload:
+    """A file part written to disk by `receive_upload`."""
+    path: str
+    filename: str
+    size: int
+    sha256: str = ""
+    head: bytes = b""  # First MIME_SNIFF_BYTES of the file, for type detection
+    fields: dict[str, str] = field(default_factory=dict)
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large. Max size: {max_size} bytes"
+    )
+
+
+async def _run_io(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, func, *args)
+
+
+def _write_and_hash(output: BinaryIO, hasher, data: bytes) -> None:
+    # hashlib releases the GIL for large buffers, so both steps run in parallel with the loop
+    hasher.update(data)
+    output.write(data)
+
+
+async def receive_upload(
+    request: Request,
+    destination: Callable[[str], str],
+    field_name: str = "file",
+    max_size: Optional[int] = None
+) -> ReceivedUpload:
+    """
+    Stream the file part of a multipart/form-data request to disk.
+
+    Args:
+        request: Current request (its body must not have been read)
+        destination: Called with the client's filename, returns the path to write to
+        field_name: Form field holding the file
+        max_size: Maximum file size in bytes (defaults to MAX_UPLOAD_SIZE)
+
+    Returns:
+        The written file and any small form fields sent alongside it
+
+    Raises:
+        HTTPException: 400 for a malformed body or missing file, 413 if too large
+    """
+    max_size = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+    max_body = max_size + MULTIPART_OVERHEAD_BYTES
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_body:
+        raise _too_large(max_size)
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a multipart/form-data body")
+
+    # Parser callbacks only record events; they are applied (with awaits) after each body chunk
+    events: list[tuple[str, bytes]] = []
+    parser = MultipartParser(boundary, {
+        "on_part_begin": lambda: events.append(("part_begin", b"")),
+        "on_part_data": lambda data, start, end: events.append(("part_data", data[start:end])),
+        "on_part_end": lambda: events.append(("part_end", b"")),
+        "on_header_field": lambda data, start, end: events.append(("header_field", data[start:end])),
+        "on_header_value": lambda data, start, end: events.append(("header_value", data[start:end])),
+        "on_header_end": lambda: events.append(("header_end", b"")),
+        "on_headers_finished": lambda: events.append(("headers_finished", b"")),
+    })
+
+    upload: Optional[ReceivedUpload] = None
+    output: Optional[BinaryIO] = None
+    pending = bytearray()
+    header_field = b""
+    header_value = b""
+    disposition = b""
+    part_kind: Optional[str] = None
+    part_name = ""
+    part_value = bytearray()
+    fields: dict[str, str] = {}
+    hasher = hashlib.sha256()
+    received = 0
+
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body:
+                raise _too_large(max_size)
+            parser.write(chunk)
+
+            for event, data in events:
+                if event == "part_begin":
+                    disposition = b""
+                    part_kind = None
+                elif event == "header_field":
+                    header_field += data
+                elif event == "header_value":
+                    header_value += data
+                elif event == "header_end":
+                    if header_field.lower() == b"content-disposition":
+                        disposition = header_value
+                    header_field = header_value = b""
+                elif event == "headers_finished":
+                    _, options = parse_options_header(disposition)
+                    part_name = options.get(b"name", b"").decode("latin-1")
+                    filename = options.get(b"filename")
+                    if filename is not None and part_name == field_name and upload is None:
+                        client_filename = filename.decode("utf-8", errors="replace") or "unnamed"
+                        upload = ReceivedUpload(path=destination(client_filename), filename=client_filename, size=0)
+                        output = await _run_io(open, upload.path, "wb")
+                        part_kind = "file"
+                    elif filename is None:
+                        part_kind = "field"
+                        part_value = bytearray()
+                    else:
+                        part_kind = "skip"  # Extra files are ignored
+                elif event == "part_data":
+                    if part_kind == "file":
+                        if len(upload.head) < MIME_SNIFF_BYTES:
+                            upload.head += data[:MIME_SNIFF_BYTES - len(upload.head)]
+                        upload.size += len(data)
+                        if upload.size > max_size:
+                            raise _too_large(max_size)
+                        pending += data
+                        if len(pending) >= settings.UPLOAD_CHUNK_SIZE:
+                            buffer, pending = pending, bytearray()
+                            await _run_io(_write_and_hash, output, hasher, buffer)
+                    elif part_kind == "field":
+                        part_value += data
+                elif event == "part_end":
+                    if part_kind == "field":
+                        fields[part_name] = part_value.decode("utf-8", errors="replace")
+                    elif part_kind == "file":
+                        await _run_io(_write_and_hash, output, hasher, pending)
+                        pending = bytearray()
+                        await _run_io(output.close)
+                        output = None
+                    part_kind = None
+            events.clear()
+
+        parser.finalize()
+    except (FormParserError, ClientDisconnect) as e:
+        await _discard(upload, output)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Malformed upload: {e}")
+    except Exception:
+        # Oversize uploads keep their 413; server-side I/O errors (ENOSPC, EIO) surface as 5xx
+        await _discard(upload, output)
+        raise
+
+    if upload is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Missing file field '{field_name}'")
+    if output is not None:
+        await _discard(upload, output)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Incomplete upload")
+
+    upload.sha256 = hasher.hexdigest()
+    upload.fields = fields
+    return upload
+
+
+async def _discard(upload: Optional[ReceivedUpload], output: Optional[BinaryIO]) -> None:
+    """Close and delete a partially written upload."""
+    if output is not None:
+        await _run_io(output.close)
+    if upload is not None and os.path.exists(upload.path):
+        await _run_io(os.remove, upload.path)
+
+
+def _pwrite_all(fd: int, data: bytes, offset: int) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+
+
+async def write_body_at(request: Request, path: str, offset: int, max_length: int) -> tuple[int, bool]:
+    """
+    Stream a raw request body into an existing file starting at `offset`.
+
+    Args:
+        request: Current request (its body must not have been read)
+        path: File to write into
+        offset: Byte offset of the first body byte
+        max_length: Most bytes the body may contain
+
+    The file is held under a shared lock while the body is written, so a
+    completion (which locks it exclusively) never copies it mid-write.
+
+    Returns:
+        Tuple of (bytes written, whether the client disconnected early). Bytes
+        received before a disconnect are kept so the client can resume after them.
+
+    Raises:
+        HTTPException: 413 if the body is longer than max_length
+    """
+    fd = await _run_io(os.open, path, os.O_WRONLY)
+    await _run_io(fcntl.flock, fd, fcntl.LOCK_SH)
+    written = 0
+    pending = bytearray()
+    disconnected = False
+    try:
+        try:
+            async for chunk in request.stream():
+                if written + len(pending) + len(chunk) > max_length:
+                    raise HTTPException(status_code=413, detail="Chunk extends past the end of the upload")
+                pending += chunk
+                if len(pending) >= settings.UPLOAD_CHUNK_SIZE:
+                    buffer, pending = pending, bytearray()
+                    await _run_io(_pwrite_all, fd, buffer, offset + written)
+                    written += len(buffer)
+        except ClientDisconnect:
+            disconnected = True
+        if pending:
+            await _run_io(_pwrite_all, fd, pending, offset + written)
+            written += len(pending)
+    finally:
+        await _run_io(os.close, fd)
+    return written, disconnected
@@ -0,0 +1,49 @@
+"""
+Shared fixtures: the app runs against a throwaway SQLite database and upload directory.
+
+Settings are read at import, so the environment is set before `app` is imported.
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_data_dir = tempfile.mkdtemp(prefix="piee-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_data_dir}/piee.db"
+os.environ["UPLOAD_DIR"] = os.path.join(_data_dir, "uploads")
+os.environ["JWT_KEYS_DIR"] = os.path.join(_data_dir, "jwt_keys")
+os.environ["ENCRYPTION_MASTER_KEY"] = "test-master-key"
+os.environ["DB_AUTO_MIGRATE"] = "1"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+API = "/api/v1"
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+    shutil.rmtree(_data_dir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def auth(client):
+    """Authorization headers of a registered user."""
+    credentials = {"email": "alice@example.com", "password": "password123"}
+    response = client.post(f"{API}/auth/register", json={**credentials, "full_name": "Alice"})
+    assert response.status_code == 201, response.text
+    response = client.post(f"{API}/auth/login", json=credentials)
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def org_id(client, auth):
+    """The user's personal organization."""
+    return client.get(f"{API}/organizations/", headers=auth).json()[0]["id"]
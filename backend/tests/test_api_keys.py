@@ -0,0 +1,42 @@
+"""API keys are resolved from the in-memory index, without database queries."""
+
+import secrets
+
+from app.auth.api_keys import API_KEY_PREFIX, api_key_index, hash_api_key
+from app.db.models import APIKey
+from app.db.query_tracking import query_budget
+from app.db.session import SessionLocal
+
+from tests.conftest import API
+
+
+def test_unknown_key_is_rejected_without_queries(client, org_id):
+    with query_budget(0):
+        response = client.get(f"{API}/prompts/{org_id}", headers={"Authorization": f"Bearer {API_KEY_PREFIX}garbage"})
+    assert response.status_code == 401
+
+
+def test_key_created_on_another_worker_is_synced(client, org_id):
+    secret_key = f"{API_KEY_PREFIX}{secrets.token_urlsafe(32)}"
+    headers = {"Authorization": f"Bearer {secret_key}"}
+    # Inserted directly, as another worker would, so this worker's index doesn't know it yet
+    with SessionLocal() as db:
+        db.add(APIKey(org_id=org_id, name="elsewhere", prefix=secret_key[:10], key_hash=hash_api_key(secret_key)))
+        db.commit()
+    assert client.get(f"{API}/prompts/{org_id}", headers=headers).status_code == 401
+
+    with SessionLocal() as db:
+        api_key_index.sync(db)
+    assert client.get(f"{API}/prompts/{org_id}", headers=headers).status_code == 200
+
+
+def test_revoked_key_is_rejected_and_unlisted(client, auth, org_id):
+    created = client.post(f"{API}/api-keys/{org_id}", headers=auth, json={"name": "ci"}).json()
+    headers = {"Authorization": f"Bearer {created['secret_key']}"}
+    assert client.get(f"{API}/prompts/{org_id}", headers=headers).status_code == 200
+
+    assert client.delete(f"{API}/api-keys/{org_id}/{created['id']}", headers=auth).status_code == 204
+
+    assert client.get(f"{API}/prompts/{org_id}", headers=headers).status_code == 401
+    listed = client.get(f"{API}/api-keys/{org_id}", headers=auth).json()
+    assert created["id"] not in [key["id"] for key in listed]
@@ -0,0 +1,65 @@
+"""Stored contents are deleted with their last file, however the file is deleted."""
+
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.db.models import Blob
+from app.db.session import SessionLocal
+from app.services.blob_store import store_blob
+
+from tests.conftest import API
+
+# Rows deleted twice only warn on SQLite; other dialects raise StaleDataError
+pytestmark = pytest.mark.filterwarnings("error::sqlalchemy.exc.SAWarning")
+
+
+def _blob_files(sha256: str) -> list[str]:
+    directory = os.path.join(settings.UPLOAD_DIR, "blobs", sha256[:2], sha256[2:4])
+    return os.listdir(directory) if os.path.isdir(directory) else []
+
+
+def _blob_count(sha256: str) -> int:
+    with SessionLocal() as db:
+        return db.query(Blob).filter(Blob.sha256 == sha256).count()
+
+
+def test_deleting_workspace_releases_contents(client, auth):
+    contents = b"workspace contents" * 100
+    sha256 = hashlib.sha256(contents).hexdigest()
+    workspace_id = client.post(f"{API}/workspaces/", headers=auth, json={"name": "Scratch"}).json()["id"]
+    for name in ("a.txt", "b.txt"):
+        response = client.post(
+            f"{API}/files/upload?workspace_id={workspace_id}", headers=auth,
+            files={"file": (name, contents, "text/plain")}
+        )
+        assert response.status_code == 201, response.text
+    assert _blob_count(sha256) == 1 and len(_blob_files(sha256)) == 1
+
+    assert client.delete(f"{API}/workspaces/{workspace_id}", headers=auth).status_code == 204
+
+    assert _blob_count(sha256) == 0
+    assert _blob_files(sha256) == []
+
+
+def test_failed_store_removes_new_blob(client):
+    contents = b"never committed"
+    sha256 = hashlib.sha256(contents).hexdigest()
+    temp_path = os.path.join(settings.UPLOAD_DIR, "never-committed.tmp")
+    with open(temp_path, "wb") as f:
+        f.write(contents)
+
+    async def store():
+        with SessionLocal() as db:
+            async with store_blob(db, temp_path, sha256, len(contents)):
+                raise RuntimeError("File insert failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(store())
+
+    assert not os.path.exists(temp_path)
+    assert _blob_count(sha256) == 0
+    assert _blob_files(sha256) == []
@@ -0,0 +1,19 @@
+"""Micro-benchmark: decrypting a provider key must not pay for key derivation."""
+
+import timeit
+
+from app.services.encryption import decrypt_api_key, derive_key, encrypt_api_key, get_master_keys
+
+DECRYPTS = 200
+
+
+def test_decrypt_reuses_the_derived_cipher():
+    token = encrypt_api_key("sk-test")
+    derive_seconds = timeit.timeit(lambda: derive_key(get_master_keys()[0]), number=1)
+    decrypt_seconds = timeit.timeit(lambda: decrypt_api_key(token), number=DECRYPTS)
+    print(
+        f"\nderive once: {derive_seconds * 1000:.1f} ms; "
+        f"decrypt with cached cipher: {decrypt_seconds / DECRYPTS * 1e6:.1f} us/call"
+    )
+    # Deriving per call would make every decrypt cost at least one derivation
+    assert decrypt_seconds < derive_seconds
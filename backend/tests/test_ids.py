@@ -0,0 +1,21 @@
+"""Malformed ids: rejected when they would be written, matching nothing when looked up."""
+
+from tests.conftest import API
+
+
+def test_malformed_workspace_id_is_rejected(client, auth):
+    response = client.post(
+        f"{API}/files/uploads", headers=auth,
+        json={"filename": "clip.mp4", "size_bytes": 10, "workspace_id": "garbage"}
+    )
+    assert response.status_code == 422
+
+    response = client.post(
+        f"{API}/files/upload?workspace_id=garbage", headers=auth,
+        files={"file": ("hello.txt", b"hello", "text/plain")}
+    )
+    assert response.status_code == 422
+
+
+def test_malformed_path_id_matches_nothing(client, auth):
+    assert client.get(f"{API}/files/garbage", headers=auth).status_code == 404
@@ -0,0 +1,15 @@
+import subprocess
+import sys
+
+
+def test_only_one_worker_requeues_pending_metadata(client):
+    """The app's startup took the requeue lock, so another worker process skips the requeue."""
+    from app.services import metadata_pipeline
+
+    assert metadata_pipeline._requeue_lock is not None
+    other_worker = subprocess.run(
+        [sys.executable, "-c",
+         "from app.services.metadata_pipeline import _claim_requeue; print(_claim_requeue())"],
+        capture_output=True, text=True, check=True,
+    )
+    assert other_worker.stdout.strip() == "False"
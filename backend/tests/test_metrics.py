@@ -0,0 +1,18 @@
+"""/metrics exposes pool state and route timings, so it needs METRICS_TOKEN."""
+
+from app.core.config import settings
+
+
+def test_metrics_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_require_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "metrics-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer metrics-secret"})
+    assert response.status_code == 200
+    assert "db_pools" in response.json()
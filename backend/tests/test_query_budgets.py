@@ -0,0 +1,35 @@
+"""Hot endpoints must stay within their ENDPOINT_QUERY_BUDGETS, however many rows they return."""
+
+from app.db.query_tracking import query_budget, route_budget
+from app.db.slow_queries import db_time_histograms
+
+from tests.conftest import API
+
+
+def test_list_prompts_within_budget(client, auth, org_id):
+    for i in range(5):
+        response = client.post(f"{API}/prompts/{org_id}", headers=auth, json={"name": f"Prompt {i}"})
+        assert response.status_code == 201, response.text
+        prompt_id = response.json()["id"]
+        for _ in range(3):
+            response = client.post(
+                f"{API}/prompts/{org_id}/{prompt_id}/versions",
+                headers=auth,
+                json={"content": "Hello ${name}", "model": "gpt-4", "provider": "openai"}
+            )
+            assert response.status_code == 201, response.text
+
+    with query_budget(route_budget("GET", "/api/v1/prompts/{org_id}")):
+        response = client.get(f"{API}/prompts/{org_id}", headers=auth)
+
+    assert response.status_code == 200
+    assert [len(prompt["versions"]) for prompt in response.json()] == [3] * 5
+
+
+def test_route_template_comes_from_matched_route(client, auth):
+    # An org id equal to a literal path segment must not be mistaken for a parameter
+    client.get(f"{API}/prompts/prompts", headers=auth)
+
+    routes = db_time_histograms.snapshot()
+    assert "GET /api/v1/prompts/{org_id}" in routes
+    assert not any("{org_id}/{org_id}" in route for route in routes)
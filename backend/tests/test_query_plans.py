@@ -0,0 +1,27 @@
+"""Hot queries must use indexes; see app.db.query_plans."""
+
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.db.base import Base
+from app.db.query_plans import check_plans
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+def test_hot_queries_use_indexes_on_sqlite(client):
+    # The client fixture starts the app, which migrates the test database
+    assert check_plans() == {}
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_hot_queries_use_indexes_on_postgres():
+    engine = create_engine(POSTGRES_URL)
+    try:
+        # A scratch database: the schema comes from the models, which `alembic check` keeps in step with migrations
+        Base.metadata.create_all(engine)
+        assert check_plans(bind=engine) == {}
+    finally:
+        engine.dispose()
@@ -0,0 +1,39 @@
+"""Auth rate limits: per-account failures reset on success; client IPs via trusted proxies."""
+
+from starlette.requests import Request
+
+from app.auth.rate_limit import client_ip
+from app.core.config import settings
+from tests.conftest import API
+
+
+def _request(peer: str, forwarded: str = "") -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (peer, 1234), "headers": headers})
+
+
+def test_client_ip_trusts_only_configured_proxies(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_IPS", "10.0.0.2")
+    assert client_ip(_request("10.0.0.2", "203.0.113.7")) == "203.0.113.7"
+    # The client's own entry is left of what the proxy appended
+    assert client_ip(_request("10.0.0.2", "198.51.100.1, 203.0.113.7")) == "203.0.113.7"
+    assert client_ip(_request("10.0.0.2")) == "10.0.0.2"
+    # A direct client can't pick its bucket
+    assert client_ip(_request("203.0.113.9", "198.51.100.1")) == "203.0.113.9"
+
+
+def test_successful_login_resets_failed_attempts(client, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_PER_IP_PER_MINUTE", 60_000)
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_PER_IP_BURST", 1000)
+    credentials = {"email": "bob@example.com", "password": "password123"}
+    assert client.post(f"{API}/auth/register", json={**credentials, "full_name": "Bob"}).status_code == 201
+
+    wrong = {**credentials, "password": "wrong-password"}
+    for _ in range(2):
+        for _ in range(settings.AUTH_RATE_LIMIT_PER_ACCOUNT_BURST - 1):
+            assert client.post(f"{API}/auth/login", json=wrong).status_code == 401
+        assert client.post(f"{API}/auth/login", json=credentials).status_code == 200
+
+    for _ in range(settings.AUTH_RATE_LIMIT_PER_ACCOUNT_BURST):
+        assert client.post(f"{API}/auth/login", json=wrong).status_code == 401
+    assert client.post(f"{API}/auth/login", json=credentials).status_code == 429
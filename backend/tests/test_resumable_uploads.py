@@ -0,0 +1,52 @@
+"""Completing a resumable upload while a chunk is still being written."""
+
+import asyncio
+import hashlib
+
+import httpx
+
+from app.main import app
+
+from tests.conftest import API
+
+
+def test_complete_waits_for_chunk_writers(client, auth):
+    original = b"a" * 100_000
+    replacement = b"b" * 100_000
+    upload_id = client.post(
+        f"{API}/files/uploads", headers=auth, json={"filename": "clip.bin", "size_bytes": len(original)}
+    ).json()["id"]
+    response = client.patch(f"{API}/files/uploads/{upload_id}", headers={**auth, "Upload-Offset": "0"}, content=original)
+    assert response.status_code == 204
+
+    async def run():
+        first_chunk_sent = asyncio.Event()
+        finish_chunk = asyncio.Event()
+
+        async def slow_body():
+            yield replacement[:50_000]
+            first_chunk_sent.set()
+            await finish_chunk.wait()
+            yield replacement[50_000:]
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as async_client:
+            patch = asyncio.create_task(async_client.patch(
+                f"{API}/files/uploads/{upload_id}", headers={**auth, "Upload-Offset": "0"}, content=slow_body()
+            ))
+            await first_chunk_sent.wait()
+            await asyncio.sleep(0.2)
+            completing = await async_client.post(f"{API}/files/uploads/{upload_id}/complete", headers=auth)
+            finish_chunk.set()
+            patched = await patch
+            completed = await async_client.post(f"{API}/files/uploads/{upload_id}/complete", headers=auth)
+        return completing, patched, completed
+
+    completing, patched, completed = asyncio.run(run())
+
+    assert completing.status_code == 409
+    assert patched.status_code == 204
+    assert completed.status_code == 201, completed.text
+    stored = client.get(f"{API}/files/{completed.json()['id']}/download", headers=auth).content
+    assert stored == replacement
+    assert completed.json()["content_hash"] == hashlib.sha256(stored).hexdigest()